@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Calculation
+from .models import Calculation, Portfolio, PortfolioItem
 
 
 @admin.register(Calculation)
@@ -31,3 +31,27 @@ class CalculationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(Portfolio)
+class PortfolioAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'created_at', 'updated_at']
+    search_fields = ['name']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(PortfolioItem)
+class PortfolioItemAdmin(admin.ModelAdmin):
+    list_display = ['sku', 'portfolio', 'category', 'price', 'monthly_sales', 'updated_at']
+    search_fields = ['sku', 'category__name']
+    list_filter = ['portfolio']
+
+    # Товары меняются только через API: так итоги портфеля остаются согласованными
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,716 @@
+"""
+Векторизованный (NumPy) расчет юнит-экономики для каталогов из тысяч SKU.
+
+Все входные данные переводятся в целые числа фиксированной точности
+(копейки, сотые доли процента, тысячные доли коэффициента, нанолитры),
+поэтому расчет идет в точной целочисленной арифметике int64 и округление
+до копеек (половина - к четному) совпадает с Decimal-расчетом OzonCalculatorCore.
+
+Таблицы версии тарифа переводятся в целочисленные массивы один раз
+(FixedPointTariff); объем ищется через searchsorted, часы доставки - по индексу.
+Комиссии по ценовым диапазонам хранятся построчной таблицей границ и ставок
+(CommissionColumns), ставка для цены - число границ меньше цены.
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, NamedTuple, Sequence
+
+import numpy as np
+
+from .engine import (
+    AD_COSTS_SENSITIVITY_RATES,
+    ALL_SECTIONS,
+    BUYOUT_SENSITIVITY_RATES,
+    DELIVERY_SENSITIVITY_HOURS,
+    PRICE_SENSITIVITY_DELTAS,
+    CommissionBands,
+)
+from .solvers import (
+    PriceSegment, solve_price, LOWER_BOUND_SEGMENT, UPPER_BOUND_SEGMENT
+)
+from .tariffs import CompiledTariff, get_default_tariff
+
+
+# Внутренняя единица денежных сумм - 1e-8 рубля
+UNITS_PER_KOPECK = 10 ** 6
+UNITS_PER_RUBLE = 10 ** 8
+
+# Масштабы входных данных
+KOPECKS = 100          # рубли -> копейки
+HUNDREDTHS = 100       # проценты -> сотые доли процента
+NANOLITERS = 10 ** 9   # литры -> нанолитры
+
+# Метки участков решателя в порядке их кодов в колонках solver_segments.*
+SEGMENT_LABELS = (LOWER_BOUND_SEGMENT, 'up_to_300', 'over_300', UPPER_BOUND_SEGMENT)
+
+TARGET_MARGINS = (('target_price_10pct', 10), ('target_price_20pct', 20))
+
+# Граница-заполнитель в таблице диапазонов комиссии (копейки, больше любой цены)
+NO_EDGE = 10 ** 12
+
+
+def _to_fixed(values, scale: int) -> np.ndarray:
+    """
+    Перевод значений в целые единицы фиксированной точности
+    """
+    return np.rint(np.asarray(values, dtype=np.float64) * scale).astype(np.int64)
+
+
+def _div_round(numerator, denominator):
+    """
+    Целочисленное деление с округлением половины к четному (как round() для Decimal)
+
+    denominator должен быть положительным.
+    """
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = 2 * remainder
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def _multiply_round(value_units, factor):
+    """
+    round(value × factor, 2) в копейках без переполнения int64 для больших множителей
+    """
+    whole, fraction = np.divmod(value_units, UNITS_PER_KOPECK)
+    carry, remainder = np.divmod(fraction * factor, UNITS_PER_KOPECK)
+    quotient = whole * factor + carry
+    twice = 2 * remainder
+    round_up = (twice > UNITS_PER_KOPECK) | ((twice == UNITS_PER_KOPECK) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def _percent_of(value_units, price_kopecks):
+    """
+    Процент от цены в сотых долях процента: round(value / price × 100, 2)
+    """
+    positive = price_kopecks > 0
+    denominator = np.where(positive, price_kopecks * 100, 1)
+    return np.where(positive, _div_round(value_units, denominator), 0)
+
+
+def _exact(value: Decimal, scale: int) -> int:
+    """
+    Значение тарифа или комиссии в целых единицах; ValueError, если точности единиц не хватает
+    """
+    scaled = value * scale
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f'Значение тарифа {value} не представимо с точностью 1/{scale}')
+    return int(scaled)
+
+
+class FixedPointTariff:
+    """
+    Таблицы версии тарифа в единицах фиксированной точности
+    """
+
+    def __init__(self, tariff: CompiledTariff):
+        self.tariff = tariff
+        self.threshold = _exact(tariff.price_threshold, KOPECKS)
+        self.acquiring = _exact(tariff.acquiring_rate, HUNDREDTHS)
+        self.under_volumes = np.array(
+            [_exact(volume, NANOLITERS) for volume in tariff.under_volumes], dtype=np.int64
+        )
+        self.under_costs = np.array([_exact(cost, KOPECKS) for cost in tariff.under_costs], dtype=np.int64)
+        self.over_costs = np.array([_exact(cost, KOPECKS) for cost in tariff.over_costs], dtype=np.int64)
+        self.delivery_coeffs = np.array(
+            [_exact(coeff, 1000) for coeff, _ in tariff.delivery_by_hour], dtype=np.int64
+        )
+        self.delivery_percents = np.array(
+            [_exact(percent, HUNDREDTHS) for _, percent in tariff.delivery_by_hour], dtype=np.int64
+        )
+
+    def base_logistics(self, volume_nl: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Базовый тариф логистики (в копейках) для товаров до порога цены и свыше
+
+        Returns:
+            tuple: (тариф до порога, тариф свыше порога)
+        """
+        under = self.under_costs[np.searchsorted(self.under_volumes, volume_nl, side='left')]
+        liters = np.minimum(-(-volume_nl // NANOLITERS), len(self.over_costs) - 1)
+        over = self.over_costs[np.maximum(liters, 0)]
+        return under, over
+
+    def delivery_adjustments(self, hours: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Коэффициент (в тысячных) и процент от цены (в сотых долях) по времени доставки
+        """
+        index = np.clip(hours, 0, len(self.delivery_coeffs) - 1)
+        return self.delivery_coeffs[index], self.delivery_percents[index]
+
+
+@lru_cache(maxsize=16)
+def fixed_point_tariff(tariff: CompiledTariff) -> FixedPointTariff:
+    """
+    Целочисленные таблицы версии тарифа, один раз на версию
+    """
+    return FixedPointTariff(tariff)
+
+
+class CommissionColumns(NamedTuple):
+    """
+    Комиссии схемы по строкам: границы ценовых диапазонов (копейки) и ставки
+    (сотые доли процента); ставка rates[i] действует для цены в (edges[i-1]; edges[i]]
+    """
+    edges: np.ndarray  # строки × E, недостающие границы - NO_EDGE
+    rates: np.ndarray  # строки × (E + 1), недостающие ставки - копия последней
+
+    def at(self, price4) -> np.ndarray:
+        """
+        Ставка для цены в единицах 1e-4 руб.: для скаляра или массива по строкам -
+        массив строк, для матрицы (строки × точки) - матрица
+        """
+        price4 = np.asarray(price4)
+        if price4.ndim < 2:
+            index = (self.edges * 100 < np.reshape(price4, (-1, 1))).sum(axis=1)
+            return np.take_along_axis(self.rates, index[:, None], axis=1)[:, 0]
+        index = (self.edges[:, :, None] * 100 < price4[:, None, :]).sum(axis=1)
+        return np.take_along_axis(self.rates, index, axis=1)
+
+    @classmethod
+    def flat(cls, commission: np.ndarray) -> 'CommissionColumns':
+        """
+        Одна ставка на строку (в сотых долях процента)
+        """
+        return cls(np.empty((len(commission), 0), dtype=np.int64), np.asarray(commission)[:, None])
+
+    def broadcast(self, size: int) -> 'CommissionColumns':
+        """
+        Таблица из одной строки для size строк (без копирования)
+        """
+        return CommissionColumns(np.broadcast_to(self.edges, (size, self.edges.shape[1])),
+                                 np.broadcast_to(self.rates, (size, self.rates.shape[1])))
+
+    @classmethod
+    def from_bands(cls, bands: Sequence[CommissionBands]) -> 'CommissionColumns':
+        """
+        Таблица из диапазонов CommissionBands по строкам; одинаковые диапазоны
+        (товары одной категории) переводятся в целые единицы один раз
+        """
+        unique: Dict[CommissionBands, int] = {}
+        codes = np.array([unique.setdefault(row, len(unique)) for row in bands], dtype=np.int64)
+        width = max((len(row.edges) for row in unique), default=0)
+        edges = np.full((len(unique), width), NO_EDGE, dtype=np.int64)
+        rates = np.empty((len(unique), width + 1), dtype=np.int64)
+        for index, row in enumerate(unique):
+            edges[index, :len(row.edges)] = [_exact(edge, KOPECKS) for edge in row.edges]
+            rates[index, :len(row.rates)] = [_exact(rate, HUNDREDTHS) for rate in row.rates]
+            rates[index, len(row.rates):] = rates[index, len(row.rates) - 1]
+        return cls(edges[codes], rates[codes])
+
+
+class BatchCalculator:
+    """
+    Колоночный расчет юнит-экономики для массивов товаров
+
+    Все аргументы - массивы одинаковой длины (или скаляры), в тех же единицах,
+    что и у OzonCalculator: рубли, литры, проценты, часы. Значения должны иметь
+    точность сериализатора ввода (копейки, сотые доли процента). Комиссии схем -
+    одна ставка на строку или CommissionColumns с ценовыми диапазонами.
+    """
+
+    def __init__(self, price, volume, buyout_rate, delivery_time, tax_rate, ad_costs_rate,
+                 cost_price, other_costs, fbo_commission, fbs_commission, monthly_sales=1,
+                 tariff: CompiledTariff = None):
+        self.tariff = fixed_point_tariff(tariff or get_default_tariff())
+        arrays = np.broadcast_arrays(
+            _to_fixed(price, KOPECKS),
+            _to_fixed(volume, NANOLITERS),
+            _to_fixed(buyout_rate, HUNDREDTHS),
+            np.asarray(delivery_time, dtype=np.int64),
+            _to_fixed(tax_rate, HUNDREDTHS),
+            _to_fixed(ad_costs_rate, HUNDREDTHS),
+            _to_fixed(cost_price, KOPECKS),
+            _to_fixed(other_costs, KOPECKS),
+            np.asarray(monthly_sales, dtype=np.int64),
+        )
+        (self.price, self.volume, self.buyout_rate, self.delivery_time, self.tax_rate, self.ad_costs_rate,
+         self.cost_price, self.other_costs, self.monthly_sales) = [np.atleast_1d(array) for array in arrays]
+        self.size = len(self.price)
+
+        def commission_columns(commission):
+            if isinstance(commission, CommissionColumns):
+                return commission
+            return CommissionColumns.flat(np.broadcast_to(_to_fixed(commission, HUNDREDTHS), (self.size,)))
+
+        self.fbo_commission = commission_columns(fbo_commission)
+        self.fbs_commission = commission_columns(fbs_commission)
+
+        # Слагаемые, не зависящие от комиссии, считаются один раз для обеих схем
+        self.base_under, self.base_over = self.tariff.base_logistics(self.volume)
+        self.base = np.where(self.price <= self.tariff.threshold, self.base_under, self.base_over)
+        self.coeff, self.delivery_percent = self.tariff.delivery_adjustments(self.delivery_time)
+        self.not_buyout = np.maximum(10000 - self.buyout_rate, 0)
+        self.fixed_costs = (self.cost_price + self.other_costs) * UNITS_PER_KOPECK
+
+    @classmethod
+    def from_validated(cls, items: List[Dict[str, Any]], categories: Dict[int, Any],
+                       tariff: CompiledTariff = None) -> 'BatchCalculator':
+        """
+        Создание пакетного калькулятора из validated_data CalculationInputSerializer
+
+        Args:
+            items: Провалидированные входные данные товаров
+            categories: Категории по ID (CategoryCommissions)
+            tariff: Версия тарифа, общая для всех товаров
+        """
+        def column(key):
+            return [float(item[key]) for item in items]
+
+        return cls(
+            price=column('price'),
+            volume=column('volume'),
+            buyout_rate=column('buyout_rate'),
+            delivery_time=[item['delivery_time'] for item in items],
+            tax_rate=column('tax_rate'),
+            ad_costs_rate=column('ad_costs_rate'),
+            cost_price=column('cost_price'),
+            other_costs=column('other_costs'),
+            fbo_commission=CommissionColumns.from_bands(
+                [categories[item['category_id']].bands('FBO') for item in items]
+            ),
+            fbs_commission=CommissionColumns.from_bands(
+                [categories[item['category_id']].bands('FBS') for item in items]
+            ),
+            monthly_sales=[item['monthly_sales'] for item in items],
+            tariff=tariff,
+        )
+
+    def _net_units(self, price4, base, coeff, delivery_percent, not_buyout, commission, ad_costs=None):
+        """
+        Чистая прибыль за штуку в единицах 1e-8 руб. для матрицы (строки × точки)
+
+        Args:
+            price4: Цена в единицах 1e-4 руб.
+            base: Базовый тариф логистики в копейках
+            coeff: Коэффициент времени доставки в тысячных
+            delivery_percent, commission: Проценты от цены в сотых долях
+            not_buyout: Доля невыкупа в сотых долях процента
+            ad_costs: Доля рекламы в сотых долях процента (по умолчанию - из строк)
+        """
+        if ad_costs is None:
+            ad_costs = self.ad_costs_rate[:, None]
+        percent_of_price = commission + self.tariff.acquiring + delivery_percent + self.tax_rate[:, None] + ad_costs
+        return (
+            price4 * (10000 - percent_of_price)
+            - base * (coeff * 1000 + not_buyout * 100)
+            - self.fixed_costs[:, None]
+        )
+
+    def net_profit_units(self, commission: CommissionColumns) -> np.ndarray:
+        """
+        Чистая прибыль за штуку по строкам в единицах 1e-8 руб. (без округления)
+        """
+        price4 = self.price * 100
+        return self._net_units(price4[:, None], self.base[:, None], self.coeff[:, None],
+                               self.delivery_percent[:, None], self.not_buyout[:, None],
+                               commission.at(price4)[:, None])[:, 0]
+
+    def inverse_for_scheme(self, commission: CommissionColumns, target_margin,
+                           monthly_profit_goal=0) -> Dict[str, np.ndarray]:
+        """
+        Векторный аналог OzonCalculatorCore.solve_inverse
+
+        Колонки в копейках, сотых долях процента и штуках; предельные значения
+        округлены вниз, количество продаж - вверх (-1 - цель недостижима).
+
+        Args:
+            target_margin: Целевая маржа в процентах (число или массив по строкам)
+            monthly_profit_goal: Цель по прибыли за месяц в рублях (число или массив)
+        """
+        net = self.net_profit_units(commission)
+        headroom = net - self.price * 100 * _to_fixed(target_margin, HUNDREDTHS)
+        goal = np.broadcast_to(_to_fixed(monthly_profit_goal, KOPECKS) * UNITS_PER_KOPECK, (self.size,))
+        positive = net > 0
+        return {
+            'net_profit_per_unit': _div_round(net, UNITS_PER_KOPECK),
+            'max_cost_price': self.cost_price + headroom // UNITS_PER_KOPECK,
+            'max_other_costs': self.other_costs + headroom // UNITS_PER_KOPECK,
+            'max_ad_costs_rate': self.ad_costs_rate + np.where(
+                self.price > 0, headroom // np.maximum(self.price * 100, 1), 0
+            ),
+            'required_monthly_sales': np.where(positive, -(-goal // np.where(positive, net, 1)), -1),
+        }
+
+    def calculate_inverse(self, target_margin, monthly_profit_goal=None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Обратные задачи для обеих схем: по строке в формате OzonCalculatorCore.solve_inverse
+
+        Args:
+            target_margin: Целевая маржа в процентах (число или последовательность)
+            monthly_profit_goal: Цель по прибыли за месяц в рублях - число, None или
+                последовательность (None в строке - без цели)
+        """
+        target_margin = np.broadcast_to(np.array(target_margin, dtype=object), (self.size,))
+        goals = np.broadcast_to(np.array(monthly_profit_goal, dtype=object), (self.size,))
+        has_goal = [goal is not None for goal in goals]
+        goal_column = [float(goal) if goal is not None else 0.0 for goal in goals]
+
+        def kopecks(value) -> Decimal:
+            return Decimal(int(value)).scaleb(-2)
+
+        results = {}
+        for scheme_name, commission in (('FBO', self.fbo_commission), ('FBS', self.fbs_commission)):
+            columns = self.inverse_for_scheme(commission, [float(margin) for margin in target_margin], goal_column)
+            rows = []
+            for index in range(self.size):
+                row = {
+                    'scheme': scheme_name,
+                    'target_margin': Decimal(target_margin[index]),
+                    'net_profit_per_unit': kopecks(columns['net_profit_per_unit'][index]),
+                    'max_cost_price': kopecks(columns['max_cost_price'][index]),
+                    'max_other_costs': kopecks(columns['max_other_costs'][index]),
+                    'max_ad_costs_rate': kopecks(columns['max_ad_costs_rate'][index]),
+                }
+                if has_goal[index]:
+                    sales = int(columns['required_monthly_sales'][index])
+                    row['monthly_profit_goal'] = Decimal(goals[index])
+                    row['required_monthly_sales'] = sales if sales >= 0 else None
+                rows.append(row)
+            results[f'{scheme_name.lower()}_results'] = rows
+        return results
+
+    def _solve(self, commission: CommissionColumns, target_margin: int, strict: bool):
+        """
+        Векторный аналог OzonCalculatorCore.find_price_for_*: цена в копейках и код участка
+
+        Участки цены делятся порогом тарифа логистики и границами диапазонов комиссии.
+        Для строк, где предикат в диапазоне поиска меняется один раз («нет → да»), ответ -
+        корень первого участка, на конце которого предикат выполнен, или начало участка,
+        если предикат выполнен уже в нем (прибыль становится неотрицательной скачком).
+        Убывание прибыли на участке (например, при большой доле рекламы) этому не мешает,
+        пока предикат не сменяется с «да» на «нет». Остальные строки и корни у границы
+        округления решаются скалярным решателем.
+        """
+        rows = np.arange(self.size)
+        threshold = self.tariff.threshold
+        # Границы участков по возрастанию; верхняя граница последнего участка - NO_EDGE
+        breaks = np.sort(np.concatenate([commission.edges, np.full((self.size, 1), threshold)], axis=1), axis=1)
+        uppers = np.concatenate([breaks, np.full((self.size, 1), NO_EDGE)], axis=1)
+
+        # Ставка и базовый тариф постоянны внутри участка - берутся по верхней границе
+        base_slope = (10000 - self.tariff.acquiring - self.delivery_percent - self.tax_rate - self.ad_costs_rate
+                      - target_margin * 100)
+        slope = base_slope[:, None] - commission.at(uppers * 100)
+        per_base = self.coeff * 1000 + self.not_buyout * 100
+        intercept = np.where(
+            uppers <= threshold, (-self.base_under * per_base)[:, None], (-self.base_over * per_base)[:, None]
+        ) - self.fixed_costs[:, None]
+        low = 1
+        high = np.maximum(self.price * 2, 1000 * KOPECKS)
+
+        # Участки в пределах диапазона поиска: предикат сразу после начала участка и на его конце
+        starts = np.maximum(np.concatenate([np.full((self.size, 1), low), breaks], axis=1), low)
+        ends = np.minimum(uppers, high[:, None])
+        in_range = starts < ends
+        at_start = slope * starts * 100 + intercept
+        at_end = slope * ends * 100 + intercept
+        rising = slope > 0 if strict else slope >= 0
+        # Участки правее диапазона - «да», пустые (совпадающие границы) - как конец предыдущего
+        beyond = ~in_range & (starts >= high[:, None])
+        start_ok = np.where(in_range, (at_start > 0) | ((at_start == 0) & rising), beyond)
+        end_ok = np.where(in_range, at_end > 0 if strict else at_end >= 0, beyond)
+        for column in range(1, end_ok.shape[1]):
+            empty = ~in_range[:, column] & ~beyond[:, column]
+            start_ok[:, column] = np.where(empty, end_ok[:, column - 1], start_ok[:, column])
+            end_ok[:, column] = np.where(empty, end_ok[:, column - 1], end_ok[:, column])
+        sequence = np.stack([start_ok, end_ok], axis=2).reshape(self.size, -1)
+        monotone = ~(sequence[:, :-1] & ~sequence[:, 1:]).any(axis=1)
+
+        # Первый участок, на конце которого предикат выполнен
+        reached = end_ok.any(axis=1)
+        piece = np.argmax(end_ok, axis=1)
+        edge = starts[rows, piece]
+        jump = start_ok[rows, piece]
+        piece_intercept = intercept[rows, piece]
+
+        # Корень в копейках: -intercept / (slope × 100)
+        denominator = np.where(slope[rows, piece] > 0, slope[rows, piece] * 100, 1)
+        root = _div_round(-piece_intercept, denominator)
+        remainder = np.mod(-piece_intercept, denominator)
+        below_low = reached & jump & (edge <= low)
+        above_high = ~reached | np.where(jump, edge >= high, -piece_intercept >= denominator * high)
+
+        # Переход на границе относится к участку слева (цена ≤ upper)
+        price = np.where(jump, edge, root)
+        segment = np.where(np.where(jump, edge, uppers[rows, piece]) <= threshold, 1, 2)
+        price = np.where(below_low, low, price)
+        segment = np.where(below_low, 0, segment)
+        price = np.where(above_high, high, price)
+        segment = np.where(above_high, 3, segment)
+
+        # Корень ближе к половине копейки, чем точность 40 шагов бисекции
+        tolerance = (high - low) / 2.0 ** 40
+        near_half = np.abs(2 * remainder - denominator) <= 4 * denominator * tolerance + 1
+        inside = ~jump & ~below_low & ~above_high
+        fallback = ~monotone | (near_half & inside)
+
+        for index in np.flatnonzero(fallback):
+            result = self._solve_scalar(breaks[index], slope[index], intercept[index], high[index], strict)
+            price[index] = int(round(result.price, 2) * KOPECKS)
+            segment[index] = SEGMENT_LABELS.index(result.segment)
+        return price, segment
+
+    def _solve_scalar(self, breaks, slope, intercept, high, strict):
+        """
+        Решение одной строки скалярным решателем (точная Decimal-арифметика)
+        """
+        segments = []
+        lower = None
+        for upper, piece_slope, piece_intercept in zip([*breaks, NO_EDGE], slope, intercept):
+            if upper == lower:
+                continue
+            segments.append(PriceSegment(
+                None if lower is None else Decimal(int(lower)) / KOPECKS,
+                None if upper == NO_EDGE else Decimal(int(upper)) / KOPECKS,
+                Decimal(int(piece_slope)) / Decimal('10000'),
+                Decimal(int(piece_intercept)) / UNITS_PER_RUBLE,
+                'up_to_300' if upper <= self.tariff.threshold else 'over_300',
+            ))
+            lower = upper
+        return solve_price(segments, Decimal('0.01'), Decimal(int(high)) / KOPECKS, strict=strict)
+
+    def calculate_for_scheme(self, commission: CommissionColumns, scheme_name: str,
+                             sections: FrozenSet[str] = ALL_SECTIONS) -> Dict[str, Any]:
+        """
+        Расчет для схемы работы по всем строкам
+
+        Возвращает колонки с теми же ключами, что и OzonCalculatorCore.calculate_for_scheme
+        (вложенные - через точку). Денежные значения и проценты - целые числа
+        в сотых долях (копейки, сотые доли процента), time_coeff и not_buyout_share -
+        в тысячных, колонки sensitivity.* - матрицы (строки × точки).
+        Вычисляются только колонки запрошенных разделов (RESULT_SECTIONS).
+        """
+        columns = {}
+        # Ставка комиссии по цене товара (таблица чувствительности по цене ищет свою)
+        rate = commission.at(self.price * 100)
+        if 'summary' in sections:
+            columns.update(self._summary_columns(rate))
+
+        if 'targets' in sections:
+            columns['break_even_price'], columns['solver_segments.break_even_price'] = \
+                self._solve(commission, 0, strict=True)
+            for key, margin in TARGET_MARGINS:
+                columns[key], columns[f'solver_segments.{key}'] = self._solve(commission, margin, strict=False)
+
+        if 'sensitivity.price' in sections:
+            columns.update(self._price_sensitivity(commission))
+        if 'sensitivity.buyout' in sections:
+            columns.update(self._buyout_sensitivity(rate))
+        if 'sensitivity.delivery_time' in sections:
+            columns.update(self._delivery_sensitivity(rate))
+        if 'sensitivity.ad_costs' in sections:
+            columns.update(self._ad_costs_sensitivity(rate))
+        return columns
+
+    def _summary_columns(self, commission) -> Dict[str, np.ndarray]:
+        """
+        Колонки раздела summary: прибыль и затраты за штуку
+        """
+        price4 = self.price * 100
+        price_units = self.price * UNITS_PER_KOPECK
+
+        ozon_reward = price4 * commission
+        acquiring = price4 * self.tariff.acquiring
+        price_component = price4 * self.delivery_percent
+        processing_delivery = self.base * self.coeff * 1000 + price_component
+        returns_cancellations = self.base * self.not_buyout * 100
+        total_ozon_costs = ozon_reward + acquiring + processing_delivery + returns_cancellations
+        profit_before_costs = price_units - total_ozon_costs
+        profit_tax = price4 * self.tax_rate
+        ad_costs = price4 * self.ad_costs_rate
+        cost_price = self.cost_price * UNITS_PER_KOPECK
+        other_costs = self.other_costs * UNITS_PER_KOPECK
+        net_profit_per_unit = profit_before_costs - cost_price - profit_tax - ad_costs - other_costs
+        gross_margin_before_tax = profit_before_costs - cost_price - ad_costs - other_costs
+
+        def money(value):
+            return _div_round(value, UNITS_PER_KOPECK)
+
+        def percent(value):
+            return _percent_of(value, self.price)
+
+
+        return {
+            'price': self.price,
+            'price_percent': np.full(self.size, 10000, dtype=np.int64),
+            'ozon_reward': -money(ozon_reward),
+            'ozon_reward_percent': percent(ozon_reward),
+            'acquiring': -money(acquiring),
+            'acquiring_percent': percent(acquiring),
+            'processing_delivery': -money(processing_delivery),
+            'processing_delivery_percent': percent(processing_delivery),
+            'returns_cancellations': -money(returns_cancellations),
+            'returns_cancellations_percent': percent(returns_cancellations),
+            'total_ozon_costs': -money(total_ozon_costs),
+            'total_ozon_costs_percent': percent(total_ozon_costs),
+            'profit_before_costs': money(profit_before_costs),
+            'profit_before_costs_percent': percent(profit_before_costs),
+            'cost_price': -self.cost_price,
+            'cost_price_percent': percent(cost_price),
+            'profit_tax': -money(profit_tax),
+            'profit_tax_percent': percent(profit_tax),
+            'other_costs': -self.other_costs,
+            'other_costs_percent': percent(other_costs),
+            'ad_costs': -money(ad_costs),
+            'ad_costs_percent': percent(ad_costs),
+            'net_profit_per_unit': money(net_profit_per_unit),
+            'net_profit_per_unit_percent': percent(net_profit_per_unit),
+            'net_profit_total': _multiply_round(net_profit_per_unit, self.monthly_sales),
+            'annual_net_profit': _multiply_round(net_profit_per_unit, self.monthly_sales * 12),
+            'gross_margin_before_tax': money(gross_margin_before_tax),
+            'gross_margin_before_tax_percent': percent(gross_margin_before_tax),
+            'effective_ozon_fee_percent': percent(total_ozon_costs),
+            'logistics_breakdown.base': self.base,
+            'logistics_breakdown.time_coeff': self.coeff,
+            'logistics_breakdown.price_percent_component': money(price_component),
+            'returns_breakdown.base': self.base,
+            'returns_breakdown.not_buyout_share': _div_round(10000 - self.buyout_rate, 10),
+        }
+
+    def _price_sensitivity(self, commission: CommissionColumns) -> Dict[str, np.ndarray]:
+        deltas = np.array(PRICE_SENSITIVITY_DELTAS, dtype=np.int64)
+        price4 = self.price[:, None] * (100 + deltas)[None, :]
+        base = np.where(price4 <= self.tariff.threshold * 100, self.base_under[:, None], self.base_over[:, None])
+        net = self._net_units(price4, base, self.coeff[:, None], self.delivery_percent[:, None],
+                              self.not_buyout[:, None], commission.at(price4))
+        positive = price4 > 0
+        return {
+            'sensitivity.price.price': _div_round(price4, 100),
+            'sensitivity.price.net_profit_per_unit': _div_round(net, UNITS_PER_KOPECK),
+            'sensitivity.price.net_profit_per_unit_percent': np.where(
+                positive, _div_round(net, np.where(positive, price4, 1)), 0
+            ),
+        }
+
+    def _buyout_sensitivity(self, commission) -> Dict[str, np.ndarray]:
+        rates = np.array(BUYOUT_SENSITIVITY_RATES, dtype=np.int64)
+        not_buyout = np.maximum(10000 - rates * 100, 0)[None, :]
+        net = self._net_units(self.price[:, None] * 100, self.base[:, None], self.coeff[:, None],
+                              self.delivery_percent[:, None], not_buyout, commission[:, None])
+        return {
+            'sensitivity.buyout.net_profit_per_unit': _div_round(net, UNITS_PER_KOPECK),
+            'sensitivity.buyout.net_profit_per_unit_percent': _percent_of(net, self.price[:, None]),
+        }
+
+    def _delivery_sensitivity(self, commission) -> Dict[str, np.ndarray]:
+        coeff, delivery_percent = self.tariff.delivery_adjustments(np.array(DELIVERY_SENSITIVITY_HOURS))
+        net = self._net_units(self.price[:, None] * 100, self.base[:, None], coeff[None, :],
+                              delivery_percent[None, :], self.not_buyout[:, None], commission[:, None])
+        return {
+            'sensitivity.delivery_time.net_profit_per_unit': _div_round(net, UNITS_PER_KOPECK),
+            'sensitivity.delivery_time.net_profit_per_unit_percent': _percent_of(net, self.price[:, None]),
+        }
+
+    def _ad_costs_sensitivity(self, commission) -> Dict[str, np.ndarray]:
+        ad_costs = np.array(AD_COSTS_SENSITIVITY_RATES, dtype=np.int64)[None, :] * HUNDREDTHS
+        net = self._net_units(self.price[:, None] * 100, self.base[:, None], self.coeff[:, None],
+                              self.delivery_percent[:, None], self.not_buyout[:, None], commission[:, None],
+                              ad_costs)
+        return {
+            'sensitivity.ad_costs.net_profit_per_unit': _div_round(net, UNITS_PER_KOPECK),
+            'sensitivity.ad_costs.net_profit_per_unit_percent': _percent_of(net, self.price[:, None]),
+        }
+
+    def calculate_all(self, sections: FrozenSet[str] = ALL_SECTIONS) -> Dict[str, 'BatchResult']:
+        """
+        Расчет для обеих схем работы (FBO и FBS)
+        """
+        return {
+            'fbo_results': BatchResult('FBO', self.calculate_for_scheme(self.fbo_commission, 'FBO', sections),
+                                       self.size),
+            'fbs_results': BatchResult('FBS', self.calculate_for_scheme(self.fbs_commission, 'FBS', sections),
+                                       self.size),
+        }
+
+
+class BatchResult:
+    """
+    Колонки результата одной схемы с преобразованием строки в формат OzonCalculator
+    """
+    # Колонки, хранящиеся в тысячных, а не в сотых
+    THOUSANDTHS = {'logistics_breakdown.time_coeff', 'returns_breakdown.not_buyout_share'}
+
+    def __init__(self, scheme: str, columns: Dict[str, np.ndarray], size: int):
+        self.scheme = scheme
+        self.columns = columns
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def _decimal(self, key: str, value) -> Decimal:
+        places = 3 if key in self.THOUSANDTHS else 2
+        return Decimal(int(value)).scaleb(-places)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """
+        Строка результата в виде словаря OzonCalculatorCore.calculate_for_scheme
+        """
+        result = {'scheme': self.scheme}
+        for key, column in self.columns.items():
+            if key.startswith('sensitivity.'):
+                continue
+            if key.startswith('solver_segments.'):
+                value = SEGMENT_LABELS[int(column[index])]
+            else:
+                value = self._decimal(key, column[index])
+            target = result
+            *parents, name = key.split('.')
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[name] = value
+        sensitivity = self._sensitivity_rows(index)
+        if sensitivity:
+            result['sensitivity'] = sensitivity
+        return result
+
+    def _sensitivity_rows(self, index: int) -> Dict[str, List[Dict[str, Any]]]:
+        columns = self.columns
+
+        def cell(key, position):
+            return self._decimal(key, columns[key][index, position])
+
+        tables = {}
+        if 'sensitivity.price.price' in columns:
+            tables['price'] = [
+                {
+                    'delta_pct': delta,
+                    'price': cell('sensitivity.price.price', position),
+                    'net_profit_per_unit': cell('sensitivity.price.net_profit_per_unit', position),
+                    'net_profit_per_unit_percent': cell('sensitivity.price.net_profit_per_unit_percent', position),
+                }
+                for position, delta in enumerate(PRICE_SENSITIVITY_DELTAS)
+            ]
+        if 'sensitivity.buyout.net_profit_per_unit' in columns:
+            tables['buyout'] = [
+                {
+                    'buyout_rate': rate,
+                    'net_profit_per_unit': cell('sensitivity.buyout.net_profit_per_unit', position),
+                    'net_profit_per_unit_percent': cell('sensitivity.buyout.net_profit_per_unit_percent', position),
+                }
+                for position, rate in enumerate(BUYOUT_SENSITIVITY_RATES)
+            ]
+        if 'sensitivity.delivery_time.net_profit_per_unit' in columns:
+            tables['delivery_time'] = [
+                {
+                    'hours': hours,
+                    'net_profit_per_unit': cell('sensitivity.delivery_time.net_profit_per_unit', position),
+                    'net_profit_per_unit_percent': cell(
+                        'sensitivity.delivery_time.net_profit_per_unit_percent', position
+                    ),
+                }
+                for position, hours in enumerate(DELIVERY_SENSITIVITY_HOURS)
+            ]
+        if 'sensitivity.ad_costs.net_profit_per_unit' in columns:
+            tables['ad_costs'] = [
+                {
+                    'ad_costs_rate': rate,
+                    'net_profit_per_unit': cell('sensitivity.ad_costs.net_profit_per_unit', position),
+                    'net_profit_per_unit_percent': cell('sensitivity.ad_costs.net_profit_per_unit_percent', position),
+                }
+                for position, rate in enumerate(AD_COSTS_SENSITIVITY_RATES)
+            ]
+        return tables
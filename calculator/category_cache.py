@@ -0,0 +1,170 @@
+"""
+Кэш комиссий категорий в памяти процесса.
+
+Комиссии меняются несколько раз в год, а нужны на каждом расчете. Кэш хранит
+CategoryCommissions по ID категории (LRU, CATEGORY_CACHE_SIZE записей) и
+колоночную таблицу всего справочника для расчетов по всем категориям сразу.
+Кэш целиком сбрасывается, когда меняется версия справочника категорий
+(categories.versioning). В установившемся режиме расчет не обращается к БД.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from categories.models import Category
+from categories.versioning import get_category_version
+from .batch import CommissionColumns
+from .engine import CategoryCommissions
+
+
+class CommissionTable(NamedTuple):
+    """
+    Весь справочник комиссий в колонках (для расчетов по всем категориям сразу)
+    """
+    ids: np.ndarray
+    names: Tuple[str, ...]
+    groups: Tuple[Optional[str], ...]
+    # Комиссии в сотых долях процента
+    fbo_commission: np.ndarray
+    fbs_commission: np.ndarray
+    # Комиссии по ценовым диапазонам (у категорий без диапазонов - одна ставка)
+    fbo_bands: CommissionColumns
+    fbs_bands: CommissionColumns
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class CategoryCommissionCache:
+    """
+    LRU-кэш комиссий категорий с инвалидацией по версии справочника
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.table_loads = 0
+        self._table: Optional[CommissionTable] = None
+        self._entries: 'OrderedDict[int, CategoryCommissions]' = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, category_id: int) -> CategoryCommissions:
+        """
+        Комиссии категории; Category.DoesNotExist, если категории нет
+        """
+        found = self.get_many([category_id])
+        if category_id not in found:
+            raise Category.DoesNotExist(f'Категория с ID {category_id} не найдена')
+        return found[category_id]
+
+    def get_many(self, category_ids: Iterable[int]) -> Dict[int, CategoryCommissions]:
+        """
+        Комиссии нескольких категорий; промахи загружаются одним запросом.
+        Отсутствующих в БД категорий в результате нет.
+        """
+        category_ids = set(category_ids)
+        found = {}
+        with self._lock:
+            self._check_version()
+            for category_id in category_ids:
+                commissions = self._entries.get(category_id)
+                if commissions is not None:
+                    self._entries.move_to_end(category_id)
+                    found[category_id] = commissions
+            self.hits += len(found)
+            self.misses += len(category_ids) - len(found)
+            version = self.version
+
+        missing = category_ids - found.keys()
+        if missing:
+            loaded = {
+                category.id: CategoryCommissions.from_category(category)
+                for category in Category.objects.filter(id__in=missing).only(
+                    'id', 'fbo_commission', 'fbs_commission', 'commission_bands'
+                )
+            }
+            found.update(loaded)
+            with self._lock:
+                # Не кладем в кэш данные, прочитанные до смены версии
+                if self.version == version:
+                    for category_id, commissions in loaded.items():
+                        self._store(category_id, commissions)
+        return found
+
+    def table(self) -> CommissionTable:
+        """
+        Комиссии всех категорий в колонках; загружается один раз на версию справочника
+        """
+        with self._lock:
+            self._check_version()
+            if self._table is not None:
+                return self._table
+            version = self.version
+
+        rows = list(
+            Category.objects.order_by('id').values_list(
+                'id', 'name', 'category_group', 'fbo_commission', 'fbs_commission', 'commission_bands'
+            )
+        )
+        commissions = [CategoryCommissions.from_row(row[0], row[3], row[4], row[5]) for row in rows]
+        table = CommissionTable(
+            ids=np.array([row[0] for row in rows], dtype=np.int64),
+            names=tuple(row[1] for row in rows),
+            groups=tuple(row[2] for row in rows),
+            fbo_commission=np.array([int(row[3] * 100) for row in rows], dtype=np.int64),
+            fbs_commission=np.array([int(row[4] * 100) for row in rows], dtype=np.int64),
+            fbo_bands=CommissionColumns.from_bands([category.bands('FBO') for category in commissions]),
+            fbs_bands=CommissionColumns.from_bands([category.bands('FBS') for category in commissions]),
+        )
+        with self._lock:
+            self.table_loads += 1
+            if self.version == version:
+                self._table = table
+        return table
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._table = None
+
+    def stats(self) -> dict:
+        """
+        Счетчики кэша для эндпоинта метрик
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'invalidations': self.invalidations,
+                'table_loads': self.table_loads,
+            }
+
+    def _check_version(self):
+        version = get_category_version()
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._table = None
+            self.version = version
+
+    def _store(self, category_id: int, commissions: CategoryCommissions):
+        self._entries[category_id] = commissions
+        self._entries.move_to_end(category_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+category_cache = CategoryCommissionCache(settings.CATEGORY_CACHE_SIZE)
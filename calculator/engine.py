@@ -0,0 +1,844 @@
+"""
+Чистое ядро расчета юнит-экономики Ozon без обращений к ORM.
+
+Категория передается готовой записью с комиссиями, поэтому ядро можно
+использовать в пакетных расчетах и передавать (pickle) в рабочие процессы.
+Загрузку категории из БД выполняет адаптер calculator.services.OzonCalculator.
+"""
+
+from bisect import bisect_left
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from typing import Dict, Any, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple, Union
+from .solvers import PriceSegment, SolverResult, solve_price
+from .tariffs import CompiledTariff, get_default_tariff
+
+
+# Точки анализа чувствительности: изменение цены (%), выкуп (%), время доставки (часы),
+# доля рекламы (% от цены)
+PRICE_SENSITIVITY_DELTAS = (-10, -5, 0, 5, 10)
+BUYOUT_SENSITIVITY_RATES = (80, 85, 90, 95)
+DELIVERY_SENSITIVITY_HOURS = (29, 35, 45, 55, 61)
+AD_COSTS_SENSITIVITY_RATES = (0, 5, 10, 15, 20)
+
+# Версия формул расчета: входит в ключ кэша результатов, поэтому после изменения
+# формул сохраненные результаты не используются
+FORMULA_VERSION = 2
+
+# Разделы результата расчета схемы и поля результата, которые в них входят.
+# Невостребованные разделы не вычисляются (поле scheme есть всегда).
+SUMMARY_FIELDS = (
+    'price', 'price_percent',
+    'ozon_reward', 'ozon_reward_percent',
+    'acquiring', 'acquiring_percent',
+    'processing_delivery', 'processing_delivery_percent',
+    'returns_cancellations', 'returns_cancellations_percent',
+    'total_ozon_costs', 'total_ozon_costs_percent',
+    'profit_before_costs', 'profit_before_costs_percent',
+    'cost_price', 'cost_price_percent',
+    'profit_tax', 'profit_tax_percent',
+    'other_costs', 'other_costs_percent',
+    'ad_costs', 'ad_costs_percent',
+    'net_profit_per_unit', 'net_profit_per_unit_percent',
+    'net_profit_total', 'annual_net_profit',
+    'gross_margin_before_tax', 'gross_margin_before_tax_percent',
+    'effective_ozon_fee_percent',
+    'logistics_breakdown', 'returns_breakdown',
+)
+RESULT_SECTIONS = {
+    'summary': SUMMARY_FIELDS,
+    'targets': ('break_even_price', 'target_price_10pct', 'target_price_20pct', 'solver_segments'),
+    'sensitivity.price': ('sensitivity.price',),
+    'sensitivity.buyout': ('sensitivity.buyout',),
+    'sensitivity.delivery_time': ('sensitivity.delivery_time',),
+    'sensitivity.ad_costs': ('sensitivity.ad_costs',),
+}
+ALL_SECTIONS = frozenset(RESULT_SECTIONS)
+
+# Раздел, в который входит каждое поле результата
+FIELD_SECTIONS = {field: section for section, fields in RESULT_SECTIONS.items() for field in fields}
+
+
+def expand_sections(names: Iterable[str]) -> FrozenSet[str]:
+    """
+    Разделы по именам из include=: 'sensitivity' означает все три таблицы
+    """
+    sections = set()
+    for name in names:
+        if name == 'sensitivity':
+            sections.update(section for section in RESULT_SECTIONS if section.startswith('sensitivity.'))
+        else:
+            sections.add(name)
+    return frozenset(sections)
+
+
+# Разделы результата, зависящие от каждого поля ввода (для пересчета по изменениям).
+# Таблицы чувствительности по выкупу, времени доставки и рекламе подставляют свои точки
+# вместо введенных значений, поэтому от этих полей не зависят; количество продаж
+# входит только в итоги за месяц и год.
+INPUT_DEPENDENCIES = {
+    'category_id': ALL_SECTIONS,
+    'price': ALL_SECTIONS,
+    'weight': frozenset(),
+    'volume': ALL_SECTIONS,
+    'tax_rate': ALL_SECTIONS,
+    'buyout_rate': ALL_SECTIONS - {'sensitivity.buyout'},
+    'delivery_time': ALL_SECTIONS - {'sensitivity.delivery_time'},
+    'ad_costs_rate': ALL_SECTIONS - {'sensitivity.ad_costs'},
+    'cost_price': ALL_SECTIONS,
+    'other_costs': ALL_SECTIONS,
+    'monthly_sales': frozenset({'summary'}),
+    'tariff_version': ALL_SECTIONS,
+}
+
+
+def affected_sections(changed_fields: Iterable[str]) -> FrozenSet[str]:
+    """
+    Разделы результата, которые нужно пересчитать после изменения полей ввода
+    """
+    sections = set()
+    for field in changed_fields:
+        sections.update(INPUT_DEPENDENCIES.get(field, ALL_SECTIONS))
+    return frozenset(sections)
+
+
+def merge_sections(current: Dict[str, Dict[str, Any]], previous: Dict[str, Dict[str, Any]],
+                   sections: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Результат calculate_all(), дополненный разделами sections из предыдущего результата
+    """
+    merged = {}
+    for key, result in current.items():
+        result = dict(result)
+        old = previous[key]
+        for section in sections:
+            for field in RESULT_SECTIONS[section]:
+                if field.startswith('sensitivity.'):
+                    table = field.split('.', 1)[1]
+                    result['sensitivity'] = dict(result.get('sensitivity', {}), **{table: old['sensitivity'][table]})
+                else:
+                    result[field] = old[field]
+        merged[key] = result
+    return merged
+
+
+class CommissionBands(NamedTuple):
+    """
+    Комиссия схемы по ценовым диапазонам: rates[i] действует для цены
+    в (edges[i-1]; edges[i]], последняя ставка - выше последней границы
+    """
+    edges: Tuple[Decimal, ...]
+    rates: Tuple[Decimal, ...]
+
+    def rate(self, price: Decimal) -> Decimal:
+        """
+        Комиссия (%) при цене price; цена на границе относится к нижнему диапазону
+        """
+        return self.rates[bisect_left(self.edges, price)]
+
+    @classmethod
+    def flat(cls, rate: Decimal) -> 'CommissionBands':
+        """
+        Одна ставка для любой цены
+        """
+        return cls((), (rate,))
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'CommissionBands':
+        """
+        Диапазоны из поля Category.commission_bands: {"edges": [...], "rates": [...]}
+        """
+        return cls(tuple(Decimal(edge) for edge in data['edges']),
+                   tuple(Decimal(rate) for rate in data['rates']))
+
+
+class CategoryCommissions(NamedTuple):
+    """
+    Легковесная запись категории: только то, что нужно для расчета
+    """
+    id: Optional[int]
+    fbo_commission: Decimal
+    fbs_commission: Decimal
+    # Комиссии по ценовым диапазонам (None - одна ставка fbo_commission/fbs_commission)
+    fbo_bands: Optional[CommissionBands] = None
+    fbs_bands: Optional[CommissionBands] = None
+
+    @classmethod
+    def from_category(cls, category) -> 'CategoryCommissions':
+        """
+        Запись из модели Category (или любого объекта с такими же полями)
+        """
+        return cls.from_row(category.id, category.fbo_commission, category.fbs_commission,
+                            getattr(category, 'commission_bands', None))
+
+    @classmethod
+    def from_row(cls, category_id: Optional[int], fbo_commission: Decimal, fbs_commission: Decimal,
+                 commission_bands: Optional[dict] = None) -> 'CategoryCommissions':
+        """
+        Запись из значений полей Category (commission_bands - {"FBO": {...}, "FBS": {...}})
+        """
+        bands = commission_bands or {}
+        return cls(
+            category_id, fbo_commission, fbs_commission,
+            CommissionBands.from_data(bands['FBO']) if 'FBO' in bands else None,
+            CommissionBands.from_data(bands['FBS']) if 'FBS' in bands else None,
+        )
+
+    def bands(self, scheme_name: str) -> CommissionBands:
+        """
+        Комиссия схемы FBO или FBS по ценовым диапазонам
+        """
+        if scheme_name == 'FBO':
+            return self.fbo_bands or CommissionBands.flat(self.fbo_commission)
+        return self.fbs_bands or CommissionBands.flat(self.fbs_commission)
+
+
+def as_bands(commission: Union[Decimal, CommissionBands]) -> CommissionBands:
+    """
+    Комиссия в виде диапазонов (одна ставка - один диапазон)
+    """
+    return commission if isinstance(commission, CommissionBands) else CommissionBands.flat(commission)
+
+
+class SchemeIndependentTerms(NamedTuple):
+    """
+    Величины расчета, не зависящие от комиссии схемы (общие для FBO и FBS)
+    """
+    acquiring: Decimal
+    base_logistics: Decimal
+    time_coeff: Decimal
+    price_component: Decimal
+    processing_delivery: Decimal
+    returns_cancellations: Decimal
+    profit_tax: Decimal
+    ad_costs: Decimal
+    # Затраты Ozon и чистая прибыль за штуку без комиссии
+    ozon_costs: Decimal
+    net_profit: Decimal
+    # Наклон (без комиссии и маржи) и свободные члены участков ≤300₽ и >300₽
+    segment_slope: Decimal
+    segment_intercepts: Tuple[Decimal, Decimal]
+    # Строки чувствительности: (параметр, [цена,] прибыль без комиссии)
+    price_rows: Tuple[Tuple[int, Decimal, Decimal], ...]
+    buyout_rows: Tuple[Tuple[int, Decimal], ...]
+    delivery_rows: Tuple[Tuple[int, Decimal], ...]
+    ad_costs_rows: Tuple[Tuple[int, Decimal], ...]
+
+
+class OzonCalculatorCore:
+    """
+    Ядро расчета юнит-экономики товаров на Ozon
+    """
+    
+    def __init__(self, category: CategoryCommissions, price: Decimal, weight: Decimal, volume: Decimal,
+                 tax_rate: Decimal, buyout_rate: Decimal, delivery_time: int,
+                 ad_costs_rate: Decimal, cost_price: Decimal, other_costs: Decimal,
+                 monthly_sales: int, tariff: CompiledTariff = None):
+        """
+        Инициализация калькулятора
+
+        Args:
+            category: Категория с комиссиями fbo_commission и fbs_commission и, если есть,
+                диапазонами commission_bands (CategoryCommissions или модель Category)
+            tariff: Скомпилированная версия тарифа (по умолчанию - действующая на сегодня)
+        """
+        if not isinstance(category, CategoryCommissions):
+            category = CategoryCommissions.from_category(category)
+        self.category = category
+        self.tariff = tariff or get_default_tariff()
+        self.price = price
+        self.weight = weight
+        self.volume = volume
+        self.tax_rate = tax_rate / Decimal('100')  # Конвертируем % в десятичную дробь
+        self.buyout_rate = buyout_rate / Decimal('100')
+        self.delivery_time = delivery_time
+        self.ad_costs_rate = ad_costs_rate / Decimal('100')
+        self.cost_price = cost_price
+        self.other_costs = other_costs
+        self.monthly_sales = monthly_sales
+    
+    def calculate_ozon_reward(self, commission_rate: Decimal) -> Decimal:
+        """
+        Расчет вознаграждения Ozon (комиссия)
+        """
+        return (self.price * commission_rate) / Decimal('100')
+    
+    def get_delivery_time_adjustments(self) -> tuple[Decimal, Decimal]:
+        """
+        Получить коэффициент и процент от цены для времени доставки
+        
+        Returns:
+            tuple: (коэффициент, процент от цены)
+        """
+        # До 29 часов - минимальные значения, от 61 часа - максимальные,
+        # между ними - ближайшее большее значение из таблицы
+        return self.tariff.delivery_adjustments(self.delivery_time)
+    
+    def calculate_acquiring(self) -> Decimal:
+        """
+        Расчет эквайринга (оплата банковских услуг)
+        """
+        return (self.price * self.tariff.acquiring_rate) / Decimal('100')
+    
+    def calculate_base_logistics(self, price_override: Decimal = None) -> Decimal:
+        """
+        Расчет базового тарифа логистики (без учёта времени доставки)
+        Зависит только от цены товара и объема (в литрах)
+        
+        Формула Ozon (пороги и таблицы - из версии тарифа):
+        - Для товаров до порога цены (300₽): таблица по объему или максимальная ставка
+        - Для товаров свыше порога: ступенчатая шкала по объему
+        
+        Args:
+            price_override: Опциональная цена для пересчета (используется при расчете точек цены)
+        """
+        price_for_calc = price_override if price_override is not None else self.price
+        
+        # Блок 1 (до порога): поиск по таблице объемов, максимальная ставка за ее пределами
+        # Блок 2 (свыше порога): ступенчатая шкала по объему, округленному вверх до литра
+        return self.tariff.base_logistics(self.volume, price_for_calc)
+
+    def calculate_processing_and_delivery(self, price_override: Decimal = None) -> Decimal:
+        """
+        Расчет стоимости обработки и доставки (логистики FBO Ozon)
+        Зависит от цены товара, объема (в литрах) и времени доставки
+        
+        Формула Ozon:
+        - Шаг 1: Расчет базового тарифа по объему
+        - Шаг 2: Применение коэффициента и процента от цены по времени доставки
+          - Итого = (Базовый_тариф × Коэффициент) + (Цена × Процент / 100)
+        
+        Args:
+            price_override: Опциональная цена для пересчета (используется при расчете точек цены)
+        """
+        price_for_calc = price_override if price_override is not None else self.price
+        
+        # Шаг 1: Получаем базовый тариф логистики
+        base_logistics = self.calculate_base_logistics(price_override=price_for_calc)
+        
+        # Шаг 2: Применение коэффициента и процента от цены по времени доставки
+        coeff, price_percent = self.get_delivery_time_adjustments()
+        
+        # Итоговая логистика = (Базовый тариф × Коэффициент) + (Цена × Процент / 100)
+        final_logistics = (base_logistics * coeff) + (price_for_calc * price_percent / Decimal('100'))
+        
+        return final_logistics
+    
+    def calculate_returns_and_cancellations(self, price_override: Decimal = None) -> Decimal:
+        """
+        Расчет затрат на возвраты и отмены (обратная логистика)
+        
+        Тариф на обратную логистику равен тарифу на логистику,
+        но не учитывает среднее время доставки до покупателя.
+        
+        Также учитывается процент выкупа: оплачивается доля невыкупленных/отмененных
+        отправлений. То есть используется базовый тариф, умноженный на (1 - выкуп).
+        
+        Args:
+            price_override: Опциональная цена для пересчета (используется при расчете точек цены)
+        """
+        base = self.calculate_base_logistics(price_override=price_override)
+        not_buyout_share = Decimal('1') - self.buyout_rate  # доля невыкупа
+        if not_buyout_share < 0:
+            not_buyout_share = Decimal('0')
+        return base * not_buyout_share
+    
+    def calculate_profit_tax(self) -> Decimal:
+        """
+        Расчет налога - считается от цены товара
+        """
+        return self.price * self.tax_rate
+
+    def calculate_ad_costs(self) -> Decimal:
+        """
+        Расчет рекламных расходов - доля от цены товара
+        """
+        return self.price * self.ad_costs_rate
+
+    def calculate_scheme_independent_terms(self,
+                                           sections: FrozenSet[str] = ALL_SECTIONS) -> 'SchemeIndependentTerms':
+        """
+        Все, что не зависит от комиссии схемы: логистика, возвраты, налог, реклама,
+        прибыль без комиссии для текущей цены и строк анализа чувствительности,
+        а также участки цены для решателей. Считается один раз на расчет
+        и используется обеими схемами (FBO и FBS). Строки чувствительности
+        считаются только для запрошенных разделов.
+        """
+        coeff, price_percent = self.get_delivery_time_adjustments()
+        base_logistics = self.calculate_base_logistics()
+        not_buyout_share = max(Decimal('1') - self.buyout_rate, Decimal('0'))
+        price_component = (self.price * price_percent) / Decimal('100')
+        processing_delivery = (base_logistics * coeff) + price_component
+        returns_cancellations = base_logistics * not_buyout_share
+        acquiring = self.calculate_acquiring()
+        profit_tax = self.calculate_profit_tax()
+        ad_costs = self.calculate_ad_costs()
+        ozon_costs = acquiring + processing_delivery + returns_cancellations
+        net_without_commission = self.price - ozon_costs - self.cost_price - profit_tax - ad_costs - self.other_costs
+
+        # Участки кусочно-линейной функции прибыли без комиссии и целевой маржи
+        segment_slope = (
+            Decimal('1')
+            - (self.tariff.acquiring_rate + price_percent) / Decimal('100')
+            - self.tax_rate
+            - self.ad_costs_rate
+        )
+
+        def intercept(base: Decimal) -> Decimal:
+            # Базовый тариф входит в логистику (× коэффициент) и в возвраты (× доля невыкупа)
+            return -(base * coeff + base * not_buyout_share) - self.cost_price - self.other_costs
+
+        segment_intercepts = (
+            intercept(self.tariff.base_logistics_under(self.volume)),
+            intercept(self.tariff.base_logistics_over(self.volume)),
+        )
+
+        # Строки чувствительности: цена меняет базовый тариф, выкуп - долю невыкупа,
+        # время доставки - коэффициент и процент от цены, реклама - свою долю от цены;
+        # остальное берется готовым
+        price_rows = []
+        for delta_pct in (PRICE_SENSITIVITY_DELTAS if 'sensitivity.price' in sections else ()):
+            test_price = self.price * (Decimal('1') + Decimal(delta_pct) / Decimal('100'))
+            net_profit = self._net_profit_without_commission(
+                test_price, self.tariff.base_logistics(self.volume, test_price),
+                coeff, price_percent, not_buyout_share
+            )
+            price_rows.append((delta_pct, test_price, net_profit))
+        buyout_rows = tuple(
+            (rate, self._net_profit_without_commission(
+                self.price, base_logistics, coeff, price_percent,
+                max(Decimal('1') - Decimal(rate) / Decimal('100'), Decimal('0'))
+            ))
+            for rate in (BUYOUT_SENSITIVITY_RATES if 'sensitivity.buyout' in sections else ())
+        )
+        delivery_rows = tuple(
+            (hours, self._net_profit_without_commission(
+                self.price, base_logistics, *self.tariff.delivery_adjustments(hours), not_buyout_share
+            ))
+            for hours in (DELIVERY_SENSITIVITY_HOURS if 'sensitivity.delivery_time' in sections else ())
+        )
+        ad_costs_rows = tuple(
+            (rate, net_without_commission + ad_costs - self.price * Decimal(rate) / Decimal('100'))
+            for rate in (AD_COSTS_SENSITIVITY_RATES if 'sensitivity.ad_costs' in sections else ())
+        )
+
+        return SchemeIndependentTerms(
+            acquiring=acquiring,
+            base_logistics=base_logistics,
+            time_coeff=coeff,
+            price_component=price_component,
+            processing_delivery=processing_delivery,
+            returns_cancellations=returns_cancellations,
+            profit_tax=profit_tax,
+            ad_costs=ad_costs,
+            ozon_costs=ozon_costs,
+            net_profit=net_without_commission,
+            segment_slope=segment_slope,
+            segment_intercepts=segment_intercepts,
+            price_rows=tuple(price_rows),
+            buyout_rows=buyout_rows,
+            delivery_rows=delivery_rows,
+            ad_costs_rows=ad_costs_rows,
+        )
+
+    def _net_profit_without_commission(self, price: Decimal, base_logistics: Decimal, coeff: Decimal,
+                                       price_percent: Decimal, not_buyout_share: Decimal) -> Decimal:
+        """
+        Чистая прибыль за штуку без комиссии Ozon при заданной цене и параметрах
+        логистики (для строк анализа чувствительности)
+        """
+        processing_delivery = (base_logistics * coeff) + (price * price_percent) / Decimal('100')
+        returns = base_logistics * not_buyout_share
+        acquiring = (price * self.tariff.acquiring_rate) / Decimal('100')
+        ozon_costs = acquiring + processing_delivery + returns
+        return (price - ozon_costs - self.cost_price - price * self.tax_rate
+                - price * self.ad_costs_rate - self.other_costs)
+
+    def get_net_profit_segments(self, commission: Union[Decimal, CommissionBands],
+                                target_margin_pct: Decimal = Decimal('0'),
+                                shared: 'SchemeIndependentTerms' = None) -> List[PriceSegment]:
+        """
+        Представление чистой прибыли за штуку как кусочно-линейной функции цены
+
+        На каждом участке: net = slope × цена + intercept. Участки делятся порогом
+        тарифа логистики (свободный член) и границами ценовых диапазонов комиссии
+        (наклон). Для целевой маржи из функции вычитается цена × маржа / 100, тогда
+        корень функции - цена, при которой маржа равна целевой.
+
+        Args:
+            commission: Комиссия Ozon в процентах (одна ставка или CommissionBands)
+            target_margin_pct: Целевая маржа в процентах от цены (0 - точка безубыточности)
+            shared: Готовые общие для схем величины (если уже посчитаны)
+        """
+        shared = shared or self.calculate_scheme_independent_terms()
+        bands = as_bands(commission)
+        threshold = self.tariff.price_threshold
+        intercept_under, intercept_over = shared.segment_intercepts
+        segments = []
+        lower = None
+        for upper in sorted(set(bands.edges) | {threshold}) + [None]:
+            # Внутри участка нет границ, поэтому ставка и тариф постоянны (цена на границе - в нижнем)
+            rate = bands.rates[-1] if upper is None else bands.rate(upper)
+            # Все процентные от цены составляющие: комиссия, эквайринг, логистика по времени,
+            # налог и реклама
+            slope = shared.segment_slope - (rate + target_margin_pct) / Decimal('100')
+            if upper is not None and upper <= threshold:
+                segments.append(PriceSegment(lower, upper, slope, intercept_under, 'up_to_300'))
+            else:
+                segments.append(PriceSegment(lower, upper, slope, intercept_over, 'over_300'))
+            lower = upper
+        return segments
+
+    def find_price_for_target_net(self, commission: Union[Decimal, CommissionBands],
+                                  target_net: Decimal = Decimal('0'),
+                                  shared: 'SchemeIndependentTerms' = None) -> SolverResult:
+        """
+        Цена, при которой чистая прибыль за штуку равна target_net
+        (для target_net = 0 - точка безубыточности)
+        """
+        segments = [
+            segment._replace(intercept=segment.intercept - target_net)
+            for segment in self.get_net_profit_segments(commission, shared=shared)
+        ]
+        return self._solve_price(segments, strict=True)
+
+    def find_price_for_margin(self, commission: Union[Decimal, CommissionBands], target_margin_pct: Decimal,
+                              shared: 'SchemeIndependentTerms' = None) -> SolverResult:
+        """
+        Минимальная цена, при которой маржа (прибыль / цена) достигает target_margin_pct
+        """
+        segments = self.get_net_profit_segments(commission, target_margin_pct, shared=shared)
+        return self._solve_price(segments, strict=False)
+
+    def _price_search_bounds(self) -> tuple[Decimal, Decimal]:
+        """
+        Диапазон поиска цены для решателей
+        """
+        return Decimal('0.01'), max(self.price * Decimal('2'), Decimal('1000'))
+
+    def _solve_price(self, segments: List[PriceSegment], strict: bool) -> SolverResult:
+        """
+        Корень кусочно-линейной функции в диапазоне поиска цены
+        """
+        return solve_price(segments, *self._price_search_bounds(), strict=strict)
+
+    def calculate_for_scheme(self, commission: Union[Decimal, CommissionBands], scheme_name: str,
+                             shared: 'SchemeIndependentTerms' = None,
+                             sections: FrozenSet[str] = ALL_SECTIONS) -> Dict[str, Any]:
+        """
+        Расчет для конкретной схемы работы (FBO или FBS)
+
+        Args:
+            commission: Комиссия схемы в процентах (одна ставка или CommissionBands
+                - тогда ставка берется по цене, для которой идет расчет)
+            scheme_name: Название схемы
+            shared: Общие для схем величины; если не переданы - считаются здесь
+            sections: Разделы результата (RESULT_SECTIONS); остальные не вычисляются
+        """
+        shared = shared or self.calculate_scheme_independent_terms(sections)
+        result = {'scheme': scheme_name}
+
+        # Вознаграждение Ozon (комиссия) - единственная зависящая от схемы часть
+        bands = as_bands(commission)
+        ozon_reward = self.calculate_ozon_reward(bands.rate(self.price))
+
+        # Расчет процентов для визуализации
+        def calc_percent(value: Decimal) -> Decimal:
+            if self.price == 0:
+                return Decimal('0')
+            return (value / self.price) * Decimal('100')
+
+        if 'summary' in sections:
+            result.update(self._summary_section(ozon_reward, shared, calc_percent))
+
+        if 'targets' in sections:
+            # Break-even price (цена, при которой net_profit_per_unit = 0) и target price
+            # для маржи 10% и 20% - аналитически по участкам кусочно-линейной функции
+            break_even = self.find_price_for_target_net(bands, shared=shared)
+            target_10pct = self.find_price_for_margin(bands, Decimal('10'), shared=shared)
+            target_20pct = self.find_price_for_margin(bands, Decimal('20'), shared=shared)
+            result.update({
+                'break_even_price': round(break_even.price, 2),
+                'target_price_10pct': round(target_10pct.price, 2),
+                'target_price_20pct': round(target_20pct.price, 2),
+                'solver_segments': {
+                    'break_even_price': break_even.segment,
+                    'target_price_10pct': target_10pct.segment,
+                    'target_price_20pct': target_20pct.segment,
+                },
+            })
+
+        # Sensitivity arrays: к общей прибыли без комиссии добавляется только комиссия схемы
+        sensitivity = {}
+        if 'sensitivity.price' in sections:
+            sensitivity['price'] = []
+            for delta_pct, test_price, net_without_commission in shared.price_rows:
+                net_profit = net_without_commission - (test_price * bands.rate(test_price)) / Decimal('100')
+                # Процент маржи должен рассчитываться от тестовой цены, а не от текущей
+                if test_price == 0:
+                    margin_percent = Decimal('0')
+                else:
+                    margin_percent = (net_profit / test_price) * Decimal('100')
+                sensitivity['price'].append({
+                    'delta_pct': delta_pct,
+                    'price': round(test_price, 2),
+                    'net_profit_per_unit': round(net_profit, 2),
+                    'net_profit_per_unit_percent': round(margin_percent, 2)
+                })
+
+        if 'sensitivity.buyout' in sections:
+            sensitivity['buyout'] = [
+                {
+                    'buyout_rate': rate,
+                    'net_profit_per_unit': round(net_without_commission - ozon_reward, 2),
+                    'net_profit_per_unit_percent': round(calc_percent(net_without_commission - ozon_reward), 2)
+                }
+                for rate, net_without_commission in shared.buyout_rows
+            ]
+
+        if 'sensitivity.delivery_time' in sections:
+            sensitivity['delivery_time'] = [
+                {
+                    'hours': hours,
+                    'net_profit_per_unit': round(net_without_commission - ozon_reward, 2),
+                    'net_profit_per_unit_percent': round(calc_percent(net_without_commission - ozon_reward), 2)
+                }
+                for hours, net_without_commission in shared.delivery_rows
+            ]
+
+        if 'sensitivity.ad_costs' in sections:
+            sensitivity['ad_costs'] = [
+                {
+                    'ad_costs_rate': rate,
+                    'net_profit_per_unit': round(net_without_commission - ozon_reward, 2),
+                    'net_profit_per_unit_percent': round(calc_percent(net_without_commission - ozon_reward), 2)
+                }
+                for rate, net_without_commission in shared.ad_costs_rows
+            ]
+
+        if sensitivity:
+            result['sensitivity'] = sensitivity
+        return result
+
+    def _summary_section(self, ozon_reward: Decimal, shared: 'SchemeIndependentTerms',
+                         calc_percent) -> Dict[str, Any]:
+        """
+        Основной расчет прибыли и затрат за штуку (раздел summary)
+        """
+        # Эквайринг, обработка и доставка, возвраты и отмены - общие для схем
+        acquiring = shared.acquiring
+        processing_delivery = shared.processing_delivery
+        returns_cancellations = shared.returns_cancellations
+        
+        # Общие затраты на Ozon за штуку
+        total_ozon_costs = ozon_reward + shared.ozon_costs
+        
+        # К начислению за товар (прибыль до вычета собственных затрат)
+        profit_before_costs = self.price - total_ozon_costs
+        
+        # Налог и реклама (считаются от цены товара)
+        profit_tax = shared.profit_tax
+        ad_costs = shared.ad_costs
+        
+        # Вычитаем себестоимость, налог, рекламу и прочие затраты
+        net_profit_per_unit = shared.net_profit - ozon_reward
+        
+        # Прибыль за партию (месячную продажу)
+        net_profit_total = net_profit_per_unit * Decimal(str(self.monthly_sales))
+        annual_net_profit = net_profit_total * Decimal('12')
+        
+        # Contribution metrics
+        gross_margin_before_tax = (profit_before_costs - self.cost_price - ad_costs - self.other_costs)
+
+        return {
+            'price': round(self.price, 2),
+            'price_percent': Decimal('100.00'),
+            
+            'ozon_reward': -round(ozon_reward, 2),
+            'ozon_reward_percent': round(calc_percent(ozon_reward), 2),
+            
+            'acquiring': -round(acquiring, 2),
+            'acquiring_percent': round(calc_percent(acquiring), 2),
+            
+            'processing_delivery': -round(processing_delivery, 2),
+            'processing_delivery_percent': round(calc_percent(processing_delivery), 2),
+            
+            'returns_cancellations': -round(returns_cancellations, 2),
+            'returns_cancellations_percent': round(calc_percent(returns_cancellations), 2),
+            
+            'total_ozon_costs': -round(total_ozon_costs, 2),
+            'total_ozon_costs_percent': round(calc_percent(total_ozon_costs), 2),
+            
+            'profit_before_costs': round(profit_before_costs, 2),
+            'profit_before_costs_percent': round(calc_percent(profit_before_costs), 2),
+            
+            'cost_price': -round(self.cost_price, 2),
+            'cost_price_percent': round(calc_percent(self.cost_price), 2),
+            
+            'profit_tax': -round(profit_tax, 2),
+            'profit_tax_percent': round(calc_percent(profit_tax), 2),
+            
+            'other_costs': -round(self.other_costs, 2),
+            'other_costs_percent': round(calc_percent(self.other_costs), 2),
+            
+            'ad_costs': -round(ad_costs, 2),
+            'ad_costs_percent': round(calc_percent(ad_costs), 2),
+            
+            'net_profit_per_unit': round(net_profit_per_unit, 2),
+            'net_profit_per_unit_percent': round(calc_percent(net_profit_per_unit), 2),
+            
+            'net_profit_total': round(net_profit_total, 2),
+            'annual_net_profit': round(annual_net_profit, 2),
+            'gross_margin_before_tax': round(gross_margin_before_tax, 2),
+            'gross_margin_before_tax_percent': round(calc_percent(gross_margin_before_tax), 2),
+            'effective_ozon_fee_percent': round(calc_percent(total_ozon_costs), 2),
+            'logistics_breakdown': {
+                'base': round(shared.base_logistics, 2),
+                'time_coeff': round(shared.time_coeff, 3),
+                'price_percent_component': round(shared.price_component, 2)
+            },
+            'returns_breakdown': {
+                'base': round(shared.base_logistics, 2),
+                'not_buyout_share': round(Decimal('1') - self.buyout_rate, 3)
+            },
+        }
+    
+    def solve_inverse(self, commission: Union[Decimal, CommissionBands],
+                      target_margin_pct: Decimal = Decimal('20'),
+                      monthly_profit_goal: Optional[Decimal] = None,
+                      shared: 'SchemeIndependentTerms' = None) -> Dict[str, Any]:
+        """
+        Обратные задачи в закрытой форме: предельные затраты для целевой маржи
+        и количество продаж для цели по прибыли за месяц
+
+        Прибыль за штуку линейна по себестоимости и прочим затратам (с коэффициентом -1),
+        а прибыль за месяц - по количеству продаж, поэтому каждый ответ - одна формула:
+            запас = прибыль за штуку - цена × маржа / 100
+            max_cost_price = cost_price + запас, max_other_costs = other_costs + запас
+            max_ad_costs_rate = ad_costs_rate + запас / цена × 100 (предельная доля рекламы)
+            required_monthly_sales = ⌈цель / прибыль за штуку⌉ (None, если прибыль ≤ 0)
+        Предельные значения округляются вниз до копеек (сотых долей процента), количество
+        продаж - вверх, поэтому целевые значения с ними достигаются. Отрицательный предел
+        означает, что цель недостижима даже при нулевых затратах.
+
+        Args:
+            commission: Комиссия схемы (одна ставка или CommissionBands)
+            target_margin_pct: Целевая маржа в процентах от цены
+            monthly_profit_goal: Цель по чистой прибыли за месяц в рублях
+            shared: Общие для схем величины (если уже посчитаны)
+        """
+        shared = shared or self.calculate_scheme_independent_terms(frozenset())
+        net_profit = shared.net_profit - self.calculate_ozon_reward(as_bands(commission).rate(self.price))
+        headroom = net_profit - self.price * target_margin_pct / Decimal('100')
+
+        def floor(value: Decimal) -> Decimal:
+            return value.quantize(Decimal('0.01'), rounding=ROUND_FLOOR)
+
+        result = {
+            'target_margin': target_margin_pct,
+            'net_profit_per_unit': round(net_profit, 2),
+            'max_cost_price': floor(self.cost_price + headroom),
+            'max_other_costs': floor(self.other_costs + headroom),
+            'max_ad_costs_rate': floor((self.ad_costs_rate + headroom / self.price) * Decimal('100')),
+        }
+        if monthly_profit_goal is not None:
+            result['monthly_profit_goal'] = monthly_profit_goal
+            result['required_monthly_sales'] = (
+                int((monthly_profit_goal / net_profit).to_integral_value(rounding=ROUND_CEILING))
+                if net_profit > 0 else None
+            )
+        return result
+
+    def calculate_inverse(self, target_margin_pct: Decimal = Decimal('20'),
+                          monthly_profit_goal: Optional[Decimal] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Обратные задачи (solve_inverse) для обеих схем работы
+        """
+        shared = self.calculate_scheme_independent_terms(frozenset())
+        return {
+            f'{scheme.lower()}_results': {
+                'scheme': scheme,
+                **self.solve_inverse(self.category.bands(scheme), target_margin_pct, monthly_profit_goal, shared),
+            }
+            for scheme in ('FBO', 'FBS')
+        }
+
+    def compare_packaging(self, variants: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Сравнение вариантов упаковки товара по чистой прибыли за штуку
+
+        От объема зависит только базовый тариф логистики, а через него - обработка
+        и доставка и возвраты. Эквайринг, процент от цены за время доставки, налог,
+        реклама и комиссии схем считаются один раз, для варианта - только логистика.
+        Комиссия от объема не зависит, поэтому порядок вариантов одинаков для FBO и FBS:
+        по убыванию прибыли за штуку, при равной прибыли - в порядке ввода.
+
+        Args:
+            variants: Варианты упаковки: объем в литрах (volume) и необязательное имя (name)
+
+        Returns:
+            dict: current - текущая упаковка товара, variants - варианты по рангу
+                с разницей прибыли за штуку относительно текущей упаковки
+        """
+        shared = self.calculate_scheme_independent_terms(frozenset())
+        not_buyout_share = max(Decimal('1') - self.buyout_rate, Decimal('0'))
+        rewards = {
+            scheme: self.calculate_ozon_reward(self.category.bands(scheme).rate(self.price))
+            for scheme in ('FBO', 'FBS')
+        }
+
+        def calc_percent(value: Decimal) -> Decimal:
+            if self.price == 0:
+                return Decimal('0')
+            return (value / self.price) * Decimal('100')
+
+        def evaluate(volume: Decimal) -> Tuple[Decimal, Dict[str, Any]]:
+            # Те же формулы, что в calculate_scheme_independent_terms, с объемом варианта
+            base_logistics = self.tariff.base_logistics(volume, self.price)
+            processing_delivery = (base_logistics * shared.time_coeff) + shared.price_component
+            returns_cancellations = base_logistics * not_buyout_share
+            ozon_costs = shared.acquiring + processing_delivery + returns_cancellations
+            net_without_commission = (self.price - ozon_costs - self.cost_price - shared.profit_tax
+                                      - shared.ad_costs - self.other_costs)
+            entry = {
+                'volume': round(volume, 3),
+                'base_logistics': round(base_logistics, 2),
+                'processing_delivery': -round(processing_delivery, 2),
+                'returns_cancellations': -round(returns_cancellations, 2),
+            }
+            for scheme, ozon_reward in rewards.items():
+                net_profit = net_without_commission - ozon_reward
+                entry[f'{scheme.lower()}_results'] = {
+                    'net_profit_per_unit': round(net_profit, 2),
+                    'net_profit_per_unit_percent': round(calc_percent(net_profit), 2),
+                }
+            return net_without_commission, entry
+
+        current_net, current = evaluate(self.volume)
+        evaluated = []
+        for index, variant in enumerate(variants):
+            net, entry = evaluate(variant['volume'])
+            entry.update(index=index, name=variant.get('name'), net_profit_delta=round(net - current_net, 2))
+            evaluated.append((net, entry))
+
+        # sorted() устойчива: варианты с равной прибылью остаются в порядке ввода
+        ranked = [entry for _, entry in sorted(evaluated, key=lambda item: item[0], reverse=True)]
+        for rank, entry in enumerate(ranked, start=1):
+            entry['rank'] = rank
+        return {'current': current, 'variants': ranked}
+
+    def calculate_all(self, sections: FrozenSet[str] = ALL_SECTIONS) -> Dict[str, Dict[str, Any]]:
+        """
+        Расчет для обеих схем работы (FBO и FBS)
+
+        Args:
+            sections: Разделы результата (RESULT_SECTIONS); по умолчанию - все
+        """
+        # Общая для схем часть считается один раз, схемы добавляют только свою комиссию
+        shared = self.calculate_scheme_independent_terms(sections)
+        fbo_results = self.calculate_for_scheme(self.category.bands('FBO'), 'FBO', shared, sections)
+        fbs_results = self.calculate_for_scheme(self.category.bands('FBS'), 'FBS', shared, sections)
+        
+        return {
+            'fbo_results': fbo_results,
+            'fbs_results': fbs_results,
+        }
@@ -0,0 +1,216 @@
+"""
+Быстрый режим скалярного расчета: решатели цены в float64 с перепроверкой через Decimal.
+
+Самая тяжелая арифметика скалярного расчета - поиск точки безубыточности
+и целевых цен (раздел targets): решатель solve_price воспроизводит бисекцию
+в Decimal. В быстром режиме корни участков и ветвление ищутся в float,
+а результат округляется до копеек. Если float не может однозначно повторить
+Decimal-решатель (корень у границы округления …,xx5 или у границы участка,
+предикат сменяется с «да» на «нет»), цена пересчитывается Decimal-решателем, поэтому
+опубликованные значения совпадают с Decimal-расчетом знак в знак.
+
+Остальные разделы считаются ядром в Decimal: округление Decimal выполняется
+в C (libmpdec) и стоит не дороже, чем перевод float в опубликованный Decimal.
+
+Режим включается настройкой CALCULATOR_ENGINE=float. Доля расчетов
+CALCULATOR_FLOAT_VERIFY_RATE целиком сверяется с Decimal-расчетом; счетчики
+перепроверок и расхождений выводятся на эндпоинт метрик.
+"""
+
+from decimal import Decimal
+from random import random
+from threading import Lock
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from .engine import ALL_SECTIONS, OzonCalculatorCore
+from .solvers import (
+    BISECTION_ITERATIONS, LOWER_BOUND_SEGMENT, UPPER_BOUND_SEGMENT, PriceSegment, SolverResult,
+)
+
+
+# Запас до границы округления в копейках: абсолютный и относительный
+# (погрешность float растет с величиной значения)
+BOUNDARY_ABS_EPSILON = 1e-6
+BOUNDARY_REL_EPSILON = 1e-12
+# Относительный запас при сравнении корня с границами участков
+SEGMENT_EPSILON = 1e-9
+
+_CENT = Decimal('0.01')
+
+
+class FloatEngineStats:
+    """
+    Счетчики быстрого режима для эндпоинта метрик
+    """
+
+    def __init__(self):
+        self.calculations = 0
+        self.solves = 0
+        self.rechecks = 0
+        self.verified = 0
+        self.mismatches = 0
+        self._lock = Lock()
+
+    def record(self, solves: int, rechecks: int, verified: bool, mismatch: bool):
+        with self._lock:
+            self.calculations += 1
+            self.solves += solves
+            self.rechecks += rechecks
+            self.verified += verified
+            self.mismatches += mismatch
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'calculations': self.calculations,
+                'solves': self.solves,
+                'rechecks': self.rechecks,
+                'recheck_rate': round(self.rechecks / self.solves, 4) if self.solves else None,
+                'verified': self.verified,
+                'mismatches': self.mismatches,
+            }
+
+
+float_engine_stats = FloatEngineStats()
+
+
+def same_result(left, right) -> bool:
+    """
+    Совпадение результатов знак в знак (Decimal сравниваются с учетом знака нуля и экспоненты)
+    """
+    if isinstance(left, dict):
+        return (isinstance(right, dict) and left.keys() == right.keys()
+                and all(same_result(left[key], right[key]) for key in left))
+    if isinstance(left, list):
+        return (isinstance(right, list) and len(left) == len(right)
+                and all(same_result(a, b) for a, b in zip(left, right)))
+    if isinstance(left, Decimal):
+        return isinstance(right, Decimal) and left.as_tuple() == right.as_tuple()
+    return left == right
+
+
+def solve_price_fast(segments: List[PriceSegment], low: Decimal, high: Decimal,
+                     iterations: int = BISECTION_ITERATIONS) -> Optional[SolverResult]:
+    """
+    solve_price в float для функции с не более чем одним переходом «нет → да»
+
+    Наклон участков может быть любого знака (доля рекламы делает его
+    отрицательным): важен только знак функции на концах участков.
+
+    Границы диапазона поиска должны быть целыми копейками. Возвращает цену,
+    уже округленную до копеек (как round(solve_price(...).price, 2)), или None,
+    если результат нужно получить Decimal-решателем.
+    """
+    low_f, high_f = float(low), float(high)
+
+    # Знак функции по участкам слева направо и точка единственного перехода
+    state = None
+    transition = None
+    previous_label = None
+    for segment in segments:
+        start = low_f if segment.lower is None else max(float(segment.lower), low_f)
+        end = high_f if segment.upper is None else min(float(segment.upper), high_f)
+        if start >= end:
+            continue
+        if segment.slope == 0:
+            # Постоянная функция: знак участка - знак intercept (ноль зависит от strict)
+            if segment.intercept == 0:
+                return None
+            root = None
+            positive = positive_end = segment.intercept > 0
+        else:
+            slope = float(segment.slope)
+            root = -float(segment.intercept) / slope
+            margin = SEGMENT_EPSILON * (abs(root) + 1)
+            if abs(root - start) < margin or abs(root - end) < margin:
+                return None
+            # Знак сразу после начала участка и на его конце
+            if slope > 0:
+                positive, positive_end = root < start, root < end
+            else:
+                positive, positive_end = root > start, root > end
+
+        # Переход на границе относится к предыдущему участку (цена ≤ upper)
+        if state is not None and positive != state:
+            if state or transition is not None:
+                return None
+            transition = (segment.lower, previous_label)
+        if positive != positive_end:
+            # Убывание внутри участка дает переход «да → нет» - бисекцию повторяет Decimal-решатель
+            if positive or transition is not None:
+                return None
+            transition = (root, segment.label)
+        state = positive_end
+        previous_label = segment.label
+
+    if state is None:
+        return None
+    if transition is None:
+        # Знак не меняется: бисекция сходится к границе диапазона поиска
+        if (high_f - low_f) / 2 ** (iterations + 1) >= 0.004:
+            return None
+        if state:
+            return SolverResult(round(low, 2), LOWER_BOUND_SEGMENT)
+        return SolverResult(round(high, 2), UPPER_BOUND_SEGMENT)
+
+    point, label = transition
+    if isinstance(point, Decimal):
+        # Граница участков (порог тарифа) - точное значение
+        return SolverResult(point, label) if round(point, 2) == point else None
+
+    # Бисекция может остановиться в пределах (high - low) / 2^iterations от корня
+    scaled = point * 100
+    units = round(scaled)
+    tolerance = (BOUNDARY_ABS_EPSILON + abs(scaled) * BOUNDARY_REL_EPSILON
+                 + (high_f - low_f) * 100 / 2 ** iterations)
+    if 0.5 - abs(scaled - units) < tolerance:
+        return None
+    return SolverResult(_CENT * units, label)
+
+
+class FloatCalculatorCore(OzonCalculatorCore):
+    """
+    Ядро расчета с решателями цены в float64
+
+    Результат calculate_all() совпадает с OzonCalculatorCore знак в знак.
+    """
+
+    def __init__(self, *args, verify_rate: float = 0.0, **kwargs):
+        """
+        Args:
+            verify_rate: Доля расчетов, целиком сверяемых с Decimal-расчетом
+            *args, **kwargs: Параметры, как у OzonCalculatorCore
+        """
+        super().__init__(*args, **kwargs)
+        self.verify_rate = verify_rate
+        self.fast_solver = True
+        self.solves = 0
+        self.rechecks = 0
+        low, high = self._price_search_bounds()
+        # Быстрый решатель требует границ поиска в целых копейках
+        self._fast_bounds = (low, high) if round(low, 2) == low and round(high, 2) == high else None
+
+    def calculate_all(self, sections: FrozenSet[str] = ALL_SECTIONS) -> Dict[str, Dict[str, Any]]:
+        solves, rechecks = self.solves, self.rechecks
+        results = super().calculate_all(sections)
+
+        verified = self.verify_rate > 0 and random() < self.verify_rate
+        mismatch = False
+        if verified:
+            self.fast_solver = False
+            try:
+                mismatch = not same_result(results, super().calculate_all(sections))
+            finally:
+                self.fast_solver = True
+        float_engine_stats.record(self.solves - solves, self.rechecks - rechecks, verified, mismatch)
+        return results
+
+    def _solve_price(self, segments: List[PriceSegment], strict: bool) -> SolverResult:
+        if not self.fast_solver:
+            return super()._solve_price(segments, strict)
+        self.solves += 1
+        result = solve_price_fast(segments, *self._fast_bounds) if self._fast_bounds else None
+        if result is None:
+            self.rechecks += 1
+            result = super()._solve_price(segments, strict)
+        return result
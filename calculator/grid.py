@@ -0,0 +1,108 @@
+"""
+Плотная сетка чувствительности прибыли: цена × процент выкупа × время доставки.
+
+Прибыль за штуку раскладывается на слагаемые, каждое из которых зависит не
+более чем от двух осей:
+
+    net[p, b, h] = linear[p] - returns[p, b] - logistics[p, h]
+
+linear - все, что линейно по цене (комиссия, эквайринг, налог, реклама) и постоянные
+затраты; returns - базовый тариф × доля невыкупа; logistics - базовый тариф ×
+коэффициент времени доставки и процент от цены. Ставка комиссии берется по
+ценовому диапазону каждой точки оси цены. Слагаемые считаются один раз
+по своим осям, а ячейка сетки - одно вычитание при broadcast. Арифметика -
+целочисленная с фиксированной точкой, как в calculator.batch, поэтому значения
+совпадают со скалярным расчетом до копейки.
+"""
+
+from decimal import Decimal
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+from .batch import (
+    HUNDREDTHS, KOPECKS, NANOLITERS, UNITS_PER_KOPECK, _div_round, _to_fixed, fixed_point_tariff,
+)
+from .engine import CommissionBands, as_bands
+from .tariffs import CompiledTariff, get_default_tariff
+
+
+# Показатели, которые можно запросить для ячеек сетки
+GRID_METRICS = ('net_profit_per_unit', 'net_profit_per_unit_percent')
+
+
+class SensitivityGrid:
+    """
+    Сетка чистой прибыли за штуку по трем осям для одного товара
+
+    Параметры товара - в тех же единицах, что и у OzonCalculator (рубли, литры,
+    проценты); оси - последовательности значений цены (руб.), выкупа (%)
+    и времени доставки (часы); tariff - версия тарифа (по умолчанию - действующая).
+    """
+
+    def __init__(self, volume, tax_rate, ad_costs_rate, cost_price, other_costs,
+                 prices: Sequence, buyout_rates: Sequence, delivery_hours: Sequence,
+                 tariff: CompiledTariff = None):
+        self.prices = _to_fixed(prices, KOPECKS)
+        self.buyout_rates = _to_fixed(buyout_rates, HUNDREDTHS)
+        self.delivery_hours = np.asarray(delivery_hours, dtype=np.int64)
+        self.shape = (len(self.prices), len(self.buyout_rates), len(self.delivery_hours))
+
+        tariff = fixed_point_tariff(tariff or get_default_tariff())
+        tax_rate = int(_to_fixed(tax_rate, HUNDREDTHS))
+        ad_costs_rate = int(_to_fixed(ad_costs_rate, HUNDREDTHS))
+        fixed_costs = int(_to_fixed(cost_price, KOPECKS) + _to_fixed(other_costs, KOPECKS)) * UNITS_PER_KOPECK
+        base_under, base_over = tariff.base_logistics(_to_fixed([volume], NANOLITERS))
+
+        # Ось цены: цена в 1e-4 руб. и базовый тариф (зависит от порога цены)
+        self.price4 = self.prices * 100
+        base = np.where(self.prices <= tariff.threshold, base_under[0], base_over[0])
+
+        # Часть линейного слагаемого без комиссии: эквайринг, налог, реклама и постоянные затраты
+        self._price_without_commission = (
+            self.price4 * (10000 - tariff.acquiring - tax_rate - ad_costs_rate) - fixed_costs
+        )
+
+        # Цена × выкуп: обратная логистика
+        not_buyout = np.maximum(10000 - self.buyout_rates, 0)
+        self._returns = base[:, None] * (not_buyout * 100)[None, :]
+
+        # Цена × время доставки: базовый тариф × коэффициент + процент от цены
+        coeff, delivery_percent = tariff.delivery_adjustments(self.delivery_hours)
+        self._logistics = base[:, None] * (coeff * 1000)[None, :] + self.price4[:, None] * delivery_percent[None, :]
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def commission_rates(self, commission: Union[Decimal, CommissionBands]) -> np.ndarray:
+        """
+        Ставка комиссии (сотые доли процента) для каждой точки оси цены
+        """
+        bands = as_bands(commission)
+        edges = _to_fixed(bands.edges, KOPECKS)
+        return _to_fixed(bands.rates, HUNDREDTHS)[np.searchsorted(edges, self.prices, side='left')]
+
+    def net_units(self, commission: Union[Decimal, CommissionBands]) -> np.ndarray:
+        """
+        Чистая прибыль за штуку (единицы 1e-8 руб.), матрица цена × выкуп × часы
+        """
+        linear = self._price_without_commission - self.price4 * self.commission_rates(commission)
+        return linear[:, None, None] - self._returns[:, :, None] - self._logistics[:, None, :]
+
+    def calculate(self, commission, metrics: Sequence[str] = GRID_METRICS) -> Dict[str, np.ndarray]:
+        """
+        Прибыль за штуку (копейки) и/или маржа (сотые доли процента) для комиссии схемы
+        (одна ставка в процентах или CommissionBands)
+        """
+        net = self.net_units(commission)
+        columns = {}
+        if 'net_profit_per_unit' in metrics:
+            columns['net_profit_per_unit'] = _div_round(net, UNITS_PER_KOPECK)
+        if 'net_profit_per_unit_percent' in metrics:
+            price4 = self.price4[:, None, None]
+            positive = price4 > 0
+            columns['net_profit_per_unit_percent'] = np.where(
+                positive, _div_round(net, np.where(positive, price4, 1)), 0
+            )
+        return columns
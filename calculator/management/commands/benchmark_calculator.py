@@ -0,0 +1,323 @@
+"""
+Management команда для замера производительности движка расчета.
+
+Использование:
+    python manage.py benchmark_calculator
+    python manage.py benchmark_calculator --rows 50000 --scalar-rows 500
+
+Сравнивает пропускную способность скалярного OzonCalculatorCore
+и векторизованного BatchCalculator на случайном каталоге товаров,
+скорость поиска по скомпилированным тарифам с линейным проходом таблиц,
+выигрыш от общего для FBO и FBS расчета в скалярном ядре, быстрый режим
+с решателями цены в float64, время построения сетки чувствительности
+цена × выкуп × время доставки и моделирования риска методом Монте-Карло.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from decimal import Decimal
+from functools import partial
+import time
+
+import numpy as np
+
+from categories.models import Category
+from calculator.engine import CategoryCommissions, OzonCalculatorCore
+from calculator.batch import BatchCalculator, CommissionColumns
+from calculator.fastpath import FloatCalculatorCore, same_result
+from calculator.grid import SensitivityGrid
+from calculator.simulation import DEFAULT_SAMPLES, MonteCarloSimulation
+from calculator.tariffs import get_default_tariff
+
+
+class Command(BaseCommand):
+    help = 'Замеряет производительность скалярного и пакетного расчета юнит-экономики'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=20000,
+            help='Количество товаров для пакетного расчета (по умолчанию: 20000)'
+        )
+        parser.add_argument(
+            '--scalar-rows',
+            type=int,
+            default=200,
+            help='Количество товаров для скалярного расчета (по умолчанию: 200)'
+        )
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=100000,
+            help='Количество поисков по тарифам в микробенчмарке (по умолчанию: 100000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed генератора случайных данных'
+        )
+
+    def handle(self, *args, **options):
+        category = Category.objects.first()
+        if category is None:
+            raise CommandError('В базе нет категорий. Выполните python manage.py load_categories')
+
+        commissions = CategoryCommissions.from_category(category)
+        rows = options['rows']
+        catalog = self._random_catalog(rows, options['seed'])
+
+        # Скалярный расчет на подвыборке
+        scalar_rows = min(options['scalar_rows'], rows)
+        started = time.perf_counter()
+        for index in range(scalar_rows):
+            OzonCalculatorCore(
+                commissions,
+                weight=Decimal('1'),
+                **{key: self._to_decimal(key, values[index]) for key, values in catalog.items()}
+            ).calculate_all()
+        scalar_per_row = (time.perf_counter() - started) / scalar_rows
+
+        # Пакетный расчет на всем каталоге
+        started = time.perf_counter()
+        BatchCalculator(
+            fbo_commission=CommissionColumns.from_bands([commissions.bands('FBO')] * rows),
+            fbs_commission=CommissionColumns.from_bands([commissions.bands('FBS')] * rows),
+            **catalog
+        ).calculate_all()
+        batch_per_row = (time.perf_counter() - started) / rows
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Скалярный расчет: {scalar_per_row * 1e6:10.1f} мкс/товар ({scalar_rows} товаров)')
+        self.stdout.write(f'Пакетный расчет:  {batch_per_row * 1e6:10.1f} мкс/товар ({rows} товаров)')
+        self.stdout.write(self.style.SUCCESS(f'Ускорение: {scalar_per_row / batch_per_row:.0f}×'))
+        self.stdout.write('=' * 60)
+
+        self._benchmark_tariff_lookups(options['lookups'], options['seed'])
+        self._benchmark_scheme_sharing(commissions, catalog, scalar_rows)
+        self._benchmark_float_engine(commissions, catalog, scalar_rows)
+        self._benchmark_grid(commissions)
+        self._benchmark_simulation(commissions, options['seed'])
+
+    def _benchmark_tariff_lookups(self, lookups, seed):
+        """
+        Поиск по скомпилированным тарифам против линейного прохода по таблицам
+        """
+        rng = np.random.default_rng(seed)
+        volumes = [Decimal(str(value)) for value in rng.integers(1, 250_000, lookups) / 1000]
+        hours = [int(value) for value in rng.integers(1, 80, lookups)]
+        prices = [Decimal('250'), Decimal('1000')] * (lookups // 2 + 1)
+        tariff = get_default_tariff()
+
+        def measure(lookup, *columns):
+            started = time.perf_counter()
+            for values in zip(*columns):
+                lookup(*values)
+            return (time.perf_counter() - started) / lookups
+
+        rows = [
+            ('Время доставки', measure(partial(_linear_delivery_adjustments, tariff), hours),
+             measure(tariff.delivery_adjustments, hours)),
+            ('Базовая логистика', measure(partial(_linear_base_logistics, tariff), volumes, prices),
+             measure(tariff.base_logistics, volumes, prices)),
+        ]
+
+        self.stdout.write(f'Поиск по тарифам ({lookups} поисков):')
+        for label, linear, compiled in rows:
+            self.stdout.write(
+                f'  {label:<18} таблица: {linear * 1e9:8.0f} нс, '
+                f'скомпилированный: {compiled * 1e9:8.0f} нс, ускорение {linear / compiled:.1f}×'
+            )
+        self.stdout.write('=' * 60)
+
+    def _benchmark_scheme_sharing(self, commissions, catalog, rows):
+        """
+        calculate_all с общей для схем частью против двух независимых
+        calculate_for_scheme, каждая из которых считает все заново
+        """
+        calculators = [
+            OzonCalculatorCore(
+                commissions,
+                weight=Decimal('1'),
+                **{key: self._to_decimal(key, values[index]) for key, values in catalog.items()}
+            )
+            for index in range(rows)
+        ]
+
+        def separate(calculator):
+            calculator.calculate_for_scheme(commissions.bands('FBO'), 'FBO')
+            calculator.calculate_for_scheme(commissions.bands('FBS'), 'FBS')
+
+        def measure(calculate):
+            best = None
+            for _ in range(3):
+                started = time.perf_counter()
+                for calculator in calculators:
+                    calculate(calculator)
+                elapsed = (time.perf_counter() - started) / rows
+                best = elapsed if best is None else min(best, elapsed)
+            return best
+
+        separate_per_row = measure(separate)
+        shared_per_row = measure(lambda calculator: calculator.calculate_all())
+
+        self.stdout.write(f'Общая часть FBO/FBS ({rows} товаров, лучшее из 3):')
+        self.stdout.write(f'  Схемы по отдельности: {separate_per_row * 1e6:10.1f} мкс/товар')
+        self.stdout.write(f'  Общая часть один раз: {shared_per_row * 1e6:10.1f} мкс/товар')
+        self.stdout.write(self.style.SUCCESS(f'  Ускорение: {separate_per_row / shared_per_row:.2f}×'))
+        self.stdout.write('=' * 60)
+
+    def _benchmark_float_engine(self, commissions, catalog, rows):
+        """
+        calculate_all в Decimal против быстрого режима с решателями в float64
+        и проверка, что результаты совпадают знак в знак
+        """
+        def calculators(core_class):
+            return [
+                core_class(
+                    commissions,
+                    weight=Decimal('1'),
+                    **{key: self._to_decimal(key, values[index]) for key, values in catalog.items()}
+                )
+                for index in range(rows)
+            ]
+
+        def measure(items):
+            best = None
+            for _ in range(3):
+                started = time.perf_counter()
+                results = [calculator.calculate_all() for calculator in items]
+                elapsed = (time.perf_counter() - started) / rows
+                best = elapsed if best is None else min(best, elapsed)
+            return best, results
+
+        decimal_per_row, decimal_results = measure(calculators(OzonCalculatorCore))
+        fast = calculators(FloatCalculatorCore)
+        float_per_row, float_results = measure(fast)
+        mismatches = sum(not same_result(a, b) for a, b in zip(float_results, decimal_results))
+        rechecks = sum(calculator.rechecks for calculator in fast)
+        solves = sum(calculator.solves for calculator in fast)
+
+        self.stdout.write(f'Быстрый режим float64 ({rows} товаров, лучшее из 3):')
+        self.stdout.write(f'  Decimal:        {decimal_per_row * 1e6:10.1f} мкс/товар')
+        self.stdout.write(f'  float64:        {float_per_row * 1e6:10.1f} мкс/товар')
+        self.stdout.write(f'  Перепроверки:   {rechecks} из {solves} решений, расхождений: {mismatches}')
+        style = self.style.SUCCESS if mismatches == 0 else self.style.ERROR
+        self.stdout.write(style(f'  Ускорение: {decimal_per_row / float_per_row:.2f}×'))
+        self.stdout.write('=' * 60)
+
+    def _benchmark_grid(self, commissions):
+        """
+        Сетка 100 цен × 21 выкуп × 33 часа против поячеечного скалярного расчета
+        """
+        prices = [Decimal(400) + Decimal(8) * index for index in range(100)]
+        buyout_rates = list(range(80, 101))
+        delivery_hours = list(range(29, 62))
+        product = {
+            'volume': Decimal('1.296'), 'tax_rate': Decimal('6'), 'ad_costs_rate': Decimal('10'),
+            'cost_price': Decimal('215'), 'other_costs': Decimal('10'),
+        }
+
+        started = time.perf_counter()
+        grid = SensitivityGrid(prices=prices, buyout_rates=buyout_rates, delivery_hours=delivery_hours, **product)
+        grid.calculate(commissions.bands('FBO'))
+        grid.calculate(commissions.bands('FBS'))
+        grid_time = time.perf_counter() - started
+
+        # Скалярное ядро на выборке ячеек, с экстраполяцией на всю сетку
+        sample = 200
+        started = time.perf_counter()
+        for index in range(sample):
+            OzonCalculatorCore(
+                commissions,
+                price=prices[index % len(prices)],
+                weight=Decimal('1'),
+                buyout_rate=Decimal(buyout_rates[index % len(buyout_rates)]),
+                delivery_time=delivery_hours[index % len(delivery_hours)],
+                monthly_sales=1,
+                **product
+            ).calculate_all(frozenset({'summary'}))
+        scalar_time = (time.perf_counter() - started) / sample * grid.size
+
+        self.stdout.write(f'Сетка чувствительности {"×".join(map(str, grid.shape))} ({grid.size} ячеек, FBO и FBS):')
+        self.stdout.write(f'  Сетка:             {grid_time * 1e3:10.1f} мс')
+        self.stdout.write(f'  Скалярно (оценка): {scalar_time * 1e3:10.1f} мс')
+        self.stdout.write(self.style.SUCCESS(f'  Ускорение: {scalar_time / grid_time:.0f}×'))
+        self.stdout.write('=' * 60)
+
+    def _benchmark_simulation(self, commissions, seed):
+        """
+        Монте-Карло: 100 000 сценариев цены, себестоимости, выкупа и времени доставки
+        """
+        product = {
+            'price': Decimal('805'), 'volume': Decimal('1.296'), 'tax_rate': Decimal('6'),
+            'ad_costs_rate': Decimal('10'), 'buyout_rate': Decimal('90'), 'delivery_time': 45,
+            'cost_price': Decimal('215'), 'other_costs': Decimal('10'), 'monthly_sales': 1000,
+        }
+        distributions = {
+            'price': {'distribution': 'triangular', 'low': 700, 'mode': 805, 'high': 850},
+            'buyout_rate': {'distribution': 'normal', 'mean': 88, 'std': 5},
+            'delivery_time': {'distribution': 'empirical', 'values': [29, 35, 45, 55, 61]},
+            'cost_price': {'distribution': 'uniform', 'low': 200, 'high': 230},
+        }
+
+        best = None
+        for _ in range(3):
+            started = time.perf_counter()
+            simulation = MonteCarloSimulation(commissions, product, distributions, seed=seed)
+            for scheme in ('FBO', 'FBS'):
+                simulation.summarize(scheme)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        self.stdout.write(f'Монте-Карло ({DEFAULT_SAMPLES} сценариев, FBO и FBS, лучшее из 3):')
+        self.stdout.write(f'  Время:             {best * 1e3:10.1f} мс')
+        self.stdout.write(f'  На сценарий:       {best / DEFAULT_SAMPLES * 1e9:10.0f} нс')
+        self.stdout.write('=' * 60)
+
+    @staticmethod
+    def _random_catalog(rows, seed):
+        """
+        Случайный каталог товаров в точности сериализатора ввода
+        """
+        rng = np.random.default_rng(seed)
+        return {
+            'price': rng.integers(100, 5_000_000, rows) / 100,
+            'volume': rng.integers(1, 200_000, rows) / 1000,
+            'buyout_rate': rng.integers(5000, 10001, rows) / 100,
+            'delivery_time': rng.integers(1, 80, rows),
+            'tax_rate': rng.integers(0, 2001, rows) / 100,
+            'ad_costs_rate': rng.integers(0, 3001, rows) / 100,
+            'cost_price': rng.integers(0, 1_000_000, rows) / 100,
+            'other_costs': rng.integers(0, 10_000, rows) / 100,
+            'monthly_sales': rng.integers(1, 1000, rows),
+        }
+
+    @staticmethod
+    def _to_decimal(key, value):
+        if key in ('delivery_time', 'monthly_sales'):
+            return int(value)
+        return Decimal(str(value))
+
+
+def _linear_delivery_adjustments(tariff, hours):
+    """
+    Эталон: линейный проход по таблице коэффициентов времени доставки
+    """
+    for table_hours, coeff, percent in tariff.delivery_coefficients:
+        if hours <= table_hours:
+            return (coeff, percent)
+    return tariff.delivery_coefficients[-1][1:]
+
+
+def _linear_base_logistics(tariff, volume, price):
+    """
+    Эталон: линейный проход по таблице логистики до порога цены и шкала свыше порога
+    """
+    if price <= tariff.price_threshold:
+        for max_volume, cost in tariff.logistics_table_under:
+            if volume <= max_volume:
+                return cost
+        return tariff.max_cost_under
+    volume_rounded = int(volume.to_integral_value(rounding='ROUND_UP'))
+    return tariff.over_scale(min(max(volume_rounded, 0), tariff.MAX_VOLUME_LITERS))
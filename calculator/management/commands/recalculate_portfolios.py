@@ -0,0 +1,43 @@
+"""
+Management команда для полного пересчета портфелей товаров.
+
+Использование:
+    python manage.py recalculate_portfolios
+    python manage.py recalculate_portfolios --portfolio 3
+
+Итоги портфелей обновляются инкрементально при изменении товаров и категорий.
+Команда пересчитывает товары и итоги заново - после смены файла тарифов
+(TARIFF_FILE) или правок таблиц портфелей в обход API.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from calculator.models import Portfolio
+from calculator.portfolio import recalculate_portfolio
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает товары и итоги портфелей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--portfolio',
+            type=int,
+            help='ID портфеля (по умолчанию - все портфели)'
+        )
+
+    def handle(self, *args, **options):
+        portfolios = Portfolio.objects.order_by('pk')
+        if options['portfolio'] is not None:
+            portfolios = portfolios.filter(pk=options['portfolio'])
+            if not portfolios.exists():
+                raise CommandError(f'Портфель с ID {options["portfolio"]} не найден')
+
+        for portfolio in portfolios:
+            started = time.perf_counter()
+            count = recalculate_portfolio(portfolio)
+            self.stdout.write(
+                f'{portfolio}: пересчитано товаров {count} за {time.perf_counter() - started:.2f} с'
+            )
+        self.stdout.write(self.style.SUCCESS('Пересчет портфелей завершен'))
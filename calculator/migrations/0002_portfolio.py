@@ -0,0 +1,84 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0004_category_commission_bands'),
+        ('calculator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Portfolio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Название портфеля')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Портфель',
+                'verbose_name_plural': 'Портфели',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PortfolioItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=100, verbose_name='Артикул')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена товара (руб.)')),
+                ('weight', models.DecimalField(decimal_places=3, max_digits=10, verbose_name='Вес товара (кг)')),
+                ('volume', models.DecimalField(decimal_places=9, max_digits=19, verbose_name='Объем товара (л)')),
+                ('tax_rate', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Налог на прибыль (%)')),
+                ('buyout_rate', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Выкуп (%)')),
+                ('delivery_time', models.IntegerField(verbose_name='Время доставки (часы)')),
+                ('ad_costs_rate', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Доля рекламных расходов (%)')),
+                ('cost_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Себестоимость за 1 шт (руб.)')),
+                ('other_costs', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Прочие затраты на 1 шт (руб.)')),
+                ('monthly_sales', models.IntegerField(verbose_name='Количество продаж в месяц (шт)')),
+                ('tariff_version', models.CharField(max_length=100, verbose_name='Версия тарифа')),
+                ('category_group', models.CharField(blank=True, default='', max_length=255, verbose_name='Группа категории')),
+                ('fbo_net_profit_per_unit', models.BigIntegerField(verbose_name='Прибыль за штуку FBO (коп.)')),
+                ('fbo_net_profit_total', models.BigIntegerField(verbose_name='Прибыль за месяц FBO (коп.)')),
+                ('fbo_margin', models.BigIntegerField(verbose_name='Маржа FBO (сотые доли %)')),
+                ('fbs_net_profit_per_unit', models.BigIntegerField(verbose_name='Прибыль за штуку FBS (коп.)')),
+                ('fbs_net_profit_total', models.BigIntegerField(verbose_name='Прибыль за месяц FBS (коп.)')),
+                ('fbs_margin', models.BigIntegerField(verbose_name='Маржа FBS (сотые доли %)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='categories.category', verbose_name='Категория товара')),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='calculator.portfolio', verbose_name='Портфель')),
+            ],
+            options={
+                'verbose_name': 'Товар портфеля',
+                'verbose_name_plural': 'Товары портфеля',
+                'ordering': ['portfolio', 'sku'],
+                'indexes': [models.Index(fields=['category'], name='calculator__categor_c625e9_idx')],
+                'unique_together': {('portfolio', 'sku')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PortfolioAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_group', models.CharField(blank=True, default='', max_length=255, verbose_name='Группа категории')),
+                ('scheme', models.CharField(max_length=3, verbose_name='Схема работы')),
+                ('margin_bucket', models.CharField(max_length=20, verbose_name='Диапазон маржи')),
+                ('sku_count', models.IntegerField(default=0, verbose_name='Количество товаров')),
+                ('monthly_sales', models.BigIntegerField(default=0, verbose_name='Продаж в месяц (шт)')),
+                ('monthly_revenue', models.BigIntegerField(default=0, verbose_name='Выручка за месяц (коп.)')),
+                ('monthly_net_profit', models.BigIntegerField(default=0, verbose_name='Чистая прибыль за месяц (коп.)')),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aggregates', to='calculator.portfolio', verbose_name='Портфель')),
+            ],
+            options={
+                'verbose_name': 'Итоги портфеля',
+                'verbose_name_plural': 'Итоги портфелей',
+                'ordering': ['portfolio', 'category_group', 'scheme', 'margin_bucket'],
+                'unique_together': {('portfolio', 'category_group', 'scheme', 'margin_bucket')},
+            },
+        ),
+    ]
@@ -107,3 +107,124 @@ class Calculation(models.Model):
 
     def __str__(self):
         return f"Расчет #{self.id} - {self.category.name} ({self.created_at.strftime('%d.%m.%Y %H:%M')})"
+
+
+class Portfolio(models.Model):
+    """
+    Портфель товаров (SKU) с агрегатами прибыли, которые обновляются инкрементально
+    """
+    name = models.CharField(
+        max_length=255,
+        verbose_name='Название портфеля'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Портфель'
+        verbose_name_plural = 'Портфели'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Портфель #{self.id} - {self.name}"
+
+
+class PortfolioItem(models.Model):
+    """
+    Товар портфеля: параметры расчета и рассчитанная прибыль по схемам
+
+    Суммы хранятся в копейках (целыми), проценты - в сотых долях процента,
+    чтобы инкрементальное обновление агрегатов не накапливало ошибок округления.
+    """
+    portfolio = models.ForeignKey(
+        Portfolio,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name='Портфель'
+    )
+    sku = models.CharField(
+        max_length=100,
+        verbose_name='Артикул'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        verbose_name='Категория товара'
+    )
+
+    # Параметры товара (как у проверенного ввода расчета)
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена товара (руб.)')
+    weight = models.DecimalField(max_digits=10, decimal_places=3, verbose_name='Вес товара (кг)')
+    volume = models.DecimalField(max_digits=19, decimal_places=9, verbose_name='Объем товара (л)')
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2, verbose_name='Налог на прибыль (%)')
+    buyout_rate = models.DecimalField(max_digits=5, decimal_places=2, verbose_name='Выкуп (%)')
+    delivery_time = models.IntegerField(verbose_name='Время доставки (часы)')
+    ad_costs_rate = models.DecimalField(max_digits=5, decimal_places=2, verbose_name='Доля рекламных расходов (%)')
+    cost_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Себестоимость за 1 шт (руб.)')
+    other_costs = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Прочие затраты на 1 шт (руб.)')
+    monthly_sales = models.IntegerField(verbose_name='Количество продаж в месяц (шт)')
+    tariff_version = models.CharField(max_length=100, verbose_name='Версия тарифа')
+
+    # Результаты расчета: группа категории на момент расчета (ключ агрегатов),
+    # прибыль за штуку, за месяц и маржа по схемам
+    category_group = models.CharField(max_length=255, blank=True, default='', verbose_name='Группа категории')
+    fbo_net_profit_per_unit = models.BigIntegerField(verbose_name='Прибыль за штуку FBO (коп.)')
+    fbo_net_profit_total = models.BigIntegerField(verbose_name='Прибыль за месяц FBO (коп.)')
+    fbo_margin = models.BigIntegerField(verbose_name='Маржа FBO (сотые доли %)')
+    fbs_net_profit_per_unit = models.BigIntegerField(verbose_name='Прибыль за штуку FBS (коп.)')
+    fbs_net_profit_total = models.BigIntegerField(verbose_name='Прибыль за месяц FBS (коп.)')
+    fbs_margin = models.BigIntegerField(verbose_name='Маржа FBS (сотые доли %)')
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Товар портфеля'
+        verbose_name_plural = 'Товары портфеля'
+        ordering = ['portfolio', 'sku']
+        unique_together = [['portfolio', 'sku']]
+        indexes = [
+            models.Index(fields=['category']),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} ({self.portfolio.name})"
+
+
+class PortfolioAggregate(models.Model):
+    """
+    Итоги портфеля по группе категорий, схеме и диапазону маржи
+
+    Обновляются приращениями при изменении товаров: чтение итогов портфеля
+    не зависит от числа товаров в нем.
+    """
+    portfolio = models.ForeignKey(
+        Portfolio,
+        on_delete=models.CASCADE,
+        related_name='aggregates',
+        verbose_name='Портфель'
+    )
+    category_group = models.CharField(max_length=255, blank=True, default='', verbose_name='Группа категории')
+    scheme = models.CharField(max_length=3, verbose_name='Схема работы')
+    margin_bucket = models.CharField(max_length=20, verbose_name='Диапазон маржи')
+    sku_count = models.IntegerField(default=0, verbose_name='Количество товаров')
+    monthly_sales = models.BigIntegerField(default=0, verbose_name='Продаж в месяц (шт)')
+    monthly_revenue = models.BigIntegerField(default=0, verbose_name='Выручка за месяц (коп.)')
+    monthly_net_profit = models.BigIntegerField(default=0, verbose_name='Чистая прибыль за месяц (коп.)')
+
+    class Meta:
+        verbose_name = 'Итоги портфеля'
+        verbose_name_plural = 'Итоги портфелей'
+        ordering = ['portfolio', 'category_group', 'scheme', 'margin_bucket']
+        unique_together = [['portfolio', 'category_group', 'scheme', 'margin_bucket']]
+
+    def __str__(self):
+        return f"{self.portfolio.name}: {self.category_group or '-'} / {self.scheme} / {self.margin_bucket}"
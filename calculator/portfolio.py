@@ -0,0 +1,376 @@
+"""
+Портфели товаров с инкрементальными итогами прибыли.
+
+Товары портфеля (PortfolioItem) хранятся вместе с рассчитанной прибылью по схемам,
+итоги (PortfolioAggregate) - по группе категорий, схеме и диапазону маржи. При
+изменении товара из итогов вычитается его прежний вклад и добавляется новый:
+изменение одного товара обновляет не больше четырех строк итогов, а чтение итогов
+не зависит от числа товаров. При изменении комиссий категории пересчитываются
+только товары этой категории.
+
+Прибыль считает пакетный движок calculator.batch (целочисленно, как OzonCalculatorCore);
+суммы в итогах - целые копейки, поэтому приращения складываются без ошибок округления.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Sum
+
+from categories.models import Category
+from .batch import KOPECKS, UNITS_PER_KOPECK, BatchCalculator, _div_round, _multiply_round, _percent_of
+from .engine import CategoryCommissions
+from .models import Portfolio, PortfolioAggregate, PortfolioItem
+from .tariffs import tariff_registry
+
+
+# Поля товара, которые хранятся в портфеле и идут в расчет
+ITEM_FIELDS = (
+    'price', 'weight', 'volume', 'tax_rate', 'buyout_rate', 'delivery_time',
+    'ad_costs_rate', 'cost_price', 'other_costs', 'monthly_sales', 'tariff_version',
+)
+
+# Диапазоны маржи (прибыль за штуку в % от цены): (название, нижняя граница включительно)
+MARGIN_BUCKETS = (
+    ('loss', None),
+    ('0-10', 0),
+    ('10-20', 10),
+    ('20-30', 20),
+    ('30+', 30),
+)
+
+# Поля товара, которые меняет пересчет
+RECALCULATED_FIELDS = (
+    'category_group',
+    'fbo_net_profit_per_unit', 'fbo_net_profit_total', 'fbo_margin',
+    'fbs_net_profit_per_unit', 'fbs_net_profit_total', 'fbs_margin',
+)
+
+# Суммы строки итогов (в порядке вклада товара, см. contributions())
+AGGREGATE_FIELDS = ('sku_count', 'monthly_sales', 'monthly_revenue', 'monthly_net_profit')
+
+# Измерения строк итогов
+AGGREGATE_DIMENSIONS = ('category_group', 'scheme', 'margin_bucket')
+
+SCHEMES = ('FBO', 'FBS')
+
+# Размер порции товаров для пакетного расчета и запросов к БД
+CHUNK_SIZE = 500
+
+
+def margin_bucket(margin: int) -> str:
+    """
+    Диапазон маржи по марже в сотых долях процента
+    """
+    bucket = MARGIN_BUCKETS[0][0]
+    for name, lower in MARGIN_BUCKETS[1:]:
+        if margin >= lower * 100:
+            bucket = name
+    return bucket
+
+
+def load_categories(category_ids: Iterable[int]) -> Dict[int, Category]:
+    """
+    Категории по ID одним запросом (комиссии и группы берутся из БД, а не из кэша,
+    чтобы пересчет после изменения категории видел новые значения)
+    """
+    return Category.objects.in_bulk(set(category_ids))
+
+
+def calculate_items(items: List[PortfolioItem], categories: Dict[int, Category]) -> None:
+    """
+    Пересчет прибыли товаров по схемам (поля результата заполняются на месте)
+
+    Args:
+        items: Товары с заполненными параметрами
+        categories: Категории товаров по ID
+    """
+    commissions = {
+        category_id: CategoryCommissions.from_category(category) for category_id, category in categories.items()
+    }
+    by_tariff = defaultdict(list)
+    for item in items:
+        by_tariff[item.tariff_version].append(item)
+
+    for version, group in by_tariff.items():
+        calculator = BatchCalculator.from_validated(
+            [dict({field: getattr(item, field) for field in ITEM_FIELDS}, category_id=item.category_id)
+             for item in group],
+            commissions, tariff_registry.get(version)
+        )
+        for scheme, commission in (('fbo', calculator.fbo_commission), ('fbs', calculator.fbs_commission)):
+            units = calculator.net_profit_units(commission)
+            per_unit = _div_round(units, UNITS_PER_KOPECK)
+            totals = _multiply_round(units, calculator.monthly_sales)
+            margins = _percent_of(units, calculator.price)
+            for row, item in enumerate(group):
+                setattr(item, f'{scheme}_net_profit_per_unit', int(per_unit[row]))
+                setattr(item, f'{scheme}_net_profit_total', int(totals[row]))
+                setattr(item, f'{scheme}_margin', int(margins[row]))
+        for item in group:
+            item.category_group = categories[item.category_id].category_group or ''
+
+
+def contributions(item: PortfolioItem) -> Iterable[Tuple[Tuple[str, str, str], Tuple[int, int, int, int]]]:
+    """
+    Вклад товара в итоги: (группа, схема, диапазон маржи) ->
+    (товаров, продаж, выручка, прибыль за месяц в копейках)
+    """
+    revenue = int(item.price * KOPECKS) * item.monthly_sales
+    for scheme in SCHEMES:
+        prefix = scheme.lower()
+        key = (item.category_group, scheme, margin_bucket(getattr(item, f'{prefix}_margin')))
+        yield key, (1, item.monthly_sales, revenue, getattr(item, f'{prefix}_net_profit_total'))
+
+
+class AggregateDeltas:
+    """
+    Накопленные приращения итогов портфелей (применяются одним проходом)
+    """
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [0, 0, 0, 0])
+
+    def add(self, item: PortfolioItem, sign: int = 1):
+        for key, values in contributions(item):
+            delta = self.deltas[(item.portfolio_id,) + key]
+            for position, value in enumerate(values):
+                delta[position] += sign * value
+
+    def remove(self, item: PortfolioItem):
+        self.add(item, -1)
+
+    def apply(self):
+        """
+        Применение приращений к строкам итогов (вызывается внутри транзакции)
+
+        Затронутые строки читаются одним запросом с блокировкой и записываются
+        пакетно: при изменении одного товара это не больше четырех строк.
+        """
+        deltas = {key: delta for key, delta in self.deltas.items() if any(delta)}
+        self.deltas.clear()
+        if not deltas:
+            return
+        existing = {
+            (aggregate.portfolio_id, aggregate.category_group, aggregate.scheme, aggregate.margin_bucket): aggregate
+            for aggregate in PortfolioAggregate.objects.select_for_update().filter(
+                portfolio_id__in={key[0] for key in deltas},
+                category_group__in={key[1] for key in deltas},
+            )
+        }
+        created, changed, emptied = [], [], []
+        for key, delta in deltas.items():
+            aggregate = existing.get(key)
+            if aggregate is None:
+                portfolio_id, group, scheme, bucket = key
+                aggregate = PortfolioAggregate(
+                    portfolio_id=portfolio_id, category_group=group, scheme=scheme, margin_bucket=bucket
+                )
+                created.append(aggregate)
+            else:
+                changed.append(aggregate)
+            for field, value in zip(AGGREGATE_FIELDS, delta):
+                setattr(aggregate, field, getattr(aggregate, field) + value)
+            # Строки, из которых ушли все товары, не нужны
+            if aggregate.sku_count == 0 and aggregate.pk is not None:
+                emptied.append(aggregate.pk)
+
+        PortfolioAggregate.objects.bulk_create(created, batch_size=CHUNK_SIZE)
+        PortfolioAggregate.objects.bulk_update(changed, AGGREGATE_FIELDS, batch_size=CHUNK_SIZE)
+        PortfolioAggregate.objects.filter(pk__in=emptied).delete()
+
+
+def save_items(portfolio: Portfolio, items: List[Dict[str, Any]],
+               categories: Optional[Dict[int, Category]] = None) -> Dict[str, int]:
+    """
+    Добавление или изменение товаров портфеля (по артикулу) с обновлением итогов
+
+    Args:
+        portfolio: Портфель
+        items: Проверенный ввод товаров (поля расчета, category_id и sku)
+        categories: Категории по ID (по умолчанию загружаются из БД)
+
+    Returns:
+        dict: Количество добавленных (created) и измененных (updated) товаров
+    """
+    if categories is None:
+        categories = load_categories(item['category_id'] for item in items)
+    # Повторный артикул во вводе - последнее значение
+    items = list({item['sku']: item for item in items}.values())
+    created = updated = 0
+
+    with transaction.atomic():
+        # Приращения итогов копятся по всем порциям и применяются один раз
+        deltas = AggregateDeltas()
+        for start in range(0, len(items), CHUNK_SIZE):
+            chunk = items[start:start + CHUNK_SIZE]
+            existing = {
+                item.sku: item
+                for item in portfolio.items.select_for_update().filter(sku__in=[data['sku'] for data in chunk])
+            }
+            new_items, changed_items = [], []
+            for data in chunk:
+                item = existing.get(data['sku'])
+                if item is None:
+                    item = PortfolioItem(portfolio=portfolio, sku=data['sku'])
+                    new_items.append(item)
+                else:
+                    deltas.remove(item)
+                    changed_items.append(item)
+                item.category_id = data['category_id']
+                for field in ITEM_FIELDS:
+                    setattr(item, field, data[field])
+
+            calculate_items(new_items + changed_items, categories)
+            for item in new_items + changed_items:
+                deltas.add(item)
+
+            PortfolioItem.objects.bulk_create(new_items, batch_size=CHUNK_SIZE)
+            PortfolioItem.objects.bulk_update(changed_items, RECALCULATED_FIELDS + ('category',) + ITEM_FIELDS)
+            created += len(new_items)
+            updated += len(changed_items)
+        deltas.apply()
+        portfolio.save(update_fields=['updated_at'])
+
+    return {'created': created, 'updated': updated}
+
+
+def delete_items(portfolio: Portfolio, skus: Iterable[str]) -> int:
+    """
+    Удаление товаров портфеля по артикулам с вычитанием их вклада из итогов
+    """
+    skus = list(skus)
+    deleted = 0
+    with transaction.atomic():
+        deltas = AggregateDeltas()
+        for start in range(0, len(skus), CHUNK_SIZE):
+            items = list(portfolio.items.select_for_update().filter(sku__in=skus[start:start + CHUNK_SIZE]))
+            for item in items:
+                deltas.remove(item)
+            PortfolioItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+            deleted += len(items)
+        deltas.apply()
+    return deleted
+
+
+def recalculate_category(category_id: int) -> int:
+    """
+    Пересчет товаров всех портфелей в категории (после изменения комиссий или группы)
+
+    Returns:
+        int: Количество пересчитанных товаров
+    """
+    categories = load_categories([category_id])
+    if category_id not in categories:
+        return 0
+    recalculated = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            items = list(
+                PortfolioItem.objects.select_for_update()
+                .filter(category_id=category_id, pk__gt=last_pk).order_by('pk')[:CHUNK_SIZE]
+            )
+            if not items:
+                return recalculated
+            deltas = AggregateDeltas()
+            for item in items:
+                deltas.remove(item)
+            calculate_items(items, categories)
+            for item in items:
+                deltas.add(item)
+            PortfolioItem.objects.bulk_update(items, RECALCULATED_FIELDS)
+            deltas.apply()
+        recalculated += len(items)
+        last_pk = items[-1].pk
+
+
+def remove_category(category_id: int) -> int:
+    """
+    Вычитание из итогов вклада товаров категории перед ее удалением
+    (сами товары удаляются каскадно вместе с категорией)
+    """
+    deltas = AggregateDeltas()
+    count = 0
+    for item in PortfolioItem.objects.filter(category_id=category_id).iterator(chunk_size=CHUNK_SIZE):
+        deltas.remove(item)
+        count += 1
+    deltas.apply()
+    return count
+
+
+def recalculate_portfolio(portfolio: Portfolio) -> int:
+    """
+    Полный пересчет товаров портфеля и его итогов - после смены файла тарифов
+    (сигналов о нем нет) или правок БД в обход calculator.portfolio
+
+    Returns:
+        int: Количество пересчитанных товаров
+    """
+    recalculated = 0
+    with transaction.atomic():
+        portfolio.aggregates.all().delete()
+        deltas = AggregateDeltas()
+        items = list(portfolio.items.select_for_update().order_by('pk'))
+        for start in range(0, len(items), CHUNK_SIZE):
+            chunk = items[start:start + CHUNK_SIZE]
+            calculate_items(chunk, load_categories(item.category_id for item in chunk))
+            PortfolioItem.objects.bulk_update(chunk, RECALCULATED_FIELDS)
+            for item in chunk:
+                deltas.add(item)
+            recalculated += len(chunk)
+        deltas.apply()
+    return recalculated
+
+
+def portfolio_summary(portfolio: Portfolio, group_by: Iterable[str] = AGGREGATE_DIMENSIONS) -> Dict[str, Any]:
+    """
+    Итоги портфеля: суммы по схемам и строки по выбранным измерениям
+    (группа категорий, схема, диапазон маржи)
+
+    Суммирует только строки итогов (GROUP BY в БД), товары не загружаются.
+    Строк итогов не больше, чем групп × схем × диапазонов маржи, поэтому время
+    чтения не зависит от числа товаров. Ответ собирается без сериализаторов
+    DRF: суммы - строки с двумя знаками, как у DecimalField.
+
+    Args:
+        group_by: Измерения строк aggregates (AGGREGATE_DIMENSIONS); пусто - без строк
+    """
+    group_by = list(group_by)
+    sums = {field: Sum(field) for field in AGGREGATE_FIELDS}
+    aggregates = portfolio.aggregates.order_by()
+
+    def money(kopecks: int) -> str:
+        return str(Decimal(kopecks).scaleb(-2))
+
+    def totals(row: Dict[str, Any]) -> Dict[str, Any]:
+        # Строк схемы может не быть (пустой портфель) - тогда нули
+        revenue, profit = row.get('monthly_revenue') or 0, row.get('monthly_net_profit') or 0
+        margin = Decimal(profit) * 100 / Decimal(revenue) if revenue else Decimal('0')
+        return {
+            'sku_count': row.get('sku_count') or 0,
+            'monthly_sales': row.get('monthly_sales') or 0,
+            'monthly_revenue': money(revenue),
+            'monthly_net_profit': money(profit),
+            'annual_net_profit': money(profit * 12),
+            'margin_percent': str(round(margin, 2)),
+        }
+
+    by_scheme = {row['scheme']: row for row in aggregates.values('scheme').annotate(**sums)}
+    rows = []
+    if group_by:
+        for row in aggregates.values(*group_by).annotate(**sums).order_by(*group_by):
+            dimensions = {dimension: row[dimension] for dimension in group_by}
+            if 'category_group' in dimensions:
+                dimensions['category_group'] = dimensions['category_group'] or None
+            rows.append({**dimensions, **totals(row)})
+
+    return {
+        'id': portfolio.id,
+        'name': portfolio.name,
+        'updated_at': portfolio.updated_at,
+        'totals': {scheme: totals(by_scheme.get(scheme, {})) for scheme in SCHEMES},
+        'aggregates': rows,
+    }
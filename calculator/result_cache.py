@@ -0,0 +1,148 @@
+"""
+Кэш результатов расчета, адресуемый содержимым ввода.
+
+Ключ - SHA-256 канонического представления проверенного ввода вместе с версией
+справочника категорий, отпечатком содержимого версии тарифа и версией формул,
+поэтому одинаковые запросы (в том числе повторная отправка для выгрузки в Excel)
+не пересчитываются, а изменение комиссий, тарифа или формул дает новые ключи.
+
+Хэш ключа возвращается клиенту как токен результата (result_token). Вместе с
+результатом хранится проверенный ввод, поэтому по токену можно пересчитать
+только разделы, затронутые изменением нескольких полей (/api/calculate/delta/).
+
+Хранилище - кэш Django с псевдонимом CALCULATION_CACHE_ALIAS: по умолчанию
+LocMemCache в памяти процесса (ограничение MAX_ENTRIES и TIMEOUT), для общего
+кэша между воркерами gunicorn - FileBasedCache или Redis/Memcached в CACHES.
+"""
+
+from decimal import Decimal
+from threading import Lock
+from typing import Callable, Iterable, Optional, Tuple
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+from categories.versioning import get_category_version
+from .engine import ALL_SECTIONS, FORMULA_VERSION
+from .tariffs import tariff_registry
+
+
+# Поля проверенного ввода, от которых зависит результат расчета.
+# Способ задания объема (габариты или литры) в ключ не входит - важен сам объем.
+KEY_FIELDS = (
+    'category_id', 'price', 'weight', 'volume', 'tax_rate', 'buyout_rate',
+    'delivery_time', 'ad_costs_rate', 'cost_price', 'other_costs', 'monthly_sales', 'tariff_version',
+)
+
+# Способ задания объема хранится вместе с вводом (но не входит в ключ): пересчет по
+# изменениям повторяет ввод как есть, объем из габаритов заново считается из них
+INPUT_MODE_FIELDS = ('dimension_mode', 'length', 'width', 'height')
+
+# Префикс ключей в бэкенде кэша (запись - ввод вместе с результатом)
+KEY_PREFIX = 'result:'
+
+
+def _canonical(value):
+    if isinstance(value, Decimal):
+        # 805, 805.0 и 805.00 дают одинаковый ключ
+        return format(value.normalize(), 'f')
+    return value
+
+
+class CalculationResultCache:
+    """
+    Кэш результатов calculate_all() поверх бэкенда кэша Django
+    """
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def make_token(self, data: dict, sections: Iterable[str] = ALL_SECTIONS) -> str:
+        """
+        Токен результата: хэш ввода + разделы результата + версия категорий + отпечаток тарифа
+        + версия формул
+        """
+        payload = {field: _canonical(data.get(field)) for field in KEY_FIELDS}
+        payload['sections'] = sorted(sections)
+        payload['category_version'] = get_category_version()
+        payload['tariff'] = tariff_registry.get(data.get('tariff_version')).fingerprint
+        payload['formula'] = FORMULA_VERSION
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def make_key(self, data: dict, sections: Iterable[str] = ALL_SECTIONS) -> str:
+        """
+        Ключ результата в бэкенде кэша
+        """
+        return KEY_PREFIX + self.make_token(data, sections)
+
+    def get_or_calculate(self, data: dict, calculate: Callable[[], dict],
+                         sections: Iterable[str] = ALL_SECTIONS) -> dict:
+        """
+        Результат из кэша или, при промахе, расчет и сохранение
+        """
+        return self.get_or_calculate_with_token(data, calculate, sections)[1]
+
+    def get_or_calculate_with_token(self, data: dict, calculate: Callable[[], dict],
+                                    sections: Iterable[str] = ALL_SECTIONS) -> Tuple[str, dict]:
+        """
+        То же, что get_or_calculate(), вместе с токеном результата
+        """
+        token = self.make_token(data, sections)
+        entry = self.backend.get(KEY_PREFIX + token)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            entry = {
+                'data': {field: data.get(field) for field in KEY_FIELDS + INPUT_MODE_FIELDS},
+                'sections': frozenset(sections),
+                'category_version': get_category_version(),
+                'tariff': tariff_registry.get(data.get('tariff_version')).fingerprint,
+                'formula': FORMULA_VERSION,
+                'results': calculate(),
+            }
+            self.backend.set(KEY_PREFIX + token, entry)
+        return token, entry['results']
+
+    def get_entry(self, token: str) -> Optional[dict]:
+        """
+        Сохраненный расчет по токену: ввод (data), разделы (sections), версия
+        справочника, отпечаток тарифа и результат (results); None, если запись вытеснена
+        """
+        return self.backend.get(KEY_PREFIX + token)
+
+    def is_current(self, entry: dict) -> bool:
+        """
+        Рассчитан ли сохраненный результат по действующим комиссиям, тарифу и формулам
+        """
+        return (entry.get('formula') == FORMULA_VERSION
+                and entry['category_version'] == get_category_version()
+                and entry['tariff'] == tariff_registry.get(entry['data']['tariff_version']).fingerprint)
+
+    def stats(self) -> dict:
+        """
+        Счетчики кэша для эндпоинта метрик
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+result_cache = CalculationResultCache(settings.CALCULATION_CACHE_ALIAS)
@@ -1,6 +1,25 @@
 from rest_framework import serializers
 from decimal import Decimal
 
+from .engine import ALL_SECTIONS, FIELD_SECTIONS, RESULT_SECTIONS, expand_sections
+from .grid import GRID_METRICS
+from .models import Portfolio, PortfolioItem
+from .portfolio import AGGREGATE_DIMENSIONS, MARGIN_BUCKETS
+from .simulation import DEFAULT_PERCENTILES, DEFAULT_SAMPLES, DISTRIBUTIONS, SIMULATED_FIELDS
+from .tariffs import TariffNotFound, tariff_registry
+
+
+class DynamicFieldsSerializer(serializers.Serializer):
+    """
+    Serializer, оставляющий только поля из аргумента fields (если он передан)
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 
 class LogisticsBreakdownSerializer(serializers.Serializer):
     base = serializers.DecimalField(max_digits=12, decimal_places=2)
@@ -13,6 +32,12 @@ class ReturnsBreakdownSerializer(serializers.Serializer):
     not_buyout_share = serializers.DecimalField(max_digits=5, decimal_places=3)
 
 
+class SolverSegmentsSerializer(serializers.Serializer):
+    break_even_price = serializers.CharField()
+    target_price_10pct = serializers.CharField()
+    target_price_20pct = serializers.CharField()
+
+
 class SensitivityPriceRowSerializer(serializers.Serializer):
     delta_pct = serializers.IntegerField()
     price = serializers.DecimalField(max_digits=12, decimal_places=2)
@@ -32,10 +57,17 @@ class SensitivityDeliveryRowSerializer(serializers.Serializer):
     net_profit_per_unit_percent = serializers.DecimalField(max_digits=7, decimal_places=2)
 
 
-class SensitivitySerializer(serializers.Serializer):
+class SensitivityAdCostsRowSerializer(serializers.Serializer):
+    ad_costs_rate = serializers.IntegerField()
+    net_profit_per_unit = serializers.DecimalField(max_digits=12, decimal_places=2)
+    net_profit_per_unit_percent = serializers.DecimalField(max_digits=7, decimal_places=2)
+
+
+class SensitivitySerializer(DynamicFieldsSerializer):
     price = SensitivityPriceRowSerializer(many=True)
     buyout = SensitivityBuyoutRowSerializer(many=True)
     delivery_time = SensitivityDeliveryRowSerializer(many=True)
+    ad_costs = SensitivityAdCostsRowSerializer(many=True)
 
 
 class CalculationInputSerializer(serializers.Serializer):
@@ -156,6 +188,16 @@ class CalculationInputSerializer(serializers.Serializer):
         help_text='Количество продаж в месяц в штуках'
     )
     
+    # Версия тарифа Ozon: по имени или действующая на дату (по умолчанию - на сегодня)
+    tariff_version = serializers.CharField(
+        required=False,
+        help_text='Версия тарифа Ozon (по умолчанию - действующая на сегодня)'
+    )
+    as_of = serializers.DateField(
+        required=False,
+        help_text='Дата, на которую берется действующая версия тарифа'
+    )
+    
     def validate(self, data):
         """
         Дополнительная валидация в зависимости от режима ввода
@@ -181,12 +223,361 @@ class CalculationInputSerializer(serializers.Serializer):
                     'Для режима "volume" необходимо указать объем'
                 )
         
+        # Версия тарифа определяется при проверке: дальше в расчет идет ее имя
+        as_of = data.pop('as_of', None)
+        if as_of is not None and data.get('tariff_version'):
+            raise serializers.ValidationError('Укажите tariff_version или as_of, но не оба')
+        try:
+            data['tariff_version'] = tariff_registry.get(data.get('tariff_version'), as_of).version
+        except TariffNotFound as error:
+            raise serializers.ValidationError({'tariff_version': str(error)})
+        
+        return data
+
+
+class GridInputSerializer(CalculationInputSerializer):
+    """
+    Serializer для сетки чувствительности: параметры товара и оси сетки
+
+    Ось цены задается диапазоном и числом точек (по умолчанию ±50% от цены),
+    оси выкупа и времени доставки - списками значений (по умолчанию - значения товара).
+    Размер ответа пропорционален числу схем и показателей - для больших сеток
+    стоит запрашивать только нужные.
+    """
+    # Ограничения размера сетки
+    MAX_AXIS_POINTS = 1000
+    MAX_CELLS = 1_000_000
+
+    price_min = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, min_value=Decimal('0.01'),
+        help_text='Минимальная цена оси (по умолчанию - 50% от цены)'
+    )
+    price_max = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, min_value=Decimal('0.01'),
+        help_text='Максимальная цена оси (по умолчанию - 150% от цены)'
+    )
+    price_steps = serializers.IntegerField(
+        required=False, default=21, min_value=1, max_value=MAX_AXIS_POINTS,
+        help_text='Количество точек оси цены'
+    )
+    buyout_rates = serializers.ListField(
+        child=serializers.DecimalField(
+            max_digits=5, decimal_places=2, min_value=Decimal('0'), max_value=Decimal('100')
+        ),
+        required=False, min_length=1, max_length=MAX_AXIS_POINTS,
+        help_text='Значения оси выкупа в процентах'
+    )
+    delivery_hours = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False, min_length=1, max_length=MAX_AXIS_POINTS,
+        help_text='Значения оси времени доставки в часах'
+    )
+    schemes = serializers.ListField(
+        child=serializers.ChoiceField(choices=['FBO', 'FBS']),
+        required=False, default=['FBO', 'FBS'], min_length=1,
+        help_text='Схемы работы, для которых строится сетка'
+    )
+    metrics = serializers.ListField(
+        child=serializers.ChoiceField(choices=GRID_METRICS),
+        required=False, default=list(GRID_METRICS), min_length=1,
+        help_text='Показатели в ячейках сетки'
+    )
+
+    def validate(self, data):
+        data = super().validate(data)
+
+        price_min = data.get('price_min', round(data['price'] * Decimal('0.5'), 2))
+        price_max = data.get('price_max', round(data['price'] * Decimal('1.5'), 2))
+        if price_min > price_max:
+            raise serializers.ValidationError('price_min не может быть больше price_max')
+        steps = data['price_steps']
+        if steps == 1:
+            data['prices'] = [price_min]
+        else:
+            step = (price_max - price_min) / (steps - 1)
+            data['prices'] = [round(price_min + step * index, 2) for index in range(steps)]
+
+        data.setdefault('buyout_rates', [data['buyout_rate']])
+        data.setdefault('delivery_hours', [data['delivery_time']])
+
+        cells = len(data['prices']) * len(data['buyout_rates']) * len(data['delivery_hours'])
+        if cells > self.MAX_CELLS:
+            raise serializers.ValidationError(
+                f'Слишком большая сетка: {cells} ячеек (максимум {self.MAX_CELLS})'
+            )
+        return data
+
+
+class SweepInputSerializer(CalculationInputSerializer):
+    """
+    Serializer для расчета товара по всем категориям: категория не указывается
+    """
+    MAX_TOP_N = 500
+
+    category_id = serializers.IntegerField(required=False, help_text='Не используется')
+    schemes = serializers.ListField(
+        child=serializers.ChoiceField(choices=['FBO', 'FBS']),
+        required=False, default=['FBO', 'FBS'], min_length=1,
+        help_text='Схемы работы для сравнения'
+    )
+    top_n = serializers.IntegerField(
+        required=False, default=10, min_value=0, max_value=MAX_TOP_N,
+        help_text='Сколько лучших и худших пар (категория, схема) вернуть'
+    )
+    full_table = serializers.BooleanField(
+        required=False, default=False,
+        help_text='Вернуть прибыль по всем категориям (колонками)'
+    )
+
+
+class DistributionSerializer(serializers.Serializer):
+    """
+    Распределение поля товара для моделирования риска
+    """
+    MAX_VALUES = 1000
+
+    distribution = serializers.ChoiceField(choices=list(DISTRIBUTIONS), help_text='Тип распределения')
+    mean = serializers.DecimalField(max_digits=12, decimal_places=4, required=False, help_text='normal: среднее')
+    std = serializers.DecimalField(
+        max_digits=12, decimal_places=4, required=False, min_value=Decimal('0'),
+        help_text='normal: стандартное отклонение'
+    )
+    low = serializers.DecimalField(
+        max_digits=12, decimal_places=4, required=False, help_text='uniform, triangular: минимум'
+    )
+    mode = serializers.DecimalField(
+        max_digits=12, decimal_places=4, required=False, help_text='triangular: наиболее вероятное значение'
+    )
+    high = serializers.DecimalField(
+        max_digits=12, decimal_places=4, required=False, help_text='uniform, triangular: максимум'
+    )
+    values = serializers.ListField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=4),
+        required=False, min_length=1, max_length=MAX_VALUES,
+        help_text='empirical: наблюдаемые значения (например, по неделям)'
+    )
+    weights = serializers.ListField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=4, min_value=Decimal('0')),
+        required=False, min_length=1, max_length=MAX_VALUES,
+        help_text='empirical: веса значений (по умолчанию равные)'
+    )
+
+    def validate(self, data):
+        missing = [name for name in DISTRIBUTIONS[data['distribution']] if name not in data]
+        if missing:
+            raise serializers.ValidationError(
+                f'Для распределения {data["distribution"]} нужны параметры: {", ".join(missing)}'
+            )
+        if 'low' in data and 'high' in data and data['low'] > data['high']:
+            raise serializers.ValidationError('low не может быть больше high')
+        if data['distribution'] == 'triangular' and not data['low'] <= data['mode'] <= data['high']:
+            raise serializers.ValidationError('mode должен лежать между low и high')
+        weights = data.get('weights')
+        if weights is not None:
+            if len(weights) != len(data.get('values', ())):
+                raise serializers.ValidationError('Количество весов должно совпадать с количеством значений')
+            if sum(weights) <= 0:
+                raise serializers.ValidationError('Сумма весов должна быть положительной')
+        return data
+
+
+class SimulationInputSerializer(CalculationInputSerializer):
+    """
+    Serializer для моделирования риска: параметры товара и распределения полей
+
+    Поля без распределения берутся из параметров товара. Значения выборки
+    ограничиваются допустимым диапазоном поля и округляются до точности ввода.
+    """
+    MAX_SAMPLES = 1_000_000
+    MAX_PERCENTILES = 99
+
+    distributions = serializers.DictField(
+        child=DistributionSerializer(),
+        help_text='Распределения полей: ' + ', '.join(SIMULATED_FIELDS)
+    )
+    samples = serializers.IntegerField(
+        required=False, default=DEFAULT_SAMPLES, min_value=1, max_value=MAX_SAMPLES,
+        help_text='Количество сценариев'
+    )
+    seed = serializers.IntegerField(
+        required=False, min_value=0, max_value=2 ** 63 - 1,
+        help_text='Seed генератора для воспроизводимости (по умолчанию - случайный)'
+    )
+    percentiles = serializers.ListField(
+        child=serializers.FloatField(min_value=0, max_value=100),
+        required=False, default=list(DEFAULT_PERCENTILES), min_length=1, max_length=MAX_PERCENTILES,
+        help_text='Перцентили прибыли за штуку'
+    )
+    schemes = serializers.ListField(
+        child=serializers.ChoiceField(choices=['FBO', 'FBS']),
+        required=False, default=['FBO', 'FBS'], min_length=1,
+        help_text='Схемы работы для моделирования'
+    )
+
+    def validate_distributions(self, value):
+        unknown = set(value) - set(SIMULATED_FIELDS)
+        if unknown:
+            raise serializers.ValidationError(
+                f'Распределение можно задать только для полей: {", ".join(SIMULATED_FIELDS)} '
+                f'(неизвестные: {", ".join(sorted(unknown))})'
+            )
+        if not value:
+            raise serializers.ValidationError('Укажите распределение хотя бы для одного поля')
+        return value
+
+
+class SimulationStatsSerializer(serializers.Serializer):
+    mean = serializers.DecimalField(max_digits=12, decimal_places=2)
+    std = serializers.DecimalField(max_digits=12, decimal_places=2)
+    min = serializers.DecimalField(max_digits=12, decimal_places=2)
+    max = serializers.DecimalField(max_digits=12, decimal_places=2)
+    percentiles = serializers.DictField(child=serializers.DecimalField(max_digits=12, decimal_places=2))
+
+
+class SimulationResultSerializer(serializers.Serializer):
+    scheme = serializers.CharField()
+    net_profit_per_unit = SimulationStatsSerializer(help_text='Чистая прибыль за штуку по сценариям')
+    probability_of_loss = serializers.FloatField(help_text='Доля сценариев с убытком')
+    expected_monthly_profit = serializers.DecimalField(
+        max_digits=15, decimal_places=2, help_text='Ожидаемая чистая прибыль за месяц'
+    )
+
+
+class InverseInputSerializer(CalculationInputSerializer):
+    """
+    Serializer для обратных задач: параметры товара, целевая маржа и цель по прибыли за месяц
+    """
+    target_margin = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False, default=Decimal('20'),
+        min_value=Decimal('-100'), max_value=Decimal('100'),
+        help_text='Целевая маржа в процентах от цены'
+    )
+    monthly_profit_goal = serializers.DecimalField(
+        max_digits=15, decimal_places=2, required=False, min_value=Decimal('0.01'),
+        help_text='Цель по чистой прибыли за месяц в рублях'
+    )
+
+
+class InverseResultSerializer(serializers.Serializer):
+    scheme = serializers.CharField()
+    target_margin = serializers.DecimalField(max_digits=5, decimal_places=2)
+    net_profit_per_unit = serializers.DecimalField(
+        max_digits=12, decimal_places=2, help_text='Чистая прибыль за штуку при текущих параметрах'
+    )
+    max_cost_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, help_text='Максимальная себестоимость для целевой маржи'
+    )
+    max_other_costs = serializers.DecimalField(
+        max_digits=12, decimal_places=2, help_text='Максимальные прочие затраты для целевой маржи'
+    )
+    max_ad_costs_rate = serializers.DecimalField(
+        max_digits=12, decimal_places=2, help_text='Максимальная доля рекламы (% от цены) для целевой маржи'
+    )
+    monthly_profit_goal = serializers.DecimalField(max_digits=15, decimal_places=2, required=False)
+    required_monthly_sales = serializers.IntegerField(
+        required=False, allow_null=True,
+        help_text='Продаж в месяц для цели по прибыли (null - недостижима при текущей прибыли за штуку)'
+    )
+
+
+class InverseOutputSerializer(serializers.Serializer):
+    fbo_results = InverseResultSerializer()
+    fbs_results = InverseResultSerializer()
+    tariff_version = serializers.CharField(required=False)
+
+
+class PackagingVariantSerializer(serializers.Serializer):
+    """
+    Вариант упаковки: габариты (длина, ширина, высота) или объем
+    """
+    name = serializers.CharField(required=False, max_length=100, help_text='Название варианта')
+    length = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, min_value=Decimal('0.01'), help_text='Длина в см'
+    )
+    width = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, min_value=Decimal('0.01'), help_text='Ширина в см'
+    )
+    height = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, min_value=Decimal('0.01'), help_text='Высота в см'
+    )
+    volume = serializers.DecimalField(
+        max_digits=10, decimal_places=3, required=False, min_value=Decimal('0.001'), help_text='Объем в литрах'
+    )
+
+    def validate(self, data):
+        dimensions = [data.get(name) for name in ('length', 'width', 'height')]
+        if 'volume' in data:
+            if any(dimensions):
+                raise serializers.ValidationError('Укажите габариты или объем, но не оба')
+        elif all(dimensions):
+            # Объем из габаритов, как у товара (L × W × H / 1000)
+            length, width, height = dimensions
+            data['volume'] = (length * width * height) / Decimal('1000')
+        else:
+            raise serializers.ValidationError('Укажите длину, ширину и высоту или объем')
         return data
 
 
-class CalculationResultSerializer(serializers.Serializer):
+class PackagingInputSerializer(CalculationInputSerializer):
+    """
+    Serializer для сравнения упаковки: параметры товара и варианты габаритов
+
+    Габариты товара (dimension_mode) задают текущую упаковку, с которой
+    сравниваются варианты.
+    """
+    MAX_VARIANTS = 500
+
+    packaging_variants = serializers.ListField(
+        child=PackagingVariantSerializer(), min_length=1, max_length=MAX_VARIANTS,
+        help_text='Варианты упаковки (габариты или объем)'
+    )
+
+
+class PackagingSchemeResultSerializer(serializers.Serializer):
+    net_profit_per_unit = serializers.DecimalField(max_digits=12, decimal_places=2)
+    net_profit_per_unit_percent = serializers.DecimalField(max_digits=9, decimal_places=2)
+
+
+class PackagingResultSerializer(serializers.Serializer):
+    volume = serializers.DecimalField(max_digits=13, decimal_places=3, help_text='Объем в литрах')
+    base_logistics = serializers.DecimalField(max_digits=12, decimal_places=2)
+    processing_delivery = serializers.DecimalField(max_digits=12, decimal_places=2)
+    returns_cancellations = serializers.DecimalField(max_digits=12, decimal_places=2)
+    fbo_results = PackagingSchemeResultSerializer()
+    fbs_results = PackagingSchemeResultSerializer()
+
+
+class PackagingVariantResultSerializer(PackagingResultSerializer):
+    rank = serializers.IntegerField(help_text='Место по чистой прибыли за штуку (1 - лучший вариант)')
+    index = serializers.IntegerField(help_text='Номер варианта во вводе (с 0)')
+    name = serializers.CharField(allow_null=True)
+    net_profit_delta = serializers.DecimalField(
+        max_digits=12, decimal_places=2, help_text='Разница прибыли за штуку с текущей упаковкой'
+    )
+
+
+class PackagingOutputSerializer(serializers.Serializer):
+    current = PackagingResultSerializer(help_text='Текущая упаковка товара')
+    variants = PackagingVariantResultSerializer(many=True, help_text='Варианты по убыванию прибыли за штуку')
+    tariff_version = serializers.CharField(required=False)
+
+
+class SweepEntrySerializer(serializers.Serializer):
+    category_id = serializers.IntegerField()
+    name = serializers.CharField()
+    category_group = serializers.CharField(allow_null=True)
+    scheme = serializers.CharField()
+    commission = serializers.DecimalField(max_digits=5, decimal_places=2)
+    net_profit_per_unit = serializers.DecimalField(max_digits=12, decimal_places=2)
+    net_profit_per_unit_percent = serializers.DecimalField(max_digits=9, decimal_places=2)
+
+
+class CalculationResultSerializer(DynamicFieldsSerializer):
     """
     Serializer для результатов расчета
+
+    fields - поля результата (ResultSelectionSerializer.output_fields); таблицы
+    чувствительности можно выбрать по отдельности: 'sensitivity.price' и т.д.
     """
     scheme = serializers.CharField(help_text='Схема работы: FBO или FBS')
     price = serializers.DecimalField(max_digits=10, decimal_places=2, help_text='Цена товара')
@@ -219,6 +610,9 @@ class CalculationResultSerializer(serializers.Serializer):
     other_costs = serializers.DecimalField(max_digits=10, decimal_places=2, help_text='Прочие затраты')
     other_costs_percent = serializers.DecimalField(max_digits=5, decimal_places=2)
     
+    ad_costs = serializers.DecimalField(max_digits=10, decimal_places=2, help_text='Рекламные расходы')
+    ad_costs_percent = serializers.DecimalField(max_digits=5, decimal_places=2)
+    
     net_profit_per_unit = serializers.DecimalField(max_digits=10, decimal_places=2, help_text='Прибыль за штуку')
     net_profit_per_unit_percent = serializers.DecimalField(max_digits=5, decimal_places=2)
     
@@ -230,22 +624,252 @@ class CalculationResultSerializer(serializers.Serializer):
     break_even_price = serializers.DecimalField(max_digits=10, decimal_places=2)
     target_price_10pct = serializers.DecimalField(max_digits=10, decimal_places=2)
     target_price_20pct = serializers.DecimalField(max_digits=10, decimal_places=2)
+    solver_segments = SolverSegmentsSerializer(help_text='Участок цены, на котором найден каждый ответ решателя')
     logistics_breakdown = LogisticsBreakdownSerializer()
     returns_breakdown = ReturnsBreakdownSerializer()
     sensitivity = SensitivitySerializer()
 
+    def __init__(self, *args, fields=None, **kwargs):
+        top_level = None
+        if fields is not None:
+            top_level = {'scheme'} | {name.split('.')[0] for name in fields}
+        super().__init__(*args, fields=top_level, **kwargs)
+        if top_level is not None and 'sensitivity' in top_level and 'sensitivity' not in fields:
+            self.fields['sensitivity'] = SensitivitySerializer(
+                fields=[name.split('.', 1)[1] for name in fields if name.startswith('sensitivity.')]
+            )
+
 
 class CalculationOutputSerializer(serializers.Serializer):
     """
     Serializer для выходных данных расчета
+
+    fields - поля результата каждой схемы для частичного расчета (None - все)
     """
     fbo_results = CalculationResultSerializer(help_text='Результаты для схемы FBO')
     fbs_results = CalculationResultSerializer(help_text='Результаты для схемы FBS')
+    tariff_version = serializers.CharField(required=False, help_text='Версия тарифа, по которой выполнен расчет')
+    result_token = serializers.CharField(
+        required=False, help_text='Токен результата для пересчета по изменениям (/api/calculate/delta/)'
+    )
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            self.fields['fbo_results'] = CalculationResultSerializer(fields=fields, help_text='Результаты для схемы FBO')
+            self.fields['fbs_results'] = CalculationResultSerializer(fields=fields, help_text='Результаты для схемы FBS')
+
 
+class DeltaInputSerializer(serializers.Serializer):
+    """
+    Serializer для пересчета по изменениям: токен предыдущего расчета и измененные поля
+
+    Поля changes - как у CalculationInputSerializer. Габариты (length, width, height)
+    передаются все три, объем тогда считается из них; переданный volume переводит
+    расчет в режим volume. Иначе сохраняется режим предыдущего расчета.
+    """
+    DIMENSION_FIELDS = ('length', 'width', 'height')
 
+    result_token = serializers.RegexField(
+        r'^[0-9a-f]{64}$', help_text='result_token из ответа предыдущего расчета'
+    )
+    changes = serializers.DictField(help_text='Измененные поля ввода')
+
+    def validate_changes(self, value):
+        unknown = sorted(set(value) - set(CalculationInputSerializer().fields))
+        if unknown:
+            raise serializers.ValidationError(f'Неизвестные поля ввода: {", ".join(unknown)}')
+        return value
 
+    @classmethod
+    def apply_changes(cls, previous: dict, changes: dict) -> dict:
+        """
+        Ввод для CalculationInputSerializer: предыдущий проверенный ввод с изменениями
+        """
+        data = dict(previous)
+        if previous.get('dimension_mode') != 'dimensions':
+            data['dimension_mode'] = 'volume'
+        if any(name in changes for name in cls.DIMENSION_FIELDS):
+            data['dimension_mode'] = 'dimensions'
+        elif 'volume' in changes:
+            data['dimension_mode'] = 'volume'
+        if 'as_of' in changes:
+            # Дата заменяет версию тарифа предыдущего расчета
+            data.pop('tariff_version', None)
+        data.update(changes)
+        if data['dimension_mode'] == 'dimensions' and 'volume' not in changes:
+            # Объем из габаритов не передается повторно: он считается из них заново
+            # и может иметь больше знаков, чем допускает поле volume
+            data.pop('volume', None)
+        return data
 
 
+class DeltaOutputSerializer(CalculationOutputSerializer):
+    """
+    Serializer для результата пересчета по изменениям
+    """
+    recalculated_sections = serializers.ListField(
+        child=serializers.CharField(), help_text='Разделы, которые пришлось пересчитать'
+    )
 
 
+class ResultSelectionSerializer(serializers.Serializer):
+    """
+    Выбор разделов и полей результата (параметры запроса include= и fields=)
 
+    include - разделы через запятую: summary, targets, sensitivity
+    (или sensitivity.price, sensitivity.buyout, sensitivity.delivery_time, sensitivity.ad_costs).
+    fields - отдельные поля результата через запятую, например net_profit_per_unit.
+    Вычисляются только разделы, в которые входят запрошенные поля и разделы.
+    """
+    include = serializers.CharField(required=False, help_text='Разделы результата через запятую')
+    fields = serializers.CharField(required=False, help_text='Поля результата через запятую')
+
+    @staticmethod
+    def _split(value):
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def validate_include(self, value):
+        names = self._split(value)
+        unknown = [name for name in names if name != 'sensitivity' and name not in RESULT_SECTIONS]
+        if unknown:
+            raise serializers.ValidationError(
+                f'Неизвестные разделы: {", ".join(unknown)}. '
+                f'Доступны: sensitivity, {", ".join(RESULT_SECTIONS)}'
+            )
+        return names
+
+    def validate_fields(self, value):
+        names = []
+        for name in self._split(value):
+            # 'sensitivity' - все таблицы чувствительности
+            names.extend(sorted(expand_sections([name])) if name == 'sensitivity' else [name])
+        unknown = [name for name in names if name not in FIELD_SECTIONS]
+        if unknown:
+            raise serializers.ValidationError(f'Неизвестные поля результата: {", ".join(unknown)}')
+        return names
+
+    def validate(self, data):
+        """
+        Разделы для расчета (sections) и поля для вывода (output_fields, None - все)
+        """
+        include = data.get('include')
+        fields = data.get('fields')
+        if include is None and fields is None:
+            return {'sections': ALL_SECTIONS, 'output_fields': None}
+
+        sections = set(expand_sections(include or []))
+        output_fields = {field for section in sections for field in RESULT_SECTIONS[section]}
+        for name in fields or []:
+            sections.add(FIELD_SECTIONS[name])
+            output_fields.add(name)
+        return {'sections': frozenset(sections), 'output_fields': output_fields}
+
+
+class PortfolioSerializer(serializers.ModelSerializer):
+    """
+    Serializer для портфеля товаров
+    """
+    class Meta:
+        model = Portfolio
+        fields = ['id', 'name', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class PortfolioItemInputSerializer(CalculationInputSerializer):
+    """
+    Serializer для товара портфеля: параметры расчета и артикул
+    """
+    sku = serializers.CharField(max_length=100, help_text='Артикул товара (уникален в портфеле)')
+
+
+class PortfolioItemsDeleteSerializer(serializers.Serializer):
+    skus = serializers.ListField(
+        child=serializers.CharField(max_length=100), min_length=1, help_text='Артикулы удаляемых товаров'
+    )
+
+
+class HundredthsField(serializers.DecimalField):
+    """
+    Целое число в сотых долях (копейки, сотые доли процента) как десятичное с двумя знаками
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(max_digits=20, decimal_places=2, read_only=True, **kwargs)
+
+    def to_representation(self, value):
+        return super().to_representation(Decimal(value) / 100)
+
+
+class PortfolioItemSerializer(serializers.ModelSerializer):
+    """
+    Serializer для сохраненного товара портфеля: параметры и прибыль по схемам
+    """
+    category_id = serializers.IntegerField()
+    fbo_net_profit_per_unit = HundredthsField()
+    fbo_net_profit_total = HundredthsField()
+    fbo_margin_percent = HundredthsField(source='fbo_margin')
+    fbs_net_profit_per_unit = HundredthsField()
+    fbs_net_profit_total = HundredthsField()
+    fbs_margin_percent = HundredthsField(source='fbs_margin')
+
+    class Meta:
+        model = PortfolioItem
+        fields = [
+            'sku', 'category_id', 'category_group', 'price', 'weight', 'volume', 'tax_rate', 'buyout_rate',
+            'delivery_time', 'ad_costs_rate', 'cost_price', 'other_costs', 'monthly_sales', 'tariff_version',
+            'fbo_net_profit_per_unit', 'fbo_net_profit_total', 'fbo_margin_percent',
+            'fbs_net_profit_per_unit', 'fbs_net_profit_total', 'fbs_margin_percent',
+            'updated_at',
+        ]
+
+
+class PortfolioTotalsSerializer(serializers.Serializer):
+    sku_count = serializers.IntegerField()
+    monthly_sales = serializers.IntegerField()
+    monthly_revenue = serializers.DecimalField(max_digits=20, decimal_places=2)
+    monthly_net_profit = serializers.DecimalField(max_digits=20, decimal_places=2)
+    annual_net_profit = serializers.DecimalField(max_digits=20, decimal_places=2)
+    margin_percent = serializers.DecimalField(
+        max_digits=12, decimal_places=2, help_text='Прибыль за месяц в % от выручки'
+    )
+
+
+class PortfolioAggregateSerializer(PortfolioTotalsSerializer):
+    # Измерения есть в строке, если они перечислены в group_by
+    category_group = serializers.CharField(allow_null=True, required=False)
+    scheme = serializers.CharField(required=False)
+    margin_bucket = serializers.CharField(
+        required=False, help_text='Диапазон маржи за штуку: ' + ', '.join(name for name, _ in MARGIN_BUCKETS)
+    )
+
+
+class PortfolioSummaryQuerySerializer(serializers.Serializer):
+    """
+    Измерения строк итогов портфеля (параметр запроса group_by=)
+    """
+    group_by = serializers.CharField(
+        required=False, help_text='Измерения через запятую: ' + ', '.join(AGGREGATE_DIMENSIONS)
+    )
+
+    def validate_group_by(self, value):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in AGGREGATE_DIMENSIONS]
+        if unknown:
+            raise serializers.ValidationError(
+                f'Неизвестные измерения: {", ".join(unknown)}. Доступны: {", ".join(AGGREGATE_DIMENSIONS)}'
+            )
+        return names
+
+
+class PortfolioSummarySerializer(serializers.Serializer):
+    """
+    Итоги портфеля (для схемы API: ответ собирается в calculator.portfolio.portfolio_summary)
+    """
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    updated_at = serializers.DateTimeField()
+    totals = serializers.DictField(child=PortfolioTotalsSerializer(), help_text='Итоги по схемам FBO и FBS')
+    aggregates = PortfolioAggregateSerializer(
+        many=True, help_text='Итоги по группе категорий, схеме и диапазону маржи'
+    )
@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from categories.models import Category
+from .portfolio import recalculate_category, remove_category
+
+
+class PendingRecalculation:
+    """
+    Категории, товары которых пересчитываются после коммита транзакции - каждая один раз
+
+    Каждое изменение ставит обработчик в очередь on_commit; первый сработавший
+    пересчитывает весь набор и закрывает его, остальные ничего не делают. Набор
+    отката не замечает: его категории пересчитываются после следующего коммита
+    (пересчет по текущим данным повторять безопасно).
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.category_ids = set()
+
+    def __call__(self):
+        if getattr(self.connection, 'pending_portfolio_recalculation', None) is self:
+            self.connection.pending_portfolio_recalculation = None
+        category_ids, self.category_ids = self.category_ids, set()
+        for category_id in sorted(category_ids):
+            recalculate_category(category_id)
+
+
+def schedule_recalculation(category_id: int, using: str):
+    """
+    Пересчет товаров категории после коммита; категории одной транзакции собираются в один набор
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        recalculate_category(category_id)
+        return
+    pending = getattr(connection, 'pending_portfolio_recalculation', None)
+    if pending is None:
+        pending = PendingRecalculation(connection)
+        connection.pending_portfolio_recalculation = pending
+    pending.category_ids.add(category_id)
+    transaction.on_commit(pending, using=using)
+
+
+@receiver(post_save, sender=Category)
+def recalculate_portfolio_items(sender, instance, created, using, **kwargs):
+    """
+    Изменение комиссий или группы категории пересчитывает товары портфелей только
+    этой категории (после коммита); сохранение без изменений их не трогает
+    """
+    if not created and instance.pricing_changed():
+        schedule_recalculation(instance.id, using)
+
+
+@receiver(pre_delete, sender=Category)
+def remove_portfolio_items(sender, instance, **kwargs):
+    """
+    Товары портфелей удаляются вместе с категорией - их вклад вычитается из итогов
+    """
+    remove_category(instance.id)
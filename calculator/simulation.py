@@ -0,0 +1,164 @@
+"""
+Моделирование риска методом Монте-Карло.
+
+Точечный расчет скрывает разброс: процент выкупа, время доставки и доля рекламы
+меняются от недели к неделе, цена и себестоимость - от партии к партии. Для этих полей
+задаются распределения, сценарии генерируются массивами NumPy (по умолчанию
+100 000), а прибыль по ним считает пакетный движок calculator.batch - теми же
+формулами в целочисленной арифметике, что и у OzonCalculatorCore. Результат -
+перцентили прибыли за штуку, вероятность убытка и ожидаемая прибыль за месяц.
+
+Генератор - numpy.random.Generator с явным seed: одинаковые seed и параметры
+дают одинаковый результат.
+"""
+
+from decimal import Decimal
+from typing import Dict, Any, Optional, Sequence
+import secrets
+
+import numpy as np
+
+from .batch import KOPECKS, HUNDREDTHS, UNITS_PER_KOPECK, BatchCalculator, CommissionColumns, _div_round
+from .engine import CategoryCommissions
+from .tariffs import CompiledTariff
+
+
+# Поля товара, для которых можно задать распределение: (минимум, максимум, точность)
+SIMULATED_FIELDS = {
+    'price': (0.01, None, KOPECKS),
+    'buyout_rate': (0, 100, HUNDREDTHS),
+    'delivery_time': (1, None, 1),
+    'cost_price': (0, None, KOPECKS),
+    'ad_costs_rate': (0, 100, HUNDREDTHS),
+}
+
+# Распределения и их параметры
+DISTRIBUTIONS = {
+    'normal': ('mean', 'std'),
+    'uniform': ('low', 'high'),
+    'triangular': ('low', 'mode', 'high'),
+    'empirical': ('values',),
+}
+
+DEFAULT_SAMPLES = 100_000
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def draw(rng: np.random.Generator, spec: Dict[str, Any], size: int) -> np.ndarray:
+    """
+    Выборка по описанию распределения
+
+    spec: {'distribution': 'normal', 'mean': ..., 'std': ...},
+          {'distribution': 'uniform', 'low': ..., 'high': ...},
+          {'distribution': 'triangular', 'low': ..., 'mode': ..., 'high': ...}
+          или {'distribution': 'empirical', 'values': [...], 'weights': [...]}
+          (наблюдаемые значения, например по неделям; веса необязательны)
+    """
+    distribution = spec['distribution']
+    if distribution == 'normal':
+        return rng.normal(float(spec['mean']), float(spec['std']), size)
+    if distribution == 'uniform':
+        return rng.uniform(float(spec['low']), float(spec['high']), size)
+    if distribution == 'triangular':
+        low, mode, high = float(spec['low']), float(spec['mode']), float(spec['high'])
+        if low == high:
+            return np.full(size, low)
+        return rng.triangular(low, mode, high, size)
+    if distribution == 'empirical':
+        values = np.array([float(value) for value in spec['values']])
+        weights = spec.get('weights')
+        if weights:
+            weights = np.array([float(weight) for weight in weights])
+            weights = weights / weights.sum()
+        return rng.choice(values, size, p=weights)
+    raise ValueError(f'Неизвестное распределение: {distribution}')
+
+
+def quantize(field: str, values: np.ndarray) -> np.ndarray:
+    """
+    Значения выборки в допустимом диапазоне поля и с точностью ввода
+    (копейки, сотые доли процента, целые часы)
+    """
+    minimum, maximum, scale = SIMULATED_FIELDS[field]
+    values = np.clip(np.rint(values * scale) / scale, minimum, maximum)
+    return values.astype(np.int64) if scale == 1 else values
+
+
+class MonteCarloSimulation:
+    """
+    Распределение чистой прибыли товара при случайных цене, себестоимости,
+    выкупе, времени доставки и доле рекламы
+
+    Args:
+        category: Комиссии категории
+        product: Параметры товара, как у OzonCalculator (проверенный ввод);
+            значения полей без распределения берутся отсюда
+        distributions: Распределения по полям SIMULATED_FIELDS (см. draw())
+        samples: Количество сценариев
+        seed: Seed генератора (по умолчанию - случайный, возвращается в результате)
+        tariff: Версия тарифа
+    """
+
+    def __init__(self, category: CategoryCommissions, product: Dict[str, Any],
+                 distributions: Dict[str, Dict[str, Any]], samples: int = DEFAULT_SAMPLES,
+                 seed: Optional[int] = None, tariff: CompiledTariff = None):
+        self.category = category
+        self.samples = samples
+        self.seed = secrets.randbits(32) if seed is None else seed
+        self.monthly_sales = product['monthly_sales']
+
+        # Поля разыгрываются в фиксированном порядке - результат зависит только от seed
+        rng = np.random.default_rng(self.seed)
+        columns = {
+            field: (quantize(field, draw(rng, distributions[field], samples))
+                    if field in distributions else np.full(samples, float(product[field])))
+            for field in SIMULATED_FIELDS
+        }
+        self.batch = BatchCalculator(
+            price=columns['price'],
+            volume=product['volume'],
+            buyout_rate=columns['buyout_rate'],
+            delivery_time=columns['delivery_time'],
+            tax_rate=product['tax_rate'],
+            ad_costs_rate=columns['ad_costs_rate'],
+            cost_price=columns['cost_price'],
+            other_costs=product['other_costs'],
+            fbo_commission=CommissionColumns.from_bands([category.bands('FBO')]).broadcast(samples),
+            fbs_commission=CommissionColumns.from_bands([category.bands('FBS')]).broadcast(samples),
+            tariff=tariff,
+        )
+
+    def net_profit(self, scheme_name: str) -> np.ndarray:
+        """
+        Чистая прибыль за штуку по сценариям (копейки)
+        """
+        commission = self.batch.fbo_commission if scheme_name == 'FBO' else self.batch.fbs_commission
+        return _div_round(self.batch.net_profit_units(commission), UNITS_PER_KOPECK)
+
+    def summarize(self, scheme_name: str,
+                  percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """
+        Статистика прибыли схемы: среднее, разброс, перцентили прибыли за штуку,
+        вероятность убытка и ожидаемая прибыль за месяц
+        """
+        net = self.net_profit(scheme_name)
+        mean = net.mean()
+
+        def rubles(kopecks) -> Decimal:
+            return round(Decimal(float(kopecks)) / KOPECKS, 2)
+
+        return {
+            'scheme': scheme_name,
+            'net_profit_per_unit': {
+                'mean': rubles(mean),
+                'std': rubles(net.std()),
+                'min': rubles(net.min()),
+                'max': rubles(net.max()),
+                'percentiles': {
+                    f'p{percentile:g}': rubles(value)
+                    for percentile, value in zip(percentiles, np.percentile(net, percentiles))
+                },
+            },
+            'probability_of_loss': round(float(np.count_nonzero(net < 0)) / self.samples, 4),
+            'expected_monthly_profit': rubles(mean * self.monthly_sales),
+        }
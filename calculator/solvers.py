@@ -0,0 +1,117 @@
+"""
+Аналитические решатели для поиска цены (точка безубыточности, целевая маржа).
+
+Чистая прибыль кусочно-линейна по цене: на каждом участке цены
+(≤300₽ и >300₽ для логистики, ценовые диапазоны комиссии) она имеет вид
+slope × цена + intercept.
+Решатель перебирает участки и находит корень на каждом из них в закрытой форме,
+воспроизводя результат исходного бисекционного поиска (40 шагов).
+"""
+
+from decimal import Decimal
+from typing import List, NamedTuple, Optional
+
+
+# Количество шагов бисекции, результат которой воспроизводит решатель
+BISECTION_ITERATIONS = 40
+
+# Метки для случаев, когда решения в диапазоне поиска нет
+LOWER_BOUND_SEGMENT = 'lower_bound'
+UPPER_BOUND_SEGMENT = 'upper_bound'
+
+
+class PriceSegment(NamedTuple):
+    """
+    Участок цены (lower; upper], на котором целевая функция линейна:
+    f(цена) = slope × цена + intercept
+
+    lower=None / upper=None означает отсутствие границы с соответствующей стороны.
+    """
+    lower: Optional[Decimal]
+    upper: Optional[Decimal]
+    slope: Decimal
+    intercept: Decimal
+    label: str
+
+
+class SolverResult(NamedTuple):
+    """
+    Найденная цена и метка участка, из которого получен ответ
+    """
+    price: Decimal
+    segment: str
+
+
+def find_segment(segments: List[PriceSegment], price: Decimal) -> PriceSegment:
+    """
+    Найти участок, которому принадлежит цена (участки упорядочены по возрастанию)
+    """
+    for segment in segments:
+        if segment.upper is None or price <= segment.upper:
+            return segment
+    return segments[-1]
+
+
+def solve_price(segments: List[PriceSegment], low: Decimal, high: Decimal,
+                strict: bool = True, iterations: int = BISECTION_ITERATIONS) -> SolverResult:
+    """
+    Найти цену, при которой f(цена) переходит через 0.
+
+    Результат совпадает (после округления до копеек) с бисекцией вида:
+        mid = (low + high) / 2
+        если f(mid) > 0 (strict) или f(mid) >= 0 (не strict): high = mid, иначе low = mid
+
+    Точки смены знака (корни на участках и границы участков) известны заранее,
+    поэтому шаги бисекции выполняются только пока в интервале больше одной такой точки.
+    Когда корень изолирован, он возвращается в закрытой форме. Если корень лежит
+    у границы округления до копеек, шаги продолжаются до конца, как в исходном поиске.
+    """
+    def predicate(price: Decimal) -> bool:
+        segment = find_segment(segments, price)
+        value = segment.slope * price + segment.intercept
+        return value > 0 if strict else value >= 0
+
+    # Точки, в которых предикат может сменить значение
+    change_points = set()
+    for index, segment in enumerate(segments):
+        if index < len(segments) - 1:
+            change_points.add(segment.upper)
+        if segment.slope != 0:
+            root = -segment.intercept / segment.slope
+            if ((segment.lower is None or root > segment.lower) and
+                    (segment.upper is None or root <= segment.upper)):
+                change_points.add(root)
+    change_points = sorted(change_points)
+
+    initial_low, initial_high = low, high
+    for step in range(iterations):
+        remaining = iterations - step
+        inner = [point for point in change_points if low < point < high]
+
+        if not inner:
+            # Предикат постоянен на интервале: бисекция сходится к одному из концов
+            tail = (high - low) / (Decimal('2') ** (remaining + 1))
+            if predicate((low + high) / 2):
+                price = low + tail
+                label = LOWER_BOUND_SEGMENT if low == initial_low else find_segment(segments, price).label
+            else:
+                price = high - tail
+                label = UPPER_BOUND_SEGMENT if high == initial_high else find_segment(segments, price).label
+            return SolverResult(price, label)
+
+        if len(inner) == 1:
+            point = inner[0]
+            if not predicate((low + point) / 2) and predicate((point + high) / 2):
+                # Изолированный переход «нет → да»: бисекция сходится к этой точке
+                tolerance = (high - low) / (Decimal('2') ** remaining)
+                if round(point - tolerance, 2) == round(point + tolerance, 2):
+                    return SolverResult(point, find_segment(segments, point).label)
+
+        mid = (low + high) / 2
+        if predicate(mid):
+            high = mid
+        else:
+            low = mid
+
+    price = (low + high) / 2
+    return SolverResult(price, find_segment(segments, price).label)
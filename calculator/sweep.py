@@ -0,0 +1,116 @@
+"""
+Расчет одного товара по всем категориям и схемам сразу.
+
+Для фиксированного товара от категории и схемы зависит только комиссия,
+а чистая прибыль аффинна по комиссии:
+
+    net(c) = net_without_commission - цена × c / 100
+
+Часть без комиссии считается один раз пакетным движком, затем все комиссии
+справочника (FBO и FBS) обрабатываются одной векторной операцией. Для категорий
+с ценовыми диапазонами берется ставка диапазона, в который попадает цена товара.
+"""
+
+from decimal import Decimal
+from typing import Dict, Any
+
+import numpy as np
+
+from .batch import BatchCalculator, UNITS_PER_KOPECK, _div_round, _percent_of
+from .tariffs import CompiledTariff
+
+
+class CommissionSweep:
+    """
+    Прибыль товара как функция комиссии для массивов комиссий
+
+    Параметры товара - в тех же единицах, что и у OzonCalculator.
+    """
+
+    def __init__(self, price, volume, buyout_rate, delivery_time, tax_rate, ad_costs_rate, cost_price,
+                 other_costs, tariff: CompiledTariff = None):
+        batch = BatchCalculator(
+            price=price, volume=volume, buyout_rate=buyout_rate, delivery_time=delivery_time,
+            tax_rate=tax_rate, ad_costs_rate=ad_costs_rate, cost_price=cost_price, other_costs=other_costs,
+            fbo_commission=0, fbs_commission=0, tariff=tariff,
+        )
+        self.price = int(batch.price[0])
+        self.price4 = self.price * 100
+        self.net_without_commission = int(batch._net_units(
+            batch.price[:, None] * 100, batch.base[:, None], batch.coeff[:, None],
+            batch.delivery_percent[:, None], batch.not_buyout[:, None], np.zeros((1, 1), dtype=np.int64)
+        )[0, 0])
+
+    def calculate(self, commission: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Прибыль за штуку (копейки) и маржа (сотые доли процента) для комиссий
+        в сотых долях процента
+        """
+        net = self.net_without_commission - self.price4 * commission
+        return {
+            'net_profit_per_unit': _div_round(net, UNITS_PER_KOPECK),
+            'net_profit_per_unit_percent': _percent_of(net, self.price),
+        }
+
+
+def rank_rows(net_profit: np.ndarray, ids: np.ndarray, count: int, best: bool = True) -> np.ndarray:
+    """
+    Индексы count лучших (или худших) строк по прибыли; при равенстве - по ID категории
+    """
+    count = min(count, len(net_profit))
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    key = -net_profit if best else net_profit
+    if count < len(key):
+        # Кандидаты с запасом на равные значения на границе отбора
+        boundary = np.partition(key, count - 1)[count - 1]
+        candidates = np.flatnonzero(key <= boundary)
+    else:
+        candidates = np.arange(len(key))
+    order = np.lexsort((ids[candidates], key[candidates]))
+    return candidates[order[:count]]
+
+
+def sweep_summary(sweep: CommissionSweep, table, schemes, top_n: int) -> Dict[str, Any]:
+    """
+    Лучшие и худшие пары (категория, схема) по чистой прибыли за штуку
+
+    Args:
+        sweep: Товар
+        table: Справочник комиссий (category_cache.table())
+        schemes: Схемы для сравнения ('FBO', 'FBS')
+        top_n: Сколько лучших и худших пар вернуть
+    """
+    commissions = {'FBO': table.fbo_bands.at(sweep.price4), 'FBS': table.fbs_bands.at(sweep.price4)}
+    rows = len(table)
+    scheme_codes = np.repeat(np.arange(len(schemes)), rows)
+    positions = np.tile(np.arange(rows), len(schemes))
+    commission = np.concatenate([commissions[scheme] for scheme in schemes])
+    results = sweep.calculate(commission)
+    net_profit = results['net_profit_per_unit']
+
+    def entries(indices):
+        return [
+            {
+                'category_id': int(table.ids[positions[index]]),
+                'name': table.names[positions[index]],
+                'category_group': table.groups[positions[index]],
+                'scheme': schemes[scheme_codes[index]],
+                'commission': Decimal(int(commission[index])).scaleb(-2),
+                'net_profit_per_unit': Decimal(int(net_profit[index])).scaleb(-2),
+                'net_profit_per_unit_percent': Decimal(int(results['net_profit_per_unit_percent'][index])).scaleb(-2),
+            }
+            for index in indices
+        ]
+
+    ids = table.ids[positions]
+    return {
+        'categories': rows,
+        'top': entries(rank_rows(net_profit, ids, top_n, best=True)),
+        'bottom': entries(rank_rows(net_profit, ids, top_n, best=False)),
+        # Полная таблица по схемам: колонки в порядке table.ids
+        'columns': {
+            scheme: {name: values[code * rows:(code + 1) * rows] for name, values in results.items()}
+            for code, scheme in enumerate(schemes)
+        },
+    }
@@ -0,0 +1,252 @@
+"""
+Тарифы Ozon: версии с датами вступления в силу и их скомпилированное представление.
+
+Тарифы хранятся в файле данных (TARIFF_FILE, по умолчанию calculator/data/tariffs.json):
+ставка эквайринга, порог цены, таблица логистики до порога, ступенчатая шкала
+свыше порога и коэффициенты времени доставки. Каждая версия один раз на процесс
+переводится в структуры прямого доступа:
+- массив коэффициентов доставки по часам (0–61, дальше - максимальное значение);
+- отсортированные границы объема для bisect по таблице товаров до порога;
+- массив базового тарифа по литрам для товаров свыше порога (до 2112 л).
+
+Расчет получает готовый CompiledTariff, поэтому выбор версии (tariff_version
+или as_of) ничего не стоит во время запроса. Файл перечитывается, когда меняется
+время его модификации - новая версия тарифа не требует выкладки кода.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+from decimal import Decimal, ROUND_UP
+from pathlib import Path
+from threading import Lock
+import hashlib
+import json
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Файл тарифов по умолчанию (если не задан TARIFF_FILE)
+DEFAULT_TARIFF_FILE = Path(__file__).resolve().parent / 'data' / 'tariffs.json'
+
+
+class TariffNotFound(LookupError):
+    """
+    Версия тарифа не найдена (неизвестное имя или дата раньше первой версии)
+    """
+
+
+class CompiledTariff:
+    """
+    Неизменяемое представление тарифов Ozon с поиском за O(1) / O(log n)
+    """
+    # Максимальный объем, учитываемый в тарифе (литры)
+    MAX_VOLUME_LITERS = 2112
+
+    def __init__(self, acquiring_rate: Decimal, price_threshold: Decimal,
+                 logistics_table_under: List[Tuple[Decimal, Decimal]], max_cost_under: Decimal,
+                 delivery_coefficients: List[Tuple[int, Decimal, Decimal]],
+                 base_logistics_over: Callable[[int], Decimal],
+                 version: str = 'base', effective_from: Optional[date] = None):
+        """
+        Args:
+            acquiring_rate: Ставка эквайринга в процентах
+            price_threshold: Порог цены между тарифами логистики
+            logistics_table_under: Таблица (объем, стоимость) для товаров до порога
+            max_cost_under: Стоимость для объема больше таблицы (товары до порога)
+            delivery_coefficients: Таблица (часы, коэффициент, процент от цены)
+            base_logistics_over: Базовый тариф для товаров свыше порога по целым литрам
+            version: Имя версии тарифа
+            effective_from: Дата вступления версии в силу (None - действует с начала)
+        """
+        self.version = version
+        self.effective_from = effective_from
+        self.acquiring_rate = acquiring_rate
+        self.price_threshold = price_threshold
+        self.logistics_table_under = tuple(logistics_table_under)
+        self.max_cost_under = max_cost_under
+        self.delivery_coefficients = tuple(delivery_coefficients)
+
+        self.under_volumes = tuple(volume for volume, _ in logistics_table_under)
+        self.under_costs = tuple(cost for _, cost in logistics_table_under) + (max_cost_under,)
+
+        self.over_scale = base_logistics_over
+        self.over_costs = tuple(base_logistics_over(liters) for liters in range(self.MAX_VOLUME_LITERS + 1))
+
+        # Прямой массив по часам: до первой строки таблицы - минимальные значения,
+        # между строками - ближайшая большая строка, после последней - максимальные
+        self.max_delivery_hours = delivery_coefficients[-1][0]
+        by_hour = []
+        row = 0
+        for hour in range(self.max_delivery_hours + 1):
+            while delivery_coefficients[row][0] < hour:
+                row += 1
+            by_hour.append(delivery_coefficients[row][1:])
+        self.delivery_by_hour = tuple(by_hour)
+
+        # Отпечаток содержимого таблиц: меняется при любом изменении тарифа
+        self.fingerprint = hashlib.sha256(repr((
+            self.acquiring_rate, self.price_threshold, self.under_volumes,
+            self.under_costs, self.over_costs, self.delivery_by_hour,
+        )).encode()).hexdigest()[:16]
+
+    def delivery_adjustments(self, hours: int) -> Tuple[Decimal, Decimal]:
+        """
+        Коэффициент к базовому тарифу и процент от цены по времени доставки
+        """
+        if hours >= self.max_delivery_hours:
+            return self.delivery_by_hour[-1]
+        return self.delivery_by_hour[max(hours, 0)]
+
+    def base_logistics_under(self, volume: Decimal) -> Decimal:
+        """
+        Базовый тариф логистики для товаров до порога цены
+        """
+        return self.under_costs[bisect_left(self.under_volumes, volume)]
+
+    def base_logistics_over(self, volume: Decimal) -> Decimal:
+        """
+        Базовый тариф логистики для товаров свыше порога цены
+        """
+        liters = int(volume.to_integral_value(rounding=ROUND_UP))
+        return self.over_costs[min(max(liters, 0), self.MAX_VOLUME_LITERS)]
+
+    def base_logistics(self, volume: Decimal, price: Decimal) -> Decimal:
+        """
+        Базовый тариф логистики по объему (литры) и цене товара
+        """
+        if price <= self.price_threshold:
+            return self.base_logistics_under(volume)
+        return self.base_logistics_over(volume)
+
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'CompiledTariff':
+        """
+        Компиляция версии тарифа из записи файла тарифов
+        """
+        over = data['logistics_over_threshold']
+        effective_from = data.get('effective_from')
+        return cls(
+            acquiring_rate=Decimal(data['acquiring_rate']),
+            price_threshold=Decimal(data['price_threshold']),
+            logistics_table_under=[
+                (Decimal(volume), Decimal(cost)) for volume, cost in data['logistics_under_threshold']
+            ],
+            max_cost_under=Decimal(data['max_cost_under_threshold']),
+            delivery_coefficients=[
+                (int(hours), Decimal(coeff), Decimal(percent))
+                for hours, coeff, percent in data['delivery_time_coefficients']
+            ],
+            base_logistics_over=step_scale(
+                steps=[(int(liters), Decimal(cost)) for liters, cost in over['steps']],
+                per_liter_up_to=int(over['per_liter']['up_to']),
+                per_liter_cost=Decimal(over['per_liter']['cost']),
+                max_cost=Decimal(over['max_cost']),
+            ),
+            version=data['version'],
+            effective_from=date.fromisoformat(effective_from) if effective_from else None,
+        )
+
+
+def step_scale(steps: List[Tuple[int, Decimal]], per_liter_up_to: int,
+               per_liter_cost: Decimal, max_cost: Decimal) -> Callable[[int], Decimal]:
+    """
+    Ступенчатая шкала базового тарифа для товаров свыше порога цены
+
+    До последней ступени - стоимость первой ступени, в которую попадает объем;
+    дальше до per_liter_up_to литров - последняя ступень плюс per_liter_cost
+    за каждый литр сверх нее; еще больший объем - max_cost.
+
+    Args:
+        steps: Ступени (литры, стоимость) по возрастанию объема
+    """
+    step_liters = [liters for liters, _ in steps]
+    last_liters, last_cost = steps[-1]
+
+    def cost(volume_rounded: int) -> Decimal:
+        if volume_rounded <= last_liters:
+            return steps[bisect_left(step_liters, volume_rounded)][1]
+        if volume_rounded <= per_liter_up_to:
+            return last_cost + (Decimal(volume_rounded) - Decimal(last_liters)) * per_liter_cost
+        return max_cost
+
+    return cost
+
+
+class TariffRegistry:
+    """
+    Версии тарифов из файла данных, скомпилированные один раз на процесс
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Файл тарифов (по умолчанию - настройка TARIFF_FILE)
+        """
+        self._path = path
+        self._mtime = None
+        # Версии по имени, версии по дате вступления в силу и сами даты (для bisect);
+        # заменяются целиком при перечитывании файла
+        self._state: Tuple[Dict[str, CompiledTariff], List[CompiledTariff], List[date]] = ({}, [], [])
+        self._lock = Lock()
+
+    @property
+    def path(self) -> Path:
+        if self._path is not None:
+            return self._path
+        from django.conf import settings
+        return Path(getattr(settings, 'TARIFF_FILE', DEFAULT_TARIFF_FILE))
+
+    def get(self, version: Optional[str] = None, as_of: Optional[date] = None) -> CompiledTariff:
+        """
+        Тариф по имени версии или версия, действующая на дату as_of
+        (по умолчанию - на сегодня); TariffNotFound, если такой нет
+        """
+        by_name, by_date, dates = self._load()
+        if version is not None:
+            tariff = by_name.get(version)
+            if tariff is None:
+                raise TariffNotFound(f'Версия тарифа {version} не найдена. Доступны: {", ".join(by_name)}')
+            return tariff
+
+        as_of = as_of or date.today()
+        position = bisect_right(dates, as_of)
+        if position == 0:
+            raise TariffNotFound(f'Нет тарифа, действующего на {as_of.isoformat()}')
+        return by_date[position - 1]
+
+    def versions(self) -> List[CompiledTariff]:
+        """
+        Все версии по дате вступления в силу
+        """
+        return list(self._load()[1])
+
+    def _load(self):
+        """
+        Текущее состояние реестра; файл перечитывается при изменении времени модификации
+        """
+        path = self.path
+        mtime = os.stat(path).st_mtime_ns
+        if mtime == self._mtime:
+            return self._state
+        with self._lock:
+            if mtime != self._mtime:
+                with open(path, encoding='utf-8') as tariff_file:
+                    versions = [CompiledTariff.from_data(item) for item in json.load(tariff_file)['versions']]
+                by_name = {tariff.version: tariff for tariff in versions}
+                if len(by_name) != len(versions):
+                    raise ValueError(f'Повторяющиеся имена версий тарифа в {path}')
+                by_date = sorted(versions, key=lambda tariff: tariff.effective_from or date.min)
+                self._state = (by_name, by_date, [tariff.effective_from or date.min for tariff in by_date])
+                self._mtime = mtime
+            return self._state
+
+
+tariff_registry = TariffRegistry()
+
+
+def get_default_tariff() -> CompiledTariff:
+    """
+    Тариф, действующий на сегодня
+    """
+    return tariff_registry.get()
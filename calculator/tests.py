@@ -1,3 +1,262 @@
-from django.test import TestCase
+from decimal import Decimal
+from pathlib import Path
+from random import Random
+from unittest import mock
+import json
+import tempfile
 
-# Create your tests here.
+from django.core.cache import caches
+from django.conf import settings
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from categories.models import Category
+from .solvers import PriceSegment, find_segment, solve_price
+
+
+def bisect_price(segments, low, high, strict, iterations=40):
+    """
+    Исходный бисекционный поиск цены, который воспроизводит solve_price
+    """
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        segment = find_segment(segments, mid)
+        value = segment.slope * mid + segment.intercept
+        if value > 0 if strict else value >= 0:
+            high = mid
+        else:
+            low = mid
+    return (low + high) / 2
+
+
+class SolvePriceTests(TestCase):
+    """
+    Решатель цены в закрытой форме (calculator.solvers)
+    """
+
+    def test_matches_bisection(self):
+        random = Random(12)
+        low = Decimal('0.01')
+        for _ in range(300):
+            edges = sorted(random.sample(range(50, 3000), random.randint(0, 3)))
+            bounds = [None, *map(Decimal, edges), None]
+            segments = [
+                PriceSegment(
+                    bounds[index], bounds[index + 1],
+                    Decimal(random.randint(-3000, 9000)) / 10000,
+                    Decimal(random.randint(-400000, 100000)) / 100,
+                    f'piece_{index}',
+                )
+                for index in range(len(bounds) - 1)
+            ]
+            high = Decimal(random.choice([1000, 2000, 4000]))
+            for strict in (True, False):
+                with self.subTest(segments=segments, strict=strict):
+                    self.assertEqual(
+                        round(solve_price(segments, low, high, strict=strict).price, 2),
+                        round(bisect_price(segments, low, high, strict), 2)
+                    )
+
+    def test_jump_at_threshold(self):
+        # Прибыль становится положительной скачком на границе 300₽; граница относится к участку слева
+        segments = [
+            PriceSegment(None, Decimal('300'), Decimal('0.5'), Decimal('-200'), 'up_to_300'),
+            PriceSegment(Decimal('300'), None, Decimal('0.5'), Decimal('-140'), 'over_300'),
+        ]
+        result = solve_price(segments, Decimal('0.01'), Decimal('1000'))
+        self.assertEqual(round(result.price, 2), Decimal('300.00'))
+        self.assertEqual(result.segment, 'up_to_300')
+
+
+class CalculateDeltaTests(TestCase):
+    """
+    Пересчет по изменениям (/api/calculate/delta/)
+    """
+
+    def setUp(self):
+        caches[settings.CALCULATION_CACHE_ALIAS].clear()
+        self.category = Category.objects.create(
+            name='Шарф', category_group='Аксессуары', fbo_commission='43.00', fbs_commission='47.00'
+        )
+
+    def calculate(self, **fields):
+        payload = {
+            'category_id': self.category.id, 'price': 805, 'weight': 0.15, 'tax_rate': 6,
+            'buyout_rate': 90, 'delivery_time': 45, 'ad_costs_rate': 10, 'cost_price': 120,
+            'other_costs': 10, 'monthly_sales': 1000,
+        }
+        payload.update(fields)
+        response = self.client.post('/api/calculate/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def delta(self, token, changes):
+        return self.client.post(
+            '/api/calculate/delta/', {'result_token': token, 'changes': changes},
+            content_type='application/json'
+        )
+
+    def test_delta_after_dimensions_mode(self):
+        # 10.5 × 10.5 × 10.5 / 1000 = 1.157625 л - больше знаков, чем у поля volume
+        dimensions = {'dimension_mode': 'dimensions', 'length': 10.5, 'width': 10.5, 'height': 10.5}
+        previous = self.calculate(**dimensions)
+
+        response = self.delta(previous['result_token'], {'buyout_rate': 85})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['fbo_results'], self.calculate(**dimensions, buyout_rate=85)['fbo_results'])
+
+        # Следующий пересчет по новому токену тоже сохраняет габариты
+        response = self.delta(response.json()['result_token'], {'delivery_time': 30})
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_delta_switches_dimensions_to_volume(self):
+        previous = self.calculate(dimension_mode='dimensions', length=10.5, width=10.5, height=10.5)
+
+        response = self.delta(previous['result_token'], {'volume': 2})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            response.json()['fbo_results'],
+            self.calculate(dimension_mode='volume', volume=2)['fbo_results']
+        )
+
+
+class CalculateBatchTests(TestCase):
+    """
+    Пакетный расчет (/api/calculate/batch/)
+    """
+
+    def setUp(self):
+        caches[settings.CALCULATION_CACHE_ALIAS].clear()
+        self.category = Category.objects.create(
+            name='Шарф', category_group='Аксессуары', fbo_commission='43.00', fbs_commission='47.00'
+        )
+        self.payload = {
+            'category_id': self.category.id, 'price': '1500', 'weight': 0.15, 'dimension_mode': 'volume',
+            'volume': 1, 'tax_rate': 6, 'buyout_rate': 90, 'delivery_time': 45, 'ad_costs_rate': 10,
+            'cost_price': 120, 'other_costs': 10, 'monthly_sales': 1000,
+        }
+
+    def lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_row_errors_do_not_fail_batch(self):
+        rows = [
+            self.payload,
+            # Цена ниже затрат: результат не выводится
+            dict(self.payload, price='10', cost_price='500'),
+            dict(self.payload, price=-1),
+            dict(self.payload, category_id=self.category.id + 1000),
+        ]
+        lines = self.lines(self.client.post('/api/calculate/batch/', rows, content_type='application/json'))
+
+        self.assertEqual([line['index'] for line in lines], [0, 1, 2, 3])
+        single = self.client.post('/api/calculate/', self.payload, content_type='application/json').json()
+        self.assertEqual(lines[0]['fbo_results'], single['fbo_results'])
+        self.assertEqual(lines[0]['fbs_results'], single['fbs_results'])
+        self.assertIn('error', lines[1])
+        self.assertIn('price', lines[2]['errors'])
+        self.assertIn('не найдена', lines[3]['error'])
+
+    def test_matches_single_calculation(self):
+        banded = Category.objects.create(
+            name='Кружка', category_group='Посуда', fbo_commission='20.00', fbs_commission='22.00',
+            commission_bands={
+                'FBO': {'edges': ['300', '1500'], 'rates': ['14.00', '20.00', '25.00']},
+                'FBS': {'edges': ['1500'], 'rates': ['22.00', '27.50']},
+            }
+        )
+        random = Random(7)
+        rows = []
+        for _ in range(40):
+            rows.append(dict(
+                self.payload,
+                category_id=random.choice([self.category.id, banded.id]),
+                price=str(random.choice([300, 301, 1500, 1500.01]) if random.random() < 0.3
+                          else round(random.uniform(50, 20000), 2)),
+                volume=round(random.uniform(0.1, 200), 3),
+                buyout_rate=random.randint(10, 100),
+                delivery_time=random.randint(1, 120),
+                tax_rate=random.choice([0, 6, 15]),
+                ad_costs_rate=random.randint(0, 30),
+                cost_price=round(random.uniform(0, 3000), 2),
+                monthly_sales=random.randint(1, 5000),
+            ))
+        rows.append(dict(self.payload, dimension_mode='dimensions', length=30, width=20, height=15, volume=None))
+        lines = self.lines(self.client.post('/api/calculate/batch/', rows, content_type='application/json'))
+
+        self.assertEqual(len(lines), len(rows))
+        for row, line in zip(rows, lines):
+            single = self.client.post('/api/calculate/', row, content_type='application/json')
+            with self.subTest(index=line['index'], price=row['price']):
+                if single.status_code != 200:
+                    self.assertIn('error', line)
+                    continue
+                self.assertEqual(line['fbo_results'], single.json()['fbo_results'])
+                self.assertEqual(line['fbs_results'], single.json()['fbs_results'])
+
+    def test_ndjson_input(self):
+        body = '\n'.join([
+            json.dumps(self.payload),
+            '{не json',
+            '',
+            json.dumps(dict(self.payload, price='2000')),
+        ])
+        lines = self.lines(self.client.post(
+            '/api/calculate/batch/?fields=net_profit_per_unit', body, content_type='application/x-ndjson'
+        ))
+
+        self.assertEqual([line['index'] for line in lines], [0, 1, 2])
+        self.assertEqual(lines[1]['errors'], {'non_field_errors': ['Некорректная строка JSON']})
+        self.assertEqual(set(lines[2]['fbo_results']), {'scheme', 'net_profit_per_unit'})
+        self.assertGreater(
+            float(lines[2]['fbo_results']['net_profit_per_unit']),
+            float(lines[0]['fbo_results']['net_profit_per_unit'])
+        )
+
+
+# Метка версии справочника для тестов, выполняющих обработчики on_commit:
+# настоящая метка сбросила бы кэши запущенного сервера
+TEST_CATEGORY_VERSION_FILE = Path(tempfile.gettempdir()) / 'ozon_calculator_test_category_version'
+
+
+@override_settings(CATEGORY_VERSION_FILE=TEST_CATEGORY_VERSION_FILE)
+@mock.patch('calculator.signals.recalculate_category')
+class CategoryRecalculationTests(TestCase):
+    """
+    Пересчет товаров портфелей при изменении категории
+    """
+
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Шарф', category_group='Аксессуары', fbo_commission='43.00', fbs_commission='47.00'
+        )
+
+    def import_rows(self, *rows):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for defaults in rows:
+                    Category.objects.update_or_create(name='Шарф', defaults=defaults)
+
+    def test_unchanged_import_does_not_recalculate(self, recalculate_category):
+        self.import_rows({'category_group': 'Аксессуары', 'fbo_commission': 43, 'fbs_commission': '47.0'})
+        recalculate_category.assert_not_called()
+
+    def test_changes_recalculate_each_category_once(self, recalculate_category):
+        self.import_rows(
+            {'fbo_commission': '44.00'},
+            {'commission_bands': {'FBO': {'edges': ['100'], 'rates': ['14.00', '44.00']}}},
+        )
+        recalculate_category.assert_called_once_with(self.category.id)
+
+    def test_changes_survive_rolled_back_savepoint(self, recalculate_category):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                with transaction.atomic():
+                    self.category.fbo_commission = '44.00'
+                    self.category.save()
+                    transaction.set_rollback(True)
+                self.category.refresh_from_db()
+                self.category.fbo_commission = '44.00'
+                self.category.save()
+        recalculate_category.assert_called_once_with(self.category.id)
@@ -1,8 +1,28 @@
 from django.urls import path
-from .views import CalculateAPIView, CalculateExportAPIView
+from .views import (
+    CalculateAPIView, CalculateDeltaAPIView, CalculateExportAPIView, CalculateBatchAPIView,
+    CalculateInverseAPIView, CalculateInverseBatchAPIView, CalculatePackagingAPIView,
+    CalculateGridAPIView, CalculateSweepAPIView, CalculateSimulationAPIView,
+    CalculatorMetricsAPIView, CalculatorTariffsAPIView,
+    PortfolioListAPIView, PortfolioDetailAPIView, PortfolioItemsAPIView, PortfolioItemAPIView,
+)
 
 urlpatterns = [
     path('calculate/', CalculateAPIView.as_view(), name='calculate'),
+    path('calculate/delta/', CalculateDeltaAPIView.as_view(), name='calculate-delta'),
     path('calculate/export/', CalculateExportAPIView.as_view(), name='calculate-export'),
+    path('calculate/batch/', CalculateBatchAPIView.as_view(), name='calculate-batch'),
+    path('calculate/inverse/', CalculateInverseAPIView.as_view(), name='calculate-inverse'),
+    path('calculate/inverse/batch/', CalculateInverseBatchAPIView.as_view(), name='calculate-inverse-batch'),
+    path('calculate/packaging/', CalculatePackagingAPIView.as_view(), name='calculate-packaging'),
+    path('calculate/grid/', CalculateGridAPIView.as_view(), name='calculate-grid'),
+    path('calculate/sweep/', CalculateSweepAPIView.as_view(), name='calculate-sweep'),
+    path('calculate/simulate/', CalculateSimulationAPIView.as_view(), name='calculate-simulate'),
+    path('calculate/tariffs/', CalculatorTariffsAPIView.as_view(), name='calculate-tariffs'),
+    path('calculate/metrics/', CalculatorMetricsAPIView.as_view(), name='calculate-metrics'),
+    path('portfolios/', PortfolioListAPIView.as_view(), name='portfolio-list'),
+    path('portfolios/<int:portfolio_id>/', PortfolioDetailAPIView.as_view(), name='portfolio-detail'),
+    path('portfolios/<int:portfolio_id>/items/', PortfolioItemsAPIView.as_view(), name='portfolio-items'),
+    path('portfolios/<int:portfolio_id>/items/<str:sku>/', PortfolioItemAPIView.as_view(), name='portfolio-item'),
 ]
 
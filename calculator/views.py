@@ -3,18 +3,110 @@ from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
 from io import BytesIO
+from itertools import islice
 from datetime import datetime
 from decimal import Decimal
 from openpyxl import Workbook
+import json
 
 from .serializers import (
     CalculationInputSerializer,
-    CalculationOutputSerializer
+    CalculationOutputSerializer,
+    DeltaInputSerializer,
+    DeltaOutputSerializer,
+    GridInputSerializer,
+    InverseInputSerializer,
+    InverseOutputSerializer,
+    PackagingInputSerializer,
+    PackagingOutputSerializer,
+    PortfolioItemInputSerializer,
+    PortfolioItemSerializer,
+    PortfolioItemsDeleteSerializer,
+    PortfolioSerializer,
+    PortfolioSummaryQuerySerializer,
+    PortfolioSummarySerializer,
+    ResultSelectionSerializer,
+    SimulationInputSerializer,
+    SimulationResultSerializer,
+    SweepEntrySerializer,
+    SweepInputSerializer
 )
 from .services import OzonCalculator
+from .batch import BatchCalculator
+from .grid import SensitivityGrid
+from .simulation import MonteCarloSimulation
+from .sweep import CommissionSweep, sweep_summary
+from .models import Portfolio, PortfolioItem
+from .portfolio import AGGREGATE_DIMENSIONS, delete_items, load_categories, portfolio_summary, save_items
+from .engine import ALL_SECTIONS, RESULT_SECTIONS, affected_sections, merge_sections
+from .fastpath import FloatCalculatorCore, float_engine_stats
+from .category_cache import category_cache
+from .result_cache import KEY_FIELDS, result_cache
+from .tariffs import tariff_registry
 from categories.models import Category
+from categories.search import search_cache
+from categories.snapshot import snapshot_cache
+from categories.suggest import suggest_index
+
+
+# Размер порции товаров, рассчитываемой за один проход пакетного движка
+BATCH_CHUNK_SIZE = 500
+
+# Типы содержимого для потока NDJSON (один JSON-объект на строку)
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+
+# Параметры запроса для выбора разделов и полей результата
+RESULT_SELECTION_PARAMETERS = [
+    OpenApiParameter(
+        name='include',
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        description='Разделы результата через запятую: summary, targets, sensitivity '
+                    '(или sensitivity.price, sensitivity.buyout, sensitivity.delivery_time, '
+                    'sensitivity.ad_costs). '
+                    'Не запрошенные разделы не вычисляются'
+    ),
+    OpenApiParameter(
+        name='fields',
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        description='Отдельные поля результата через запятую, например net_profit_per_unit'
+    ),
+]
+
+
+def calculate_results(category, data, sections=ALL_SECTIONS):
+    """
+    Расчет юнит-экономики по проверенным данным CalculationInputSerializer
+
+    В режиме CALCULATOR_ENGINE=float решатели цены работают в float64;
+    результат совпадает с Decimal-расчетом.
+    """
+    options = {}
+    calculator_class = OzonCalculator
+    if settings.CALCULATOR_ENGINE == 'float':
+        calculator_class = FloatCalculatorCore
+        options['verify_rate'] = settings.CALCULATOR_FLOAT_VERIFY_RATE
+    calculator = calculator_class(
+        category=category,
+        price=data['price'],
+        weight=data['weight'],
+        volume=data['volume'],
+        tax_rate=data['tax_rate'],
+        buyout_rate=data['buyout_rate'],
+        delivery_time=data['delivery_time'],
+        ad_costs_rate=data['ad_costs_rate'],
+        cost_price=data['cost_price'],
+        other_costs=data['other_costs'],
+        monthly_sales=data['monthly_sales'],
+        tariff=tariff_registry.get(data['tariff_version']),
+        **options
+    )
+    return calculator.calculate_all(sections)
 
 
 class CalculateAPIView(APIView):
@@ -28,6 +120,7 @@ class CalculateAPIView(APIView):
     @extend_schema(
         request=CalculationInputSerializer,
         responses={200: CalculationOutputSerializer},
+        parameters=RESULT_SELECTION_PARAMETERS,
         description='Расчет юнит-экономики товара для схем FBO и FBS'
     )
     def post(self, request):
@@ -36,45 +129,43 @@ class CalculateAPIView(APIView):
         """
         # Валидация входных данных
         input_serializer = CalculationInputSerializer(data=request.data)
+        selection_serializer = ResultSelectionSerializer(data=request.query_params)
         
         if not input_serializer.is_valid():
             return Response(
                 {'errors': input_serializer.errors},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if not selection_serializer.is_valid():
+            return Response(
+                {'errors': selection_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         validated_data = input_serializer.validated_data
+        sections = selection_serializer.validated_data['sections']
+        output_fields = selection_serializer.validated_data['output_fields']
         
-        # Проверяем существование категории
+        # Проверяем существование категории (комиссии берутся из кэша процесса)
         try:
-            category = Category.objects.get(id=validated_data['category_id'])
+            category = category_cache.get(validated_data['category_id'])
         except Category.DoesNotExist:
             return Response(
                 {'error': f'Категория с ID {validated_data["category_id"]} не найдена'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Создаем калькулятор и выполняем расчет
+        # Выполняем расчет (одинаковый ввод берется из кэша результатов)
         try:
-            calculator = OzonCalculator(
-                category_id=validated_data['category_id'],
-                price=validated_data['price'],
-                weight=validated_data['weight'],
-                volume=validated_data['volume'],
-                tax_rate=validated_data['tax_rate'],
-                buyout_rate=validated_data['buyout_rate'],
-                delivery_time=validated_data['delivery_time'],
-                ad_costs_rate=validated_data['ad_costs_rate'],
-                cost_price=validated_data['cost_price'],
-                other_costs=validated_data['other_costs'],
-                monthly_sales=validated_data['monthly_sales']
+            token, results = result_cache.get_or_calculate_with_token(
+                validated_data, lambda: calculate_results(category, validated_data, sections), sections
             )
             
-            # Выполняем расчет
-            results = calculator.calculate_all()
-            
-            # Сериализуем результаты
-            output_serializer = CalculationOutputSerializer(data=results)
+            # Сериализуем результаты (только запрошенные поля)
+            output_serializer = CalculationOutputSerializer(
+                data=dict(results, tariff_version=validated_data['tariff_version'], result_token=token),
+                fields=output_fields
+            )
             if output_serializer.is_valid():
                 return Response(output_serializer.data, status=status.HTTP_200_OK)
             else:
@@ -90,6 +181,105 @@ class CalculateAPIView(APIView):
             )
 
 
+class CalculateDeltaAPIView(APIView):
+    """
+    Пересчет юнит-экономики по изменениям относительно предыдущего расчета
+
+    Принимает result_token из ответа /api/calculate/ и измененные поля ввода.
+    Пересчитываются только разделы результата, зависящие от изменившихся полей
+    (engine.INPUT_DEPENDENCIES), остальные берутся из сохраненного расчета.
+    """
+
+    @extend_schema(
+        request=DeltaInputSerializer,
+        responses={200: DeltaOutputSerializer},
+        parameters=RESULT_SELECTION_PARAMETERS,
+        description='Пересчет по токену предыдущего результата и измененным полям. '
+                    'Без include= и fields= возвращаются разделы предыдущего расчета'
+    )
+    def post(self, request):
+        delta_serializer = DeltaInputSerializer(data=request.data)
+        selection_serializer = ResultSelectionSerializer(data=request.query_params)
+
+        if not delta_serializer.is_valid():
+            return Response(
+                {'errors': delta_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not selection_serializer.is_valid():
+            return Response(
+                {'errors': selection_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        entry = result_cache.get_entry(delta_serializer.validated_data['result_token'])
+        if entry is None:
+            return Response(
+                {'error': 'Предыдущий расчет не найден или устарел, выполните полный расчет'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        input_serializer = CalculationInputSerializer(
+            data=DeltaInputSerializer.apply_changes(entry['data'], delta_serializer.validated_data['changes'])
+        )
+        if not input_serializer.is_valid():
+            return Response(
+                {'errors': input_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = input_serializer.validated_data
+        if request.query_params.keys() & {'include', 'fields'}:
+            sections = selection_serializer.validated_data['sections']
+            output_fields = selection_serializer.validated_data['output_fields']
+        else:
+            sections = entry['sections']
+            output_fields = None if sections == ALL_SECTIONS else {
+                field for section in sections for field in RESULT_SECTIONS[section]
+            }
+
+        try:
+            category = category_cache.get(data['category_id'])
+        except Category.DoesNotExist:
+            return Response(
+                {'error': f'Категория с ID {data["category_id"]} не найдена'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Разделы, не зависящие от изменившихся полей, берутся из предыдущего результата
+        reused = frozenset()
+        if result_cache.is_current(entry):
+            changed = [field for field in KEY_FIELDS if data.get(field) != entry['data'].get(field)]
+            reused = (sections & entry['sections']) - affected_sections(changed)
+        recalculated = []
+
+        def calculate():
+            recalculated.extend(sorted(sections - reused))
+            results = calculate_results(category, data, sections - reused)
+            return merge_sections(results, entry['results'], reused) if reused else results
+
+        try:
+            token, results = result_cache.get_or_calculate_with_token(data, calculate, sections)
+
+            output_serializer = DeltaOutputSerializer(
+                data=dict(results, tariff_version=data['tariff_version'], result_token=token,
+                          recalculated_sections=recalculated),
+                fields=output_fields
+            )
+            if output_serializer.is_valid():
+                return Response(output_serializer.data, status=status.HTTP_200_OK)
+            return Response(
+                {'error': 'Ошибка при формировании результатов расчета'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        except Exception as e:
+            return Response(
+                {'error': f'Ошибка при расчете: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class CalculateExportAPIView(APIView):
     """
     Экспорт результатов расчета юнит-экономики в Excel
@@ -112,25 +302,15 @@ class CalculateExportAPIView(APIView):
         data = input_serializer.validated_data
 
         try:
-            calculator = OzonCalculator(
-                category_id=data['category_id'],
-                price=data['price'],
-                weight=data['weight'],
-                volume=data['volume'],
-                tax_rate=data['tax_rate'],
-                buyout_rate=data['buyout_rate'],
-                delivery_time=data['delivery_time'],
-                ad_costs_rate=data['ad_costs_rate'],
-                cost_price=data['cost_price'],
-                other_costs=data['other_costs'],
-                monthly_sales=data['monthly_sales']
-            )
-            results = calculator.calculate_all()
+            category = category_cache.get(data['category_id'])
         except Category.DoesNotExist:
             return Response(
                 {'error': f'Категория с ID {data["category_id"]} не найдена'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+        try:
+            results = result_cache.get_or_calculate(data, lambda: calculate_results(category, data))
         except Exception as e:
             return Response(
                 {'error': f'Ошибка при расчете: {str(e)}'},
@@ -161,6 +341,7 @@ class CalculateExportAPIView(APIView):
             ('Себестоимость', 'cost_price'),
             ('Налог на прибыль', 'profit_tax'),
             ('Прочие затраты', 'other_costs'),
+            ('Реклама', 'ad_costs'),
             ('Чистая прибыль за шт', 'net_profit_per_unit'),
             ('Прибыль за месяц', 'net_profit_total'),
             ('Прибыль за год', 'annual_net_profit'),
@@ -215,6 +396,15 @@ class CalculateExportAPIView(APIView):
                 serialize(row.get('net_profit_per_unit_percent', '')),
             ])
 
+        ad_costs_sheet = workbook.create_sheet('Реклама FBO')
+        ad_costs_sheet.append(['Реклама %', 'Прибыль/шт', 'Маржа %'])
+        for row in fbo.get('sensitivity', {}).get('ad_costs', []):
+            ad_costs_sheet.append([
+                row.get('ad_costs_rate'),
+                serialize(row.get('net_profit_per_unit', '')),
+                serialize(row.get('net_profit_per_unit_percent', '')),
+            ])
+
         buffer = BytesIO()
         workbook.save(buffer)
         buffer.seek(0)
@@ -228,3 +418,711 @@ class CalculateExportAPIView(APIView):
         )
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
+
+
+class CalculateBatchAPIView(APIView):
+    """
+    Пакетный расчет юнит-экономики с потоковой выдачей результатов в NDJSON
+
+    Принимает JSON-массив или NDJSON-поток (Content-Type: application/x-ndjson)
+    с теми же полями, что и /api/calculate/. Результаты пишутся построчно по мере
+    расчета, поэтому память не растет с размером пакета. Ошибки валидации и вывода
+    отдельных товаров возвращаются в их строках и не прерывают весь пакет.
+    """
+    input_serializer_class = CalculationInputSerializer
+
+    @extend_schema(
+        request=CalculationInputSerializer(many=True),
+        responses={200: OpenApiTypes.STR},
+        parameters=RESULT_SELECTION_PARAMETERS,
+        description='Пакетный расчет юнит-экономики; ответ - NDJSON, по строке на товар в порядке запроса'
+    )
+    def post(self, request):
+        selection_serializer = ResultSelectionSerializer(data=request.query_params)
+        if not selection_serializer.is_valid():
+            return Response(
+                {'errors': selection_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.content_type.split(';')[0].strip() in NDJSON_CONTENT_TYPES:
+            payloads = self._iter_ndjson(request._request)
+        else:
+            if not isinstance(request.data, list):
+                return Response(
+                    {'error': 'Ожидается JSON-массив с параметрами товаров или NDJSON-поток'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            payloads = iter(request.data)
+
+        return StreamingHttpResponse(
+            self._stream_results(payloads, selection_serializer.validated_data),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+
+    @staticmethod
+    def _iter_ndjson(stream):
+        """
+        Построчное чтение NDJSON без загрузки всего тела запроса в память
+        """
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+    def _stream_results(self, payloads, selection):
+        index = 0
+        while True:
+            chunk = list(islice(payloads, BATCH_CHUNK_SIZE))
+            if not chunk:
+                return
+            for line in self._calculate_chunk(chunk, index, selection):
+                yield json.dumps(line, cls=JSONEncoder, ensure_ascii=False) + '\n'
+            index += len(chunk)
+
+    def _calculate_chunk(self, chunk, offset, selection):
+        """
+        Расчет порции товаров: валидация, комиссии категорий из кэша, пакетный расчет
+        """
+        lines = {}
+        valid = []
+        for position, payload in enumerate(chunk, start=offset):
+            if payload is None:
+                lines[position] = {'index': position, 'errors': {'non_field_errors': ['Некорректная строка JSON']}}
+                continue
+            input_serializer = self.input_serializer_class(data=payload)
+            if input_serializer.is_valid():
+                valid.append((position, input_serializer.validated_data))
+            else:
+                lines[position] = {'index': position, 'errors': input_serializer.errors}
+
+        categories = category_cache.get_many({data['category_id'] for _, data in valid})
+        found = []
+        for position, data in valid:
+            if data['category_id'] in categories:
+                found.append((position, data))
+            else:
+                lines[position] = {
+                    'index': position,
+                    'error': f'Категория с ID {data["category_id"]} не найдена'
+                }
+
+        # Пакетный движок считает товары одной версии тарифа за проход
+        by_tariff = {}
+        for position, data in found:
+            by_tariff.setdefault(data['tariff_version'], []).append((position, data))
+
+        for version, group in by_tariff.items():
+            try:
+                calculator = BatchCalculator.from_validated(
+                    [data for _, data in group], categories, tariff_registry.get(version)
+                )
+                results = self._calculate_group(calculator, group, selection)
+            except Exception as e:
+                for position, _ in group:
+                    lines[position] = {'index': position, 'error': f'Ошибка при расчете: {str(e)}'}
+                continue
+            # Ошибка вывода одного товара не затрагивает остальные товары группы
+            for row, (position, _) in enumerate(group):
+                try:
+                    output = self._serialize_row(results, row, selection)
+                except Exception as e:
+                    lines[position] = {'index': position, 'error': f'Ошибка при расчете: {str(e)}'}
+                else:
+                    lines[position] = {'index': position, **output}
+
+        return [lines[position] for position in range(offset, offset + len(chunk))]
+
+    @staticmethod
+    def _calculate_group(calculator, group, selection):
+        """
+        Пакетный расчет товаров одной версии тарифа
+        """
+        return calculator.calculate_all(selection['sections'])
+
+    @staticmethod
+    def _serialize_row(results, row, selection):
+        """
+        Результат товара с номером row в группе
+        """
+        return CalculationOutputSerializer(
+            {key: result.row(row) for key, result in results.items()},
+            fields=selection['output_fields']
+        ).data
+
+
+class CalculateInverseAPIView(APIView):
+    """
+    Обратные задачи юнит-экономики: максимальная себестоимость, прочие затраты
+    и доля рекламы для целевой маржи, количество продаж для цели по прибыли за месяц
+
+    Прибыль линейна по каждой из этих величин, поэтому ответ считается
+    по формулам OzonCalculator без перебора.
+    """
+
+    @extend_schema(
+        request=InverseInputSerializer,
+        responses={200: InverseOutputSerializer},
+        description='Предельные затраты для целевой маржи и продажи для цели по прибыли (FBO и FBS)'
+    )
+    def post(self, request):
+        input_serializer = InverseInputSerializer(data=request.data)
+
+        if not input_serializer.is_valid():
+            return Response(
+                {'errors': input_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = input_serializer.validated_data
+
+        try:
+            category = category_cache.get(data['category_id'])
+        except Category.DoesNotExist:
+            return Response(
+                {'error': f'Категория с ID {data["category_id"]} не найдена'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            calculator = OzonCalculator(
+                category=category,
+                price=data['price'],
+                weight=data['weight'],
+                volume=data['volume'],
+                tax_rate=data['tax_rate'],
+                buyout_rate=data['buyout_rate'],
+                delivery_time=data['delivery_time'],
+                ad_costs_rate=data['ad_costs_rate'],
+                cost_price=data['cost_price'],
+                other_costs=data['other_costs'],
+                monthly_sales=data['monthly_sales'],
+                tariff=tariff_registry.get(data['tariff_version']),
+            )
+            results = calculator.calculate_inverse(data['target_margin'], data.get('monthly_profit_goal'))
+        except Exception as e:
+            return Response(
+                {'error': f'Ошибка при расчете: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response(InverseOutputSerializer(dict(results, tariff_version=data['tariff_version'])).data)
+
+
+class CalculateInverseBatchAPIView(CalculateBatchAPIView):
+    """
+    Пакетные обратные задачи с потоковой выдачей результатов в NDJSON
+
+    Принимает JSON-массив или NDJSON-поток с теми же полями, что и
+    /api/calculate/inverse/; тысячи товаров считаются векторно пакетным движком.
+    """
+    input_serializer_class = InverseInputSerializer
+
+    @extend_schema(
+        request=InverseInputSerializer(many=True),
+        responses={200: OpenApiTypes.STR},
+        description='Пакетные обратные задачи; ответ - NDJSON, по строке на товар в порядке запроса'
+    )
+    def post(self, request):
+        return super().post(request)
+
+    @staticmethod
+    def _calculate_group(calculator, group, selection):
+        return calculator.calculate_inverse(
+            [data['target_margin'] for _, data in group],
+            [data.get('monthly_profit_goal') for _, data in group],
+        )
+
+    @staticmethod
+    def _serialize_row(results, row, selection):
+        return InverseOutputSerializer({key: rows[row] for key, rows in results.items()}).data
+
+
+class CalculatePackagingAPIView(APIView):
+    """
+    Сравнение вариантов упаковки: чистая прибыль товара для каждого набора габаритов
+
+    Варианты отличаются только объемом, поэтому общие для всех вариантов
+    величины (эквайринг, налог, реклама, комиссии) считаются один раз,
+    а для каждого варианта пересчитывается только логистика.
+    """
+
+    @extend_schema(
+        request=PackagingInputSerializer,
+        responses={200: PackagingOutputSerializer},
+        description='Варианты упаковки товара по убыванию чистой прибыли за штуку'
+    )
+    def post(self, request):
+        input_serializer = PackagingInputSerializer(data=request.data)
+
+        if not input_serializer.is_valid():
+            return Response(
+                {'errors': input_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = input_serializer.validated_data
+
+        try:
+            category = category_cache.get(data['category_id'])
+        except Category.DoesNotExist:
+            return Response(
+                {'error': f'Категория с ID {data["category_id"]} не найдена'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            calculator = OzonCalculator(
+                category=category,
+                price=data['price'],
+                weight=data['weight'],
+                volume=data['volume'],
+                tax_rate=data['tax_rate'],
+                buyout_rate=data['buyout_rate'],
+                delivery_time=data['delivery_time'],
+                ad_costs_rate=data['ad_costs_rate'],
+                cost_price=data['cost_price'],
+                other_costs=data['other_costs'],
+                monthly_sales=data['monthly_sales'],
+                tariff=tariff_registry.get(data['tariff_version']),
+            )
+            results = calculator.compare_packaging(data['packaging_variants'])
+        except Exception as e:
+            return Response(
+                {'error': f'Ошибка при расчете: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response(PackagingOutputSerializer(dict(results, tariff_version=data['tariff_version'])).data)
+
+
+class CalculateGridAPIView(APIView):
+    """
+    Сетка чувствительности чистой прибыли: цена × выкуп × время доставки
+
+    Значения сетки - вложенные списки [цена][выкуп][часы] в рублях и процентах.
+    Слагаемые прибыли считаются по своим осям один раз, поэтому сетка
+    в десятки тысяч ячеек считается за миллисекунды.
+    """
+
+    @extend_schema(
+        request=GridInputSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        description='Плотная сетка чистой прибыли за штуку по осям цены, выкупа и времени доставки'
+    )
+    def post(self, request):
+        input_serializer = GridInputSerializer(data=request.data)
+
+        if not input_serializer.is_valid():
+            return Response(
+                {'errors': input_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = input_serializer.validated_data
+
+        try:
+            category = category_cache.get(data['category_id'])
+        except Category.DoesNotExist:
+            return Response(
+                {'error': f'Категория с ID {data["category_id"]} не найдена'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            grid = SensitivityGrid(
+                volume=data['volume'],
+                tax_rate=data['tax_rate'],
+                ad_costs_rate=data['ad_costs_rate'],
+                cost_price=data['cost_price'],
+                other_costs=data['other_costs'],
+                prices=data['prices'],
+                buyout_rates=data['buyout_rates'],
+                delivery_hours=data['delivery_hours'],
+                tariff=tariff_registry.get(data['tariff_version']),
+            )
+            results = {
+                f'{scheme.lower()}_results': grid.calculate(category.bands(scheme), data['metrics'])
+                for scheme in data['schemes']
+            }
+        except Exception as e:
+            return Response(
+                {'error': f'Ошибка при расчете: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        # Копейки и сотые доли процента -> рубли и проценты
+        return Response({
+            'axes': {
+                'price': data['prices'],
+                'buyout_rate': data['buyout_rates'],
+                'delivery_time': data['delivery_hours'],
+            },
+            'shape': list(grid.shape),
+            **{
+                key: {name: (values / 100).tolist() for name, values in columns.items()}
+                for key, columns in results.items()
+            },
+        })
+
+
+class CalculateSweepAPIView(APIView):
+    """
+    Расчет товара по всем категориям справочника и схемам FBO/FBS за один запрос
+
+    Возвращает лучшие и худшие пары (категория, схема) по чистой прибыли за штуку
+    и, по запросу, прибыль по всем категориям колонками в порядке category_id.
+    """
+
+    @extend_schema(
+        request=SweepInputSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        description='Рейтинг категорий и схем по чистой прибыли для одного товара'
+    )
+    def post(self, request):
+        input_serializer = SweepInputSerializer(data=request.data)
+
+        if not input_serializer.is_valid():
+            return Response(
+                {'errors': input_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = input_serializer.validated_data
+
+        try:
+            sweep = CommissionSweep(
+                price=data['price'],
+                volume=data['volume'],
+                buyout_rate=data['buyout_rate'],
+                delivery_time=data['delivery_time'],
+                tax_rate=data['tax_rate'],
+                ad_costs_rate=data['ad_costs_rate'],
+                cost_price=data['cost_price'],
+                other_costs=data['other_costs'],
+                tariff=tariff_registry.get(data['tariff_version']),
+            )
+            table = category_cache.table()
+            summary = sweep_summary(sweep, table, data['schemes'], data['top_n'])
+        except Exception as e:
+            return Response(
+                {'error': f'Ошибка при расчете: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        response = {
+            'categories': summary['categories'],
+            'top': SweepEntrySerializer(summary['top'], many=True).data,
+            'bottom': SweepEntrySerializer(summary['bottom'], many=True).data,
+        }
+        if data['full_table']:
+            # Копейки и сотые доли процента -> рубли и проценты
+            response['table'] = {
+                'category_id': table.ids.tolist(),
+                **{
+                    scheme: {name: (values / 100).tolist() for name, values in columns.items()}
+                    for scheme, columns in summary['columns'].items()
+                },
+            }
+        return Response(response)
+
+
+class CalculateSimulationAPIView(APIView):
+    """
+    Моделирование риска методом Монте-Карло
+
+    Цена, себестоимость, выкуп, время доставки и доля рекламы разыгрываются по заданным
+    распределениям (по умолчанию 100 000 сценариев), прибыль по сценариям
+    считается пакетным движком. Ответ содержит seed - с ним расчет повторяется.
+    """
+
+    @extend_schema(
+        request=SimulationInputSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        description='Перцентили прибыли, вероятность убытка и ожидаемая прибыль за месяц'
+    )
+    def post(self, request):
+        input_serializer = SimulationInputSerializer(data=request.data)
+
+        if not input_serializer.is_valid():
+            return Response(
+                {'errors': input_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = input_serializer.validated_data
+
+        try:
+            category = category_cache.get(data['category_id'])
+        except Category.DoesNotExist:
+            return Response(
+                {'error': f'Категория с ID {data["category_id"]} не найдена'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            simulation = MonteCarloSimulation(
+                category,
+                product=data,
+                distributions=data['distributions'],
+                samples=data['samples'],
+                seed=data.get('seed'),
+                tariff=tariff_registry.get(data['tariff_version']),
+            )
+            results = {
+                f'{scheme.lower()}_results': SimulationResultSerializer(
+                    simulation.summarize(scheme, data['percentiles'])
+                ).data
+                for scheme in data['schemes']
+            }
+        except Exception as e:
+            return Response(
+                {'error': f'Ошибка при расчете: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response({
+            'samples': simulation.samples,
+            'seed': simulation.seed,
+            'tariff_version': data['tariff_version'],
+            **results,
+        })
+
+
+def _get_portfolio(portfolio_id):
+    try:
+        return Portfolio.objects.get(pk=portfolio_id)
+    except Portfolio.DoesNotExist:
+        return None
+
+
+def _portfolio_not_found(portfolio_id):
+    return Response(
+        {'error': f'Портфель с ID {portfolio_id} не найден'},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
+def _save_portfolio_items(portfolio, payloads):
+    """
+    Проверка ввода товаров и сохранение в портфель; все товары сохраняются
+    или (при любой ошибке ввода) ни один
+    """
+    input_serializer = PortfolioItemInputSerializer(data=payloads, many=True)
+    if not input_serializer.is_valid():
+        errors = [
+            {'index': index, 'errors': item_errors}
+            for index, item_errors in enumerate(input_serializer.errors) if item_errors
+        ]
+        return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    items = input_serializer.validated_data
+    categories = load_categories(item['category_id'] for item in items)
+    missing = sorted({item['category_id'] for item in items} - set(categories))
+    if missing:
+        return Response(
+            {'error': f'Категории не найдены: {", ".join(map(str, missing))}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        counts = save_items(portfolio, items, categories)
+    except Exception as e:
+        return Response(
+            {'error': f'Ошибка при расчете: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    return Response({**counts, 'portfolio': portfolio_summary(portfolio, ())})
+
+
+class PortfolioListAPIView(APIView):
+    """
+    Портфели товаров: список и создание
+    """
+
+    @extend_schema(responses={200: PortfolioSerializer(many=True)}, description='Список портфелей')
+    def get(self, request):
+        return Response(PortfolioSerializer(Portfolio.objects.all(), many=True).data)
+
+    @extend_schema(
+        request=PortfolioSerializer,
+        responses={201: PortfolioSerializer},
+        description='Создание пустого портфеля'
+    )
+    def post(self, request):
+        serializer = PortfolioSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class PortfolioDetailAPIView(APIView):
+    """
+    Итоги портфеля: прибыль за месяц и за год по группе категорий, схеме
+    и диапазону маржи и суммы по схемам
+
+    Итоги обновляются при каждом изменении товаров, поэтому чтение
+    не пересчитывает товары и не зависит от их числа.
+    """
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='group_by',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Измерения строк итогов через запятую: category_group, scheme, margin_bucket '
+                            '(по умолчанию - все три)'
+            ),
+        ],
+        responses={200: PortfolioSummarySerializer},
+        description='Итоги портфеля'
+    )
+    def get(self, request, portfolio_id):
+        query_serializer = PortfolioSummaryQuerySerializer(data=request.query_params)
+        if not query_serializer.is_valid():
+            return Response({'errors': query_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        portfolio = _get_portfolio(portfolio_id)
+        if portfolio is None:
+            return _portfolio_not_found(portfolio_id)
+        group_by = query_serializer.validated_data.get('group_by', AGGREGATE_DIMENSIONS)
+        return Response(portfolio_summary(portfolio, group_by))
+
+    @extend_schema(responses={204: None}, description='Удаление портфеля вместе с товарами')
+    def delete(self, request, portfolio_id):
+        portfolio = _get_portfolio(portfolio_id)
+        if portfolio is None:
+            return _portfolio_not_found(portfolio_id)
+        portfolio.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class PortfolioItemsAPIView(APIView):
+    """
+    Добавление, изменение и удаление товаров портфеля списком
+
+    Товар определяется артикулом (sku): существующий товар заменяется.
+    Итоги портфеля обновляются на разницу вклада измененных товаров.
+    """
+
+    @extend_schema(
+        request=PortfolioItemInputSerializer(many=True),
+        responses={200: OpenApiTypes.OBJECT},
+        description='Добавление или изменение товаров портфеля; ответ - счетчики и итоги портфеля'
+    )
+    def post(self, request, portfolio_id):
+        portfolio = _get_portfolio(portfolio_id)
+        if portfolio is None:
+            return _portfolio_not_found(portfolio_id)
+        if not isinstance(request.data, list):
+            return Response(
+                {'error': 'Ожидается JSON-массив товаров'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return _save_portfolio_items(portfolio, request.data)
+
+    @extend_schema(
+        request=PortfolioItemsDeleteSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        operation_id='portfolios_items_bulk_destroy',
+        description='Удаление товаров портфеля по артикулам'
+    )
+    def delete(self, request, portfolio_id):
+        portfolio = _get_portfolio(portfolio_id)
+        if portfolio is None:
+            return _portfolio_not_found(portfolio_id)
+        input_serializer = PortfolioItemsDeleteSerializer(data=request.data)
+        if not input_serializer.is_valid():
+            return Response({'errors': input_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        deleted = delete_items(portfolio, input_serializer.validated_data['skus'])
+        return Response({'deleted': deleted, 'portfolio': portfolio_summary(portfolio, ())})
+
+
+class PortfolioItemAPIView(APIView):
+    """
+    Один товар портфеля по артикулу: просмотр, добавление или изменение, удаление
+    """
+
+    @extend_schema(responses={200: PortfolioItemSerializer}, description='Товар портфеля и его прибыль')
+    def get(self, request, portfolio_id, sku):
+        try:
+            item = PortfolioItem.objects.get(portfolio_id=portfolio_id, sku=sku)
+        except PortfolioItem.DoesNotExist:
+            return Response(
+                {'error': f'Товар {sku} в портфеле {portfolio_id} не найден'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(PortfolioItemSerializer(item).data)
+
+    @extend_schema(
+        request=CalculationInputSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        description='Добавление или изменение товара; итоги обновляются на разницу его вклада'
+    )
+    def put(self, request, portfolio_id, sku):
+        portfolio = _get_portfolio(portfolio_id)
+        if portfolio is None:
+            return _portfolio_not_found(portfolio_id)
+        return _save_portfolio_items(portfolio, [dict(request.data, sku=sku)])
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT}, description='Удаление товара из портфеля')
+    def delete(self, request, portfolio_id, sku):
+        portfolio = _get_portfolio(portfolio_id)
+        if portfolio is None:
+            return _portfolio_not_found(portfolio_id)
+        if not delete_items(portfolio, [sku]):
+            return Response(
+                {'error': f'Товар {sku} в портфеле {portfolio_id} не найден'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({'deleted': 1, 'portfolio': portfolio_summary(portfolio, ())})
+
+
+class CalculatorTariffsAPIView(APIView):
+    """
+    Версии тарифов Ozon из реестра тарифов
+    """
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description='Версии тарифов с датами вступления в силу и действующая на сегодня версия'
+    )
+    def get(self, request):
+        return Response({
+            'current': tariff_registry.get().version,
+            'versions': [
+                {
+                    'version': tariff.version,
+                    'effective_from': tariff.effective_from,
+                    'fingerprint': tariff.fingerprint,
+                    'acquiring_rate': str(tariff.acquiring_rate),
+                    'price_threshold': str(tariff.price_threshold),
+                }
+                for tariff in tariff_registry.versions()
+            ],
+        })
+
+
+class CalculatorMetricsAPIView(APIView):
+    """
+    Счетчики внутренних кэшей расчета в текущем процессе
+    """
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description='Счетчики попаданий и промахов кэшей расчета (для процесса, обслужившего запрос)'
+    )
+    def get(self, request):
+        return Response({
+            'category_cache': category_cache.stats(),
+            'result_cache': result_cache.stats(),
+            'category_search': search_cache.stats(),
+            'category_suggest': suggest_index.stats(),
+            'category_snapshot': snapshot_cache.stats(),
+            'float_engine': dict(float_engine_stats.stats(), enabled=settings.CALCULATOR_ENGINE == 'float'),
+        })
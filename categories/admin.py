@@ -1,24 +1,109 @@
+from bisect import bisect_left
+from decimal import Decimal, InvalidOperation
+
+from django import forms
 from django.contrib import admin
 from .models import Category
+from .search import search_categories
+
+
+# Цена, для которой указаны fbo_commission и fbs_commission: 300-500₽ для FBO, свыше 300₽ для FBS
+COMMISSION_REFERENCE_PRICE = Decimal('400')
+
+COMMISSION_FIELDS = {'FBO': 'fbo_commission', 'FBS': 'fbs_commission'}
+
+
+def reference_band(bands: dict) -> int:
+    """
+    Номер диапазона, ставка которого хранится в fbo_commission/fbs_commission
+    """
+    return bisect_left([Decimal(edge) for edge in bands['edges']], COMMISSION_REFERENCE_PRICE)
+
+
+class CategoryAdminForm(forms.ModelForm):
+    """
+    Форма категории: одна комиссия схемы и ее ценовые диапазоны согласованы
+
+    Если у схемы есть диапазоны, расчет берет ставку из них. Поэтому измененная
+    комиссия FBO/FBS записывается в диапазон 300-500₽, а измененные диапазоны
+    обновляют комиссию схемы.
+    """
+
+    class Meta:
+        model = Category
+        fields = '__all__'
+
+    def clean_commission_bands(self):
+        bands = self.cleaned_data.get('commission_bands') or {}
+        if not isinstance(bands, dict) or set(bands) - set(COMMISSION_FIELDS):
+            raise forms.ValidationError('Ожидается объект с ключами FBO и/или FBS')
+        for scheme, data in bands.items():
+            try:
+                edges = [Decimal(edge) for edge in data['edges']]
+                rates = [Decimal(rate) for rate in data['rates']]
+            except (KeyError, TypeError, InvalidOperation):
+                raise forms.ValidationError(f'{scheme}: нужны списки edges и rates с числами')
+            if len(rates) != len(edges) + 1:
+                raise forms.ValidationError(f'{scheme}: ставок должно быть на одну больше, чем границ')
+            if any(left >= right for left, right in zip(edges, edges[1:])):
+                raise forms.ValidationError(f'{scheme}: границы edges должны возрастать')
+            if any(rate < 0 or rate > 100 for rate in rates):
+                raise forms.ValidationError(f'{scheme}: ставки должны быть от 0 до 100')
+        return bands
+
+    def clean(self):
+        cleaned_data = super().clean()
+        bands = cleaned_data.get('commission_bands')
+        if bands is None:
+            return cleaned_data
+        bands = {scheme: {'edges': list(data['edges']), 'rates': list(data['rates'])}
+                 for scheme, data in bands.items()}
+        for scheme, field in COMMISSION_FIELDS.items():
+            commission = cleaned_data.get(field)
+            if scheme not in bands or commission is None:
+                continue
+            rates = bands[scheme]['rates']
+            band = reference_band(bands[scheme])
+            if Decimal(rates[band]) == commission:
+                continue
+            if field in self.changed_data and 'commission_bands' not in self.changed_data:
+                rates[band] = str(commission.quantize(Decimal('0.01')))
+            elif 'commission_bands' in self.changed_data and field not in self.changed_data:
+                cleaned_data[field] = Decimal(rates[band])
+            else:
+                self.add_error(field, f'Не совпадает со ставкой {scheme} для цены 300-500₽ в диапазонах: {rates[band]}')
+        cleaned_data['commission_bands'] = bands
+        return cleaned_data
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
+    form = CategoryAdminForm
     list_display = ['name', 'fbo_commission', 'fbs_commission', 'created_at', 'updated_at']
     search_fields = ['name']
     list_filter = ['created_at', 'updated_at']
     ordering = ['name']
     readonly_fields = ['created_at', 'updated_at']
-    
+
     fieldsets = (
         ('Основная информация', {
             'fields': ('name',)
         }),
         ('Комиссии', {
-            'fields': ('fbo_commission', 'fbs_commission')
+            'fields': ('fbo_commission', 'fbs_commission', 'commission_bands'),
+            'description': 'Если у схемы заданы ценовые диапазоны, расчет берет ставку из них; '
+                           'комиссия FBO/FBS - ставка диапазона 300-500₽ и меняется вместе с ним'
         }),
         ('Метаданные', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Поиск по нормализованному ключу, как в API (регистр и ё не важны)
+        """
+        if not search_term:
+            return queryset, False
+        return search_categories(queryset, search_term), False
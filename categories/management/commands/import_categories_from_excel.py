@@ -14,6 +14,7 @@ Management команда для импорта категорий из Excel ф
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from categories.models import Category
+from categories.versioning import bump_category_version
 import openpyxl
 import os
 from decimal import Decimal, InvalidOperation
@@ -193,6 +194,9 @@ class Command(BaseCommand):
                     error_count += 1
                     continue
 
+        # Новая версия справочника сбрасывает кэши комиссий во всех процессах
+        bump_category_version()
+
         # Итоговая статистика
         self.stdout.write('\n' + '=' * 60)
         self.stdout.write(self.style.SUCCESS('Импорт завершен!'))
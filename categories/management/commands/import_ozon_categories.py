@@ -9,16 +9,58 @@ Management команда для импорта категорий из офиц
     - Колонка B (2): Тип товара (name)
     - Колонка E (5): FBO комиссия (свыше 300 до 500 руб)
     - Колонка K (11): FBS комиссия (свыше 300 руб)
+
+Кроме того, сохраняются все ценовые диапазоны комиссий (commission_bands):
+    - Колонки C-G (3-7): FBO до 100, 100-300, 300-500, 500-1500, свыше 1500 руб
+    - Колонки I-K (9-11): FBS до 100, 100-300, свыше 300 руб
+Соседние диапазоны с одинаковой ставкой объединяются. Колонки E и K остаются
+комиссиями категории по умолчанию (fbo_commission, fbs_commission).
 """
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from categories.models import Category
+from categories.versioning import bump_category_version
 import openpyxl
 import os
 from decimal import Decimal, InvalidOperation
 
 
+# Ценовые диапазоны комиссий: (индекс колонки, верхняя граница диапазона в рублях)
+FBO_BAND_COLUMNS = ((2, 100), (3, 300), (4, 500), (5, 1500), (6, None))
+FBS_BAND_COLUMNS = ((8, 100), (9, 300), (10, None))
+
+
+def parse_commission_bands(row, columns):
+    """
+    Диапазоны комиссии схемы {"edges": [...], "rates": [...]} из ячеек строки
+    (доли -> проценты); None, если хотя бы одна ставка не заполнена или некорректна
+    """
+    edges, rates = [], []
+    for index, upper in columns:
+        cell = row[index].value if len(row) > index else None
+        if isinstance(cell, (int, float)):
+            rate = Decimal(str(cell)) * 100
+        elif cell:
+            try:
+                rate = Decimal(str(cell).replace(',', '.')) * 100
+            except InvalidOperation:
+                return None
+        else:
+            return None
+        rate = rate.quantize(Decimal('0.01'))
+        if rate < 0 or rate > 100:
+            return None
+        if rates and rates[-1] == rate:
+            # Та же ставка, что и в предыдущем диапазоне - расширяем его
+            edges.pop()
+        else:
+            rates.append(rate)
+        if upper is not None:
+            edges.append(Decimal(upper))
+    return {'edges': [str(edge) for edge in edges], 'rates': [str(rate) for rate in rates]}
+
+
 class Command(BaseCommand):
     help = 'Импортирует категории товаров из официальной таблицы Ozon'
 
@@ -181,6 +223,13 @@ class Command(BaseCommand):
                     error_count += 1
                     continue
 
+                # Ценовые диапазоны комиссий (схема без полного набора ставок - одна ставка)
+                commission_bands = {}
+                for scheme, columns in (('FBO', FBO_BAND_COLUMNS), ('FBS', FBS_BAND_COLUMNS)):
+                    bands = parse_commission_bands(row, columns)
+                    if bands is not None:
+                        commission_bands[scheme] = bands
+
                 # Создание или обновление категории
                 try:
                     category, created = Category.objects.update_or_create(
@@ -189,6 +238,7 @@ class Command(BaseCommand):
                             'category_group': category_group,
                             'fbo_commission': fbo_commission,
                             'fbs_commission': fbs_commission,
+                            'commission_bands': commission_bands,
                         }
                     )
 
@@ -212,6 +262,9 @@ class Command(BaseCommand):
                     error_count += 1
                     continue
 
+        # Новая версия справочника сбрасывает кэши комиссий во всех процессах
+        bump_category_version()
+
         # Итоговая статистика
         self.stdout.write('\n' + '=' * 60)
         self.stdout.write(self.style.SUCCESS('Импорт завершен!'))
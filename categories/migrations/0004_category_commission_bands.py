@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_alter_category_name_alter_category_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='commission_bands',
+            field=models.JSONField(blank=True, default=dict, help_text='{"FBO": {"edges": ["100", "300"], "rates": ["14.00", "20.00", "41.00"]}, "FBS": {...}}: ставка rates[i] действует для цены до edges[i] включительно; для схемы без диапазонов используется одна комиссия', verbose_name='Комиссии по ценовым диапазонам'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:27
+
+import categories.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FTS_TABLE = 'categories_category_fts'
+
+SQLITE_CREATE = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, category_group,
+        content='categories_category', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, category_group)
+        VALUES (new.id, new.name, new.category_group);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category_group)
+        VALUES ('delete', old.id, old.name, old.category_group);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name, category_group ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category_group)
+        VALUES ('delete', old.id, old.name, old.category_group);
+        INSERT INTO {FTS_TABLE}(rowid, name, category_group)
+        VALUES (new.id, new.name, new.category_group);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    # Ранжирование bm25: совпадение в названии весит в 10 раз больше, чем в группе
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRESQL_CREATE = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX IF NOT EXISTS categories_category_search_trgm ON categories_category "
+    "USING gin ((lower(name) || ' ' || lower(coalesce(category_group, ''))) gin_trgm_ops)",
+]
+
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS categories_category_search_trgm',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+create_search_index = _run({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE})
+drop_search_index = _run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0004_category_commission_bands'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySearchEntry',
+            fields=[
+                ('category', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='categories.category')),
+                ('name', models.TextField()),
+                ('category_group', models.TextField(null=True)),
+                ('document', categories.models.FullTextDocumentField(db_column='categories_category_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'categories_category_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
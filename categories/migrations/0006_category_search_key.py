@@ -0,0 +1,103 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:37
+
+import categories.models
+from django.db import migrations
+
+from categories.normalization import category_search_key
+from categories.search import create_search_index, drop_search_index
+
+
+FTS_TABLE = 'categories_category_fts'
+
+SQLITE_DROP_RAW_INDEX = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+# Индекс 0005 по исходным полям (для отката)
+SQLITE_CREATE_RAW_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, category_group,
+        content='categories_category', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, category_group)
+        VALUES (new.id, new.name, new.category_group);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category_group)
+        VALUES ('delete', old.id, old.name, old.category_group);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name, category_group ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category_group)
+        VALUES ('delete', old.id, old.name, old.category_group);
+        INSERT INTO {FTS_TABLE}(rowid, name, category_group)
+        VALUES (new.id, new.name, new.category_group);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+POSTGRESQL_DROP_RAW_INDEX = [
+    'DROP INDEX IF EXISTS categories_category_search_trgm',
+]
+
+POSTGRESQL_CREATE_RAW_INDEX = [
+    "CREATE INDEX IF NOT EXISTS categories_category_search_trgm ON categories_category "
+    "USING gin ((lower(name) || ' ' || lower(coalesce(category_group, ''))) gin_trgm_ops)",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+def fill_search_keys(apps, schema_editor):
+    Category = apps.get_model('categories', 'Category')
+    categories = list(Category.objects.only('id', 'name', 'category_group'))
+    for category in categories:
+        category.search_key = category_search_key(category.name, category.category_group)
+    Category.objects.bulk_update(categories, ['search_key'], batch_size=1000)
+
+
+def create_key_index(apps, schema_editor):
+    create_search_index(schema_editor)
+
+
+def drop_key_index(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0005_category_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_DROP_RAW_INDEX, 'postgresql': POSTGRESQL_DROP_RAW_INDEX}),
+            _run({'sqlite': SQLITE_CREATE_RAW_INDEX, 'postgresql': POSTGRESQL_CREATE_RAW_INDEX}),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='search_key',
+            field=categories.models.SearchKeyField(db_index=True, default='', editable=False, help_text='Нормализованные тип товара и категория через табуляцию (NFC, casefold, ё -> е, без пунктуации); обновляется при сохранении', verbose_name='Поисковый ключ'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_key_index, drop_key_index),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:30
+
+from django.db import migrations
+
+from categories.search import create_search_index, drop_search_index
+
+
+FTS_TABLE = 'categories_category_fts'
+
+NAME_KEY = "substr({row}.search_key, 1, instr({row}.search_key, char(9)) - 1)"
+GROUP_KEY = "substr({row}.search_key, instr({row}.search_key, char(9)) + 1)"
+
+
+def _key_values(row):
+    return f"{row}.id, {NAME_KEY.format(row=row)}, {GROUP_KEY.format(row=row)}"
+
+
+# Индекс 0006 по началам слов (для отката)
+SQLITE_CREATE_PREFIX_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, category_group, content='',
+        tokenize='unicode61 remove_diacritics 0', prefix='1 2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, category_group) VALUES ({_key_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category_group) VALUES ('delete', {_key_values('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_key ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category_group) VALUES ('delete', {_key_values('old')});
+        INSERT INTO {FTS_TABLE}(rowid, name, category_group) VALUES ({_key_values('new')});
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, name, category_group)
+    SELECT {_key_values('categories_category')} FROM categories_category
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+
+def rebuild_search_index(apps, schema_editor):
+    drop_search_index(schema_editor)
+    create_search_index(schema_editor)
+
+
+def restore_prefix_index(apps, schema_editor):
+    drop_search_index(schema_editor)
+    if schema_editor.connection.vendor != 'sqlite':
+        create_search_index(schema_editor)
+        return
+    for statement in SQLITE_CREATE_PREFIX_INDEX:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0007_category_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, restore_prefix_index),
+    ]
@@ -1,5 +1,24 @@
 from django.db import models
 
+from .normalization import category_search_key
+
+
+class SearchKeyField(models.TextField):
+    """
+    Поисковый ключ категории; вычисляется из типа товара и группы при каждом
+    сохранении, в том числе в update_or_create и bulk_create
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        value = category_search_key(model_instance.name, model_instance.category_group)
+        setattr(model_instance, self.attname, value)
+        return value
+
 
 class Category(models.Model):
     """
@@ -31,6 +50,20 @@ class Category(models.Model):
         verbose_name='Комиссия FBS (%)',
         help_text='Комиссия для схемы работы FBS (Fulfillment by Seller) в процентах'
     )
+    commission_bands = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Комиссии по ценовым диапазонам',
+        help_text='{"FBO": {"edges": ["100", "300"], "rates": ["14.00", "20.00", "41.00"]}, "FBS": {...}}: '
+                  'ставка rates[i] действует для цены до edges[i] включительно; '
+                  'для схемы без диапазонов используется одна комиссия'
+    )
+    search_key = SearchKeyField(
+        db_index=True,
+        verbose_name='Поисковый ключ',
+        help_text='Нормализованные тип товара и категория через табуляцию '
+                  '(NFC, casefold, ё -> е, без пунктуации); обновляется при сохранении'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата создания'
@@ -48,9 +81,107 @@ class Category(models.Model):
         indexes = [
             models.Index(fields=['name']),
             models.Index(fields=['category_group']),
+            # Курсорная пагинация по (name, id) и (updated_at, id)
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['updated_at', 'id']),
         ]
 
+    # Поля, от которых зависит расчет товаров этой категории
+    PRICING_FIELDS = ('fbo_commission', 'fbs_commission', 'commission_bands', 'category_group')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения полей расчета из БД - для проверки, изменились ли они при сохранении
+        instance._pricing_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.PRICING_FIELDS
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        deferred = self.get_deferred_fields()
+        self._pricing_values = {
+            **getattr(self, '_pricing_values', {}),
+            **{name: getattr(self, name) for name in self.PRICING_FIELDS
+               if name not in deferred and (fields is None or name in fields)},
+        }
+
+    def pricing_changed(self) -> bool:
+        """
+        Отличаются ли поля расчета от загруженных из БД (для объекта не из БД - да)
+        """
+        loaded = getattr(self, '_pricing_values', None)
+        if loaded is None:
+            return True
+        for name in self.PRICING_FIELDS:
+            if name not in loaded:
+                return True
+            field = self._meta.get_field(name)
+            if field.to_python(getattr(self, name)) != loaded[name]:
+                return True
+        return False
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'name', 'category_group'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_key'}
+        super().save(*args, **kwargs)
+        # Сохраненные значения становятся исходными для следующего сохранения
+        saved = self.PRICING_FIELDS if update_fields is None else set(self.PRICING_FIELDS) & set(update_fields)
+        self._pricing_values = {
+            **getattr(self, '_pricing_values', {}),
+            **{name: self._meta.get_field(name).to_python(getattr(self, name)) for name in saved},
+        }
+
     def __str__(self):
         if self.category_group:
             return f"{self.name} ({self.category_group}) - FBO: {self.fbo_commission}%, FBS: {self.fbs_commission}%"
         return f"{self.name} (FBO: {self.fbo_commission}%, FBS: {self.fbs_commission}%)"
+
+
+class FullTextMatch(models.Lookup):
+    """
+    Условие полнотекстового поиска FTS5: <таблица> MATCH <запрос>
+    """
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class FullTextDocumentField(models.TextField):
+    """
+    Скрытый столбец виртуальной таблицы FTS5 с именем самой таблицы
+    """
+
+
+FullTextDocumentField.register_lookup(FullTextMatch)
+
+
+class CategorySearchEntry(models.Model):
+    """
+    Строка поискового индекса категорий (виртуальная таблица FTS5 в SQLite)
+
+    Индексируются части Category.search_key (нормализованные тип товара и
+    группа). Таблица создается миграцией и синхронизируется с Category
+    триггерами базы, поэтому модель не управляется Django и используется
+    только в запросах.
+    """
+    category = models.OneToOneField(
+        Category,
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='search_entry',
+    )
+    name = models.TextField()
+    category_group = models.TextField(null=True)
+    document = FullTextDocumentField(db_column='categories_category_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'categories_category_fts'
@@ -0,0 +1,43 @@
+"""
+Нормализация текста для поиска категорий.
+
+Один и тот же ключ строится для названий категорий (поле Category.search_key)
+и для поисковых запросов: NFC, casefold, ё -> е, вся пунктуация и пробелы между
+словами заменяются одним пробелом. Поэтому "Ёлка" и "елка", "3D-очки" и
+"3d очки" дают одинаковые слова.
+"""
+
+import re
+import unicodedata
+from typing import Optional
+
+
+# Разделитель частей ключа категории: нормализованный тип товара и группа
+KEY_SEPARATOR = '\t'
+
+# Слова: буквы и цифры (подчеркивание - спецсимвол LIKE)
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def normalize_words(text: Optional[str]) -> list:
+    """
+    Слова текста после нормализации
+    """
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFC', text).casefold().replace('ё', 'е')
+    return WORD_RE.findall(folded)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Нормализованный текст: слова через один пробел
+    """
+    return ' '.join(normalize_words(text))
+
+
+def category_search_key(name: Optional[str], category_group: Optional[str]) -> str:
+    """
+    Поисковый ключ категории: нормализованный тип товара, табуляция, нормализованная группа
+    """
+    return normalize_text(name) + KEY_SEPARATOR + normalize_text(category_group)
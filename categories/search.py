@@ -0,0 +1,287 @@
+"""
+Поиск категорий по типу товара (name) и категории (category_group).
+
+Запрос и категории нормализуются одинаково (categories.normalization: NFC,
+casefold, ё -> е, без пунктуации), поиск идет по сохраненному ключу
+Category.search_key. Категория подходит, если каждое слово запроса -
+подстрока нормализованного типа товара или группы (как прежний icontains;
+«чки» находит «3D-очки»), одинаково во всех СУБД. Результаты упорядочены
+по релевантности, затем по названию.
+
+- SQLite: виртуальная таблица FTS5 categories_category_fts с токенизатором
+  trigram без собственного содержимого (частей search_key), синхронизируется
+  триггерами; ранжирование bm25 с весом названия 10 и группы 1
+  (CategorySearchEntry). Слова короче трех букв триграммный индекс не ищет -
+  они проверяются LIKE по search_key.
+  Пересоздание таблицы categories_category миграцией удаляет триггеры,
+  поэтому после migrate индекс проверяется и при необходимости строится
+  заново (ensure_search_index).
+- PostgreSQL: расширение pg_trgm и GIN-индекс по search_key;
+  ранжирование word_similarity.
+- Прочие СУБД: LIKE по search_key для каждого слова без индекса.
+
+Короткий запрос (одна-две буквы) затрагивает тысячи строк,
+поэтому порядок ID найденных категорий кэшируется в памяти процесса (LRU,
+CATEGORY_SEARCH_CACHE_SIZE запросов) до смены версии справочника; страница
+результатов - один запрос по первичному ключу.
+"""
+
+from collections import OrderedDict
+from collections.abc import Sequence
+from threading import Lock
+from typing import Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import FloatField, IntegerField, QuerySet
+from django.db.models.expressions import RawSQL
+
+from .models import Category
+from .normalization import normalize_words
+from .versioning import get_category_version
+
+
+FTS_TABLE = 'categories_category_fts'
+TRIGGERS = (f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au')
+
+# Триграммный индекс находит подстроки не короче трех символов
+MIN_INDEXED_WORD = 3
+
+# Части поискового ключа: до табуляции - тип товара, после - группа
+NAME_KEY = "substr({row}.search_key, 1, instr({row}.search_key, char(9)) - 1)"
+GROUP_KEY = "substr({row}.search_key, instr({row}.search_key, char(9)) + 1)"
+
+
+def _key_values(row: str) -> str:
+    return f"{row}.id, {NAME_KEY.format(row=row)}, {GROUP_KEY.format(row=row)}"
+
+
+SQLITE_CREATE = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, category_group, content='', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, category_group) VALUES ({_key_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category_group) VALUES ('delete', {_key_values('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_key ON categories_category BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category_group) VALUES ('delete', {_key_values('old')});
+        INSERT INTO {FTS_TABLE}(rowid, name, category_group) VALUES ({_key_values('new')});
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, name, category_group)
+    SELECT {_key_values('categories_category')} FROM categories_category
+    """,
+    # Совпадение в типе товара весит в 10 раз больше, чем в группе
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+SQLITE_DROP = [f'DROP TRIGGER IF EXISTS {trigger}' for trigger in TRIGGERS] + [
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRESQL_CREATE = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS categories_category_search_key_trgm ON categories_category '
+    'USING gin (search_key gin_trgm_ops)',
+]
+
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS categories_category_search_key_trgm',
+]
+
+
+def create_search_index(schema_editor):
+    """
+    Создает поисковый индекс по search_key для СУБД schema_editor
+    """
+    statements = {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE}
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(schema_editor):
+    """
+    Удаляет поисковый индекс по search_key
+    """
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def ensure_search_index(using: str = 'default') -> bool:
+    """
+    Строит индекс FTS5 заново, если таблицы или триггеров нет (SQLite удаляет
+    триггеры вместе с таблицей при ее пересоздании миграцией). True, если индекс перестроен.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        tables = db.introspection.table_names(cursor)
+        if Category._meta.db_table not in tables:
+            return False
+        columns = {column.name for column in db.introspection.get_table_description(cursor, Category._meta.db_table)}
+        if 'search_key' not in columns:
+            return False
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)", TRIGGERS
+        )
+        if FTS_TABLE in tables and cursor.fetchone()[0] == len(TRIGGERS):
+            return False
+    with db.schema_editor() as schema_editor:
+        drop_search_index(schema_editor)
+        create_search_index(schema_editor)
+    return True
+
+
+def search_words(query: str) -> list:
+    """
+    Нормализованные слова поискового запроса
+    """
+    return normalize_words(query)
+
+
+def fts_query(words: list) -> str:
+    """
+    Запрос FTS5 к триграммному индексу: все слова как подстроки ("3d" "очк")
+    """
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search_categories(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Категории queryset, подходящие под запрос, по убыванию релевантности
+    """
+    words = search_words(query)
+    if not words:
+        return queryset.none()
+
+    if connection.vendor == 'sqlite':
+        indexed = [word for word in words if len(word) >= MIN_INDEXED_WORD]
+        for word in words:
+            if len(word) < MIN_INDEXED_WORD:
+                queryset = queryset.filter(search_key__contains=word)
+        if indexed:
+            return (queryset
+                    .filter(search_entry__document__match=fts_query(indexed))
+                    .order_by('search_entry__rank', 'name'))
+        # Без индекса: сначала категории, у которых первое слово есть в типе товара
+        return (queryset
+                .annotate(search_rank=RawSQL(f'instr({NAME_KEY.format(row=Category._meta.db_table)}, %s) = 0',
+                                             [words[0]], output_field=IntegerField()))
+                .order_by('search_rank', 'name'))
+
+    for word in words:
+        queryset = queryset.filter(search_key__contains=word)
+    if connection.vendor == 'postgresql':
+        return (queryset
+                .annotate(search_rank=RawSQL('word_similarity(%s, search_key)',
+                                             [' '.join(words)], output_field=FloatField()))
+                .order_by('-search_rank', 'name'))
+    return queryset.order_by('name')
+
+
+class RankedCategories(Sequence):
+    """
+    Найденные категории в порядке релевантности для пагинатора:
+    длина без запроса к БД, срез - один запрос по первичному ключу
+    """
+
+    def __init__(self, ids: np.ndarray):
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            ids = self.ids[index].tolist()
+            found = Category.objects.in_bulk(ids)
+            return [found[category_id] for category_id in ids if category_id in found]
+        return Category.objects.get(pk=int(self.ids[index]))
+
+
+class CategorySearchCache:
+    """
+    LRU-кэш ранжированных ID результатов поиска с инвалидацией по версии справочника
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: 'OrderedDict[Tuple[str, ...], np.ndarray]' = OrderedDict()
+        self._lock = Lock()
+
+    def search(self, query: str) -> RankedCategories:
+        """
+        Категории, подходящие под запрос, по убыванию релевантности
+        """
+        key = tuple(search_words(query))
+        with self._lock:
+            self._check_version()
+            ids = self._entries.get(key)
+            if ids is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return RankedCategories(ids)
+            self.misses += 1
+            version = self.version
+
+        ids = np.fromiter(
+            search_categories(Category.objects.all(), query).values_list('id', flat=True),
+            dtype=np.int64,
+        )
+        with self._lock:
+            # Не кладем в кэш результат, прочитанный до смены версии
+            if self.version == version:
+                self._entries[key] = ids
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return RankedCategories(ids)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Счетчики кэша для эндпоинта метрик
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'invalidations': self.invalidations,
+            }
+
+    def _check_version(self):
+        version = get_category_version()
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+
+search_cache = CategorySearchCache(settings.CATEGORY_SEARCH_CACHE_SIZE)
@@ -8,11 +8,71 @@ class CategorySerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Category
-        fields = ['id', 'name', 'category_group', 'fbo_commission', 'fbs_commission']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'category_group', 'fbo_commission', 'fbs_commission', 'commission_bands']
+        read_only_fields = ['id', 'commission_bands']
 
 
+class CategorySuggestQuerySerializer(serializers.Serializer):
+    """
+    Параметры подсказок категорий при вводе
+    """
+    MAX_LIMIT = 50
+
+    q = serializers.CharField(
+        allow_blank=True,
+        trim_whitespace=False,
+        help_text='Вводимый текст: каждое слово - начало слова типа товара или категории'
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_LIMIT,
+        default=10,
+        help_text='Число подсказок'
+    )
+
 
+class CategorySuggestionSerializer(serializers.Serializer):
+    """
+    Подсказка категории (для схемы API)
+    """
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    category_group = serializers.CharField(allow_null=True)
+    fbo_commission = serializers.DecimalField(max_digits=5, decimal_places=2)
+    fbs_commission = serializers.DecimalField(max_digits=5, decimal_places=2)
+    match = serializers.ChoiceField(
+        choices=['name', 'category_group'],
+        help_text='Где найдено совпадение: в типе товара или только в категории'
+    )
 
 
+class CategorySuggestionsSerializer(serializers.Serializer):
+    """
+    Ответ подсказок категорий (для схемы API)
+    """
+    results = CategorySuggestionSerializer(many=True)
 
+
+class CategorySnapshotColumnsSerializer(serializers.Serializer):
+    """
+    Колонки снимка справочника (для схемы API)
+    """
+    id = serializers.ListField(child=serializers.IntegerField())
+    name = serializers.ListField(child=serializers.CharField())
+    category_group = serializers.ListField(
+        child=serializers.IntegerField(allow_null=True),
+        help_text='Номер группы в groups или null'
+    )
+    fbo_commission = serializers.ListField(child=serializers.DecimalField(max_digits=5, decimal_places=2))
+    fbs_commission = serializers.ListField(child=serializers.DecimalField(max_digits=5, decimal_places=2))
+
+
+class CategorySnapshotSerializer(serializers.Serializer):
+    """
+    Снимок всего справочника категорий в колонках (для схемы API)
+    """
+    version = serializers.IntegerField(help_text='Версия справочника категорий')
+    format = serializers.IntegerField(help_text='Версия формата снимка')
+    count = serializers.IntegerField()
+    groups = serializers.ListField(child=serializers.CharField(), help_text='Словарь групп категорий')
+    columns = CategorySnapshotColumnsSerializer()
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .models import Category
+from .search import ensure_search_index
+from .versioning import bump_category_version
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_caches(sender, **kwargs):
+    """
+    Любое изменение категории сдвигает версию справочника после коммита
+    """
+    transaction.on_commit(bump_category_version)
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    """
+    Пересоздание таблицы категорий в SQLite удаляет триггеры поискового индекса;
+    после migrate индекс восстанавливается
+    """
+    if sender.name == 'categories':
+        ensure_search_index(using)
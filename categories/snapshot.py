@@ -0,0 +1,121 @@
+"""
+Снимок всего справочника категорий для кэширования на клиенте.
+
+Снимок - компактный колоночный JSON: по массиву на поле, группы категорий
+вынесены в словарь (groups), в колонке category_group - номер группы или null.
+Тело и его gzip-версия строятся один раз на версию справочника
+(categories.versioning) и отдаются без повторной сериализации. Сильный ETag
+выводится из версии справочника и формата снимка, поэтому клиент с актуальной
+копией получает 304 без тела.
+"""
+
+from threading import Lock
+from typing import NamedTuple, Optional
+import gzip
+import json
+
+from .models import Category
+from .versioning import get_category_version
+
+
+# Версия формата снимка: меняется вместе со структурой тела
+SNAPSHOT_FORMAT = 1
+
+COLUMNS = ('id', 'name', 'category_group', 'fbo_commission', 'fbs_commission')
+
+
+class CategorySnapshot(NamedTuple):
+    """
+    Готовый снимок одной версии справочника
+    """
+    version: int
+    count: int
+    body: bytes
+    gzip_body: bytes
+
+    @property
+    def etag(self) -> str:
+        return f'"categories-{self.version}-v{SNAPSHOT_FORMAT}"'
+
+    @property
+    def gzip_etag(self) -> str:
+        # Сильный валидатор различается для разных кодировок содержимого
+        return f'"categories-{self.version}-v{SNAPSHOT_FORMAT}-gzip"'
+
+
+def build_snapshot(version: int) -> CategorySnapshot:
+    """
+    Колоночный снимок справочника из БД
+    """
+    rows = list(Category.objects.order_by('id').values_list(*COLUMNS))
+    groups = sorted({row[2] for row in rows if row[2] is not None})
+    group_numbers = {group: number for number, group in enumerate(groups)}
+    payload = {
+        'version': version,
+        'format': SNAPSHOT_FORMAT,
+        'count': len(rows),
+        'groups': groups,
+        'columns': {
+            'id': [row[0] for row in rows],
+            'name': [row[1] for row in rows],
+            'category_group': [group_numbers.get(row[2]) for row in rows],
+            'fbo_commission': [str(row[3]) for row in rows],
+            'fbs_commission': [str(row[4]) for row in rows],
+        },
+    }
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+    # mtime=0: одинаковые данные дают одинаковые байты во всех процессах
+    return CategorySnapshot(version, len(rows), body, gzip.compress(body, compresslevel=9, mtime=0))
+
+
+class CategorySnapshotCache:
+    """
+    Снимок справочника в памяти процесса с перестроением по версии справочника
+    """
+
+    def __init__(self):
+        self.builds = 0
+        self.hits = 0
+        self.not_modified = 0
+        self._snapshot: Optional[CategorySnapshot] = None
+        self._lock = Lock()
+
+    def get(self) -> CategorySnapshot:
+        """
+        Снимок действующей версии справочника
+        """
+        version = get_category_version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = build_snapshot(version)
+                    self._snapshot = snapshot
+                    self.builds += 1
+        with self._lock:
+            self.hits += 1
+        return snapshot
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> dict:
+        """
+        Счетчики снимка для эндпоинта метрик
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                'version': snapshot.version if snapshot is not None else None,
+                'categories': snapshot.count if snapshot is not None else 0,
+                'bytes': len(snapshot.body) if snapshot is not None else 0,
+                'gzip_bytes': len(snapshot.gzip_body) if snapshot is not None else 0,
+                'builds': self.builds,
+                'requests': self.hits,
+                'not_modified': self.not_modified,
+            }
+
+
+snapshot_cache = CategorySnapshotCache()
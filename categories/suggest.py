@@ -0,0 +1,186 @@
+"""
+Подсказки категорий при вводе (автодополнение) из индекса в памяти процесса.
+
+Индекс - отсортированный массив нормализованных слов типа товара и группы
+(categories.normalization) с номером категории: все слова с общим префиксом
+лежат подряд, поэтому узел префиксного дерева - диапазон массива, который
+находится двоичным поиском. Для широких префиксов (одна-две буквы) набор
+категорий узла запоминается при первом обращении.
+
+Категория подходит, если каждое слово запроса - начало какого-либо ее слова.
+Порядок: сначала совпадение с первым словом типа товара, затем с другими
+словами типа товара, затем только с группой (для нескольких слов запроса
+берется худшее совпадение); внутри - более короткое название, затем по алфавиту.
+
+Индекс строится при первом запросе в процессе и перестраивается при смене
+версии справочника категорий (categories.versioning); подсказка не обращается к БД.
+"""
+
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .models import Category
+from .normalization import normalize_words
+from .versioning import get_category_version
+
+
+# Совпадение слова запроса со словом категории (меньше - лучше)
+MATCH_NAME_START = 0
+MATCH_NAME = 1
+MATCH_GROUP = 2
+MATCH_FIELDS = {MATCH_NAME_START: 'name', MATCH_NAME: 'name', MATCH_GROUP: 'category_group'}
+
+# Узлы шире этого числа слов запоминаются
+MEMO_THRESHOLD = 256
+
+# Верхняя граница символов для диапазона префикса
+PREFIX_END = '\U0010ffff'
+
+
+class PrefixIndex:
+    """
+    Неизменяемый префиксный индекс одной версии справочника
+    """
+
+    def __init__(self, rows):
+        # Номер категории - ее место в порядке (длина названия, название, ID)
+        rows = sorted(rows, key=lambda row: (len(row[1]), row[1].casefold(), row[0]))
+        self.items = [
+            {
+                'id': category_id,
+                'name': name,
+                'category_group': category_group,
+                'fbo_commission': str(fbo_commission),
+                'fbs_commission': str(fbs_commission),
+            }
+            for category_id, name, category_group, fbo_commission, fbs_commission in rows
+        ]
+
+        best: Dict[Tuple[str, int], int] = {}
+        for number, (_, name, category_group, _, _) in enumerate(rows):
+            for position, word in enumerate(normalize_words(name)):
+                match = MATCH_NAME_START if position == 0 else MATCH_NAME
+                if best.get((word, number), MATCH_GROUP + 1) > match:
+                    best[(word, number)] = match
+            for word in normalize_words(category_group):
+                best.setdefault((word, number), MATCH_GROUP)
+
+        entries = sorted(best.items())
+        self.words: List[str] = [word for (word, _), _ in entries]
+        self.numbers = np.array([number for (_, number), _ in entries], dtype=np.int64)
+        self.matches = np.array([match for _, match in entries], dtype=np.int64)
+        self._memo: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def candidates(self, prefix: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Категории, у которых есть слово с префиксом prefix: номера по возрастанию
+        и лучшее совпадение для каждой
+        """
+        memo = self._memo.get(prefix)
+        if memo is not None:
+            return memo
+        lo = bisect_left(self.words, prefix)
+        hi = bisect_left(self.words, prefix + PREFIX_END, lo)
+        # Ключ номер*4 + совпадение: после сортировки первое вхождение номера - лучшее совпадение
+        keys = np.sort(self.numbers[lo:hi] * 4 + self.matches[lo:hi])
+        numbers = keys >> 2
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = numbers[1:] != numbers[:-1]
+        found = numbers[first], keys[first] & 3
+        if hi - lo > MEMO_THRESHOLD:
+            self._memo[prefix] = found
+        return found
+
+    def suggest(self, words: List[str], limit: int) -> List[dict]:
+        """
+        Лучшие limit категорий для слов запроса
+        """
+        numbers, matches = self.candidates(words[0])
+        for word in words[1:]:
+            if not len(numbers):
+                break
+            other_numbers, other_matches = self.candidates(word)
+            numbers, mine, other = np.intersect1d(
+                numbers, other_numbers, assume_unique=True, return_indices=True
+            )
+            matches = np.maximum(matches[mine], other_matches[other])
+        if not len(numbers):
+            return []
+
+        scores = matches * len(self.items) + numbers
+        if len(scores) > limit:
+            scores = np.partition(scores, limit - 1)[:limit]
+        scores.sort()
+        result = []
+        for score in scores.tolist():
+            match, number = divmod(score, len(self.items))
+            result.append(dict(self.items[number], match=MATCH_FIELDS[match]))
+        return result
+
+
+class CategorySuggestIndex:
+    """
+    Префиксный индекс подсказок с перестроением по версии справочника
+    """
+
+    def __init__(self):
+        self.builds = 0
+        self.lookups = 0
+        # Версия справочника и индекс меняются вместе одним присваиванием
+        self._current: Optional[Tuple[int, PrefixIndex]] = None
+        self._lock = Lock()
+
+    def suggest(self, query: str, limit: int) -> List[dict]:
+        """
+        До limit категорий для вводимого запроса
+        """
+        words = normalize_words(query)
+        index = self.index()
+        with self._lock:
+            self.lookups += 1
+        if not words:
+            return []
+        return index.suggest(words, limit)
+
+    def index(self) -> PrefixIndex:
+        """
+        Индекс действующей версии справочника; строится один раз на версию
+        """
+        version = get_category_version()
+        current = self._current
+        if current is not None and current[0] == version:
+            return current[1]
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] == version:
+                return current[1]
+            rows = Category.objects.values_list(
+                'id', 'name', 'category_group', 'fbo_commission', 'fbs_commission'
+            )
+            index = PrefixIndex(list(rows))
+            self._current = (version, index)
+            self.builds += 1
+            return index
+
+    def stats(self) -> dict:
+        """
+        Счетчики индекса для эндпоинта метрик
+        """
+        with self._lock:
+            version, index = self._current or (None, None)
+            return {
+                'categories': len(index) if index is not None else 0,
+                'words': len(index.words) if index is not None else 0,
+                'version': version,
+                'builds': self.builds,
+                'lookups': self.lookups,
+            }
+
+
+suggest_index = CategorySuggestIndex()
@@ -1,3 +1,334 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+import gzip
+import json
+import tempfile
+from urllib.parse import parse_qs, urlencode, urlsplit
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .admin import CategoryAdminForm
+from .models import Category
+from .normalization import category_search_key, normalize_text
+from .search import search_cache
+from .versioning import bump_category_version
+from .views import CategoryCursorPagination
+
+
+class CategoryAdminFormTests(TestCase):
+    """
+    Согласование комиссий FBO/FBS с ценовыми диапазонами в админке
+    """
+
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='3D-очки', category_group='VR-устройства', fbo_commission='41.00', fbs_commission='49.00',
+            commission_bands={
+                'FBO': {'edges': ['100', '300', '500'], 'rates': ['14.00', '20.00', '41.00', '45.00']},
+                'FBS': {'edges': ['100', '300'], 'rates': ['14.00', '20.00', '49.00']},
+            },
+        )
+        self.category.refresh_from_db()
+
+    def submit(self, **changes):
+        data = {
+            'name': self.category.name,
+            'category_group': self.category.category_group,
+            'fbo_commission': self.category.fbo_commission,
+            'fbs_commission': self.category.fbs_commission,
+            'commission_bands': json.dumps(self.category.commission_bands),
+            # Поле с default=dict отправляет исходное значение в скрытом поле, как в админке
+            'initial-commission_bands': json.dumps(self.category.commission_bands),
+        }
+        data.update(changes)
+        return CategoryAdminForm(data, instance=self.category)
+
+    def test_flat_commission_updates_reference_band(self):
+        form = self.submit(fbo_commission='10')
+        self.assertTrue(form.is_valid(), form.errors)
+        category = form.save()
+
+        self.assertEqual(category.commission_bands['FBO']['rates'], ['14.00', '20.00', '10.00', '45.00'])
+        self.assertEqual(category.commission_bands['FBS']['rates'], ['14.00', '20.00', '49.00'])
+
+    def test_bands_update_flat_commission(self):
+        bands = dict(self.category.commission_bands, FBS={'edges': ['300'], 'rates': ['20.00', '30.00']})
+        form = self.submit(commission_bands=json.dumps(bands))
+        self.assertTrue(form.is_valid(), form.errors)
+
+        self.assertEqual(form.save().fbs_commission, Decimal('30.00'))
+
+    def test_conflicting_changes_are_rejected(self):
+        bands = dict(self.category.commission_bands, FBS={'edges': ['300'], 'rates': ['20.00', '30.00']})
+        form = self.submit(fbs_commission='25', commission_bands=json.dumps(bands))
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('fbs_commission', form.errors)
+
+    def test_malformed_bands_are_rejected(self):
+        form = self.submit(commission_bands=json.dumps({'FBO': {'edges': ['300'], 'rates': ['20.00']}}))
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('commission_bands', form.errors)
+
+
+class CategorySearchKeyTests(TestCase):
+    """
+    Нормализованный поисковый ключ категории (Category.search_key)
+    """
+
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Ёлка искусственная', category_group='Новый год', fbo_commission=15, fbs_commission=17
+        )
+
+    def stored_key(self):
+        return Category.objects.values_list('search_key', flat=True).get(pk=self.category.pk)
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text('  ЁЛКА,  искусственная!'), 'елка искусственная')
+        self.assertEqual(normalize_text('3D-очки'), normalize_text('3d очки'))
+        self.assertEqual(normalize_text('snake_case'), 'snake case')
+        self.assertEqual(normalize_text(None), '')
+        self.assertEqual(category_search_key('Шарф', None), 'шарф\t')
+
+    def test_key_is_set_on_create(self):
+        self.assertEqual(self.stored_key(), 'елка искусственная\tновый год')
+
+    def test_key_follows_update_fields(self):
+        self.category.name = 'Ёлочная игрушка'
+        self.category.save(update_fields=['name'])
+        self.assertEqual(self.stored_key(), 'елочная игрушка\tновый год')
+
+    def test_key_follows_update_or_create(self):
+        Category.objects.update_or_create(name='Ёлка искусственная', defaults={'category_group': 'Декор'})
+        self.assertEqual(self.stored_key(), 'елка искусственная\tдекор')
+
+    def test_key_is_set_by_bulk_create(self):
+        Category.objects.bulk_create([
+            Category(name='ШАРФ', category_group='Аксессуары', fbo_commission=43, fbs_commission=47)
+        ])
+        self.assertEqual(Category.objects.get(name='ШАРФ').search_key, 'шарф\tаксессуары')
+
+
+class CategorySearchTests(TestCase):
+    """
+    Поиск категорий (?search=): подстроки нормализованного ключа во всех СУБД
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.glasses = Category.objects.create(
+            name='3D-очки', category_group='VR-устройства и аксессуары', fbo_commission=41, fbs_commission=49
+        )
+        cls.tree = Category.objects.create(name='Ёлка искусственная', fbo_commission=15, fbs_commission=17)
+        cls.scarf = Category.objects.create(name='Шарф', category_group='Аксессуары', fbo_commission=43,
+                                            fbs_commission=47)
+
+    def setUp(self):
+        # Транзакция теста не коммитится и версию справочника не сдвигает
+        search_cache.clear()
+
+    def search(self, query):
+        response = self.client.get('/api/categories/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [category['id'] for category in response.json()['results']]
+
+    def test_yo_and_case_are_ignored(self):
+        for query in ('Ёлка', 'елка', 'ЕЛКА', 'ёл'):
+            self.assertEqual(self.search(query), [self.tree.id], query)
+
+    def test_punctuation_and_word_order_are_ignored(self):
+        for query in ('3d-очки', '3D очки', 'очки 3d', '3D'):
+            self.assertEqual(self.search(query), [self.glasses.id], query)
+
+    def test_substring_match(self):
+        self.assertEqual(self.search('чки'), [self.glasses.id])
+        self.assertEqual(self.search('кусствен'), [self.tree.id])
+
+    def test_name_match_ranks_above_group_match(self):
+        holder = Category.objects.create(name='Аксессуар для очков', fbo_commission=20, fbs_commission=20)
+        # «аксессуар» - в названии holder и в группе 3D-очков и шарфа
+        results = self.search('аксессуар')
+        self.assertEqual(results[0], holder.id)
+        self.assertEqual(set(results), {holder.id, self.glasses.id, self.scarf.id})
+
+    def test_no_match(self):
+        self.assertEqual(self.search('кабель'), [])
+
+
+# Метка версии справочника для тестов кэшей по версии: настоящая метка
+# сбросила бы кэши запущенного сервера
+TEST_CATEGORY_VERSION_FILE = Path(tempfile.gettempdir()) / 'ozon_calculator_test_category_version'
+
+
+@override_settings(CATEGORY_VERSION_FILE=TEST_CATEGORY_VERSION_FILE)
+class CategorySuggestTests(TestCase):
+    """
+    Подсказки категорий при вводе (/api/categories/suggest/)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.glasses = Category.objects.create(
+            name='3D-очки', category_group='VR-устройства и аксессуары', fbo_commission=41, fbs_commission=49
+        )
+        cls.tree = Category.objects.create(name='Ёлка искусственная', fbo_commission=15, fbs_commission=17)
+        cls.holder = Category.objects.create(name='Аксессуар для очков', fbo_commission=20, fbs_commission=20)
+
+    def setUp(self):
+        # Транзакция теста не коммитится: индекс перестраивается по новой версии
+        bump_category_version()
+
+    def suggest(self, query, **params):
+        response = self.client.get('/api/categories/suggest/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['id'], item['match']) for item in response.json()['results']]
+
+    def test_word_prefixes(self):
+        self.assertEqual(self.suggest('ЁЛК'), [(self.tree.id, 'name')])
+        self.assertEqual(self.suggest('иск ел'), [(self.tree.id, 'name')])
+        self.assertEqual(self.suggest('3d-оч'), [(self.glasses.id, 'name')])
+        self.assertEqual(self.suggest('лка'), [])
+
+    def test_name_match_ranks_above_group_match(self):
+        self.assertEqual(self.suggest('аксес'), [(self.holder.id, 'name'), (self.glasses.id, 'category_group')])
+        self.assertEqual(self.suggest('оч'), [(self.glasses.id, 'name'), (self.holder.id, 'name')])
+        self.assertEqual(self.suggest('аксес', limit=1), [(self.holder.id, 'name')])
+
+    def test_invalid_limit(self):
+        response = self.client.get('/api/categories/suggest/', {'q': 'оч', 'limit': 0})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('limit', response.json()['errors'])
+
+
+@override_settings(CATEGORY_VERSION_FILE=TEST_CATEGORY_VERSION_FILE)
+class CategorySnapshotTests(TestCase):
+    """
+    Снимок справочника (/api/categories/snapshot/)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.glasses = Category.objects.create(
+            name='3D-очки', category_group='VR-устройства', fbo_commission='41.00', fbs_commission='49.00'
+        )
+        cls.tree = Category.objects.create(name='Ёлка', fbo_commission='15.00', fbs_commission='17.00')
+
+    def setUp(self):
+        bump_category_version()
+
+    def snapshot(self, **headers):
+        return self.client.get('/api/categories/snapshot/', **headers)
+
+    def test_columns(self):
+        response = self.snapshot()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = json.loads(response.content)
+        self.assertEqual(body['count'], 2)
+        self.assertEqual(body['groups'], ['VR-устройства'])
+        self.assertEqual(body['columns'], {
+            'id': [self.glasses.id, self.tree.id],
+            'name': ['3D-очки', 'Ёлка'],
+            'category_group': [0, None],
+            'fbo_commission': ['41.00', '15.00'],
+            'fbs_commission': ['49.00', '17.00'],
+        })
+
+    def test_gzip(self):
+        plain = self.snapshot()
+        compressed = self.snapshot(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertNotEqual(compressed['ETag'], plain['ETag'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+    def test_not_modified(self):
+        etag = self.snapshot()['ETag']
+        for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            response = self.snapshot(HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(response.status_code, 304, if_none_match)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], etag)
+        # ETag несжатого ответа подходит и для gzip: та же версия справочника
+        self.assertEqual(self.snapshot(HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING='gzip').status_code, 304)
+        self.assertEqual(self.snapshot(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_change_invalidates_etag(self):
+        etag = self.snapshot()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Шарф', fbo_commission='43.00', fbs_commission='47.00')
+
+        response = self.snapshot(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['count'], 3)
+
+
+class CategoryCursorPaginationTests(TestCase):
+    """
+    Курсорная пагинация списка категорий (?cursor=)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Повторяющиеся названия и моменты изменения: порядок внутри них задает id
+        Category.objects.bulk_create([
+            Category(name=f'Категория {number % 7}', fbo_commission=10, fbs_commission=12)
+            for number in range(23)
+        ])
+        base = timezone.now() - timedelta(days=10)
+        for category in Category.objects.all():
+            Category.objects.filter(pk=category.pk).update(updated_at=base + timedelta(hours=category.pk % 5))
+
+    def walk(self, **params):
+        url = '/api/categories/?' + urlencode({'cursor': '', 'page_size': 4, **params})
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertLessEqual(len(body['results']), 4)
+            ids.extend(category['id'] for category in body['results'])
+            url = body['next']
+        return ids
+
+    def test_pages_have_no_gaps_or_duplicates(self):
+        for ordering in CategoryCursorPagination.orderings:
+            expected = list(Category.objects.order_by(
+                ordering, '-pk' if ordering.startswith('-') else 'pk'
+            ).values_list('pk', flat=True))
+            self.assertEqual(self.walk(ordering=ordering), expected, ordering)
+
+    def test_insert_between_pages(self):
+        first = self.client.get('/api/categories/', {'cursor': '', 'page_size': 4}).json()
+        # Категория перед курсором не сдвигает следующую страницу
+        Category.objects.create(name='Аптечка', fbo_commission=10, fbs_commission=12)
+        second = self.client.get(first['next']).json()
+        seen = [category['id'] for category in first['results'] + second['results']]
+        expected = Category.objects.exclude(name='Аптечка').order_by('name', 'pk').values_list('pk', flat=True)
+        self.assertEqual(seen, list(expected[:8]))
+
+    def test_updated_since(self):
+        since = Category.objects.order_by('updated_at').values_list('updated_at', flat=True)[10]
+        expected = Category.objects.filter(updated_at__gte=since).order_by('updated_at', 'pk')
+        ids = self.walk(ordering='updated_at', updated_since=since.isoformat())
+        self.assertEqual(ids, list(expected.values_list('pk', flat=True)))
+
+    def test_invalid_parameters(self):
+        for params, status in (
+            ({'cursor': 'не-курсор'}, 404),
+            ({'cursor': '', 'ordering': 'category_group'}, 400),
+            ({'updated_since': 'вчера'}, 400),
+        ):
+            response = self.client.get('/api/categories/', params)
+            self.assertEqual(response.status_code, status, params)
+
+    def test_cursor_of_other_ordering(self):
+        first = self.client.get('/api/categories/', {'cursor': '', 'page_size': 4, 'ordering': 'name'}).json()
+        cursor = parse_qs(urlsplit(first['next']).query)['cursor'][0]
+        response = self.client.get('/api/categories/', {'cursor': cursor, 'ordering': '-updated_at'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,39 @@
+"""
+Глобальная версия справочника категорий.
+
+Версия - время изменения файла-метки (CATEGORY_VERSION_FILE). Чтение версии -
+один stat() без запросов к БД, поэтому его можно делать на каждом расчете.
+Метку обновляют сигналы модели Category (после коммита транзакции) и команды
+импорта по завершении загрузки, так что изменение видят все процессы.
+"""
+
+import os
+import time
+
+from django.conf import settings
+
+
+def get_category_version() -> int:
+    """
+    Текущая версия справочника категорий (0, если метка еще не создавалась)
+    """
+    try:
+        return os.stat(settings.CATEGORY_VERSION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def bump_category_version() -> int:
+    """
+    Обновляет метку версии и возвращает новую версию
+    """
+    path = settings.CATEGORY_VERSION_FILE
+    previous = get_category_version()
+    now = time.time_ns()
+    # Версия строго растет, даже если часы не сдвинулись с прошлого обновления
+    version = now if now > previous else previous + 1
+    with open(path, 'w') as stamp:
+        stamp.write(f'{version}\n')
+    os.utime(path, ns=(version, version))
+    return version
+
@@ -1,8 +1,35 @@
-from rest_framework import viewsets, filters
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
+import json
+import re
+
+from django.conf import settings
 from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
+from rest_framework import viewsets, filters, serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from .models import Category
-from .serializers import CategorySerializer
+from .search import search_cache, search_categories
+from .serializers import (
+    CategorySerializer,
+    CategorySnapshotSerializer,
+    CategorySuggestQuerySerializer,
+    CategorySuggestionsSerializer,
+)
+from .snapshot import snapshot_cache
+from .suggest import suggest_index
+
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
 
 
 class CategoryPagination(PageNumberPagination):
@@ -14,50 +41,259 @@ class CategoryPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class CategoryCursorPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация списка категорий
+
+    Курсор хранит ключ последней строки страницы - (name, id) или (updated_at, id);
+    следующая страница - условие по этому ключу и LIMIT по индексу того же ключа
+    вместо OFFSET, поэтому время страницы не зависит от глубины обхода, а
+    вставки и удаления между запросами не сдвигают страницы.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering_param = 'ordering'
+    orderings = ('name', '-name', 'updated_at', '-updated_at')
+    default_ordering = 'name'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = request.query_params.get(self.ordering_param) or self.default_ordering
+        if self.ordering not in self.orderings:
+            raise ValidationError({
+                self.ordering_param: [f'Для курсорной пагинации допустимо: {", ".join(self.orderings)}']
+            })
+        self.field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            value, pk = position
+            after, from_value = ('lt', 'lte') if descending else ('gt', 'gte')
+            # field >= value - диапазон индекса; (field > value OR id > pk) - строки после курсора
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{from_value}': value}),
+                Q(**{f'{self.field}__{after}': value}) | Q(**{f'pk__{after}': pk}),
+            )
+        queryset = queryset.order_by(self.ordering, '-pk' if descending else 'pk')
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        """
+        Ключ (значение поля сортировки, id) из курсора; None для первой страницы
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            ordering, value, pk = json.loads(urlsafe_b64decode(encoded.encode()))
+            if ordering != self.ordering or not isinstance(pk, int):
+                raise ValueError
+            if self.field == 'updated_at':
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError
+            elif not isinstance(value, str):
+                raise ValueError
+        except (binascii.Error, TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def encode_cursor(self, category) -> str:
+        value = getattr(category, self.field)
+        if self.field == 'updated_at':
+            value = value.isoformat()
+        payload = json.dumps([self.ordering, value, category.pk], ensure_ascii=False, separators=(',', ':'))
+        return urlsafe_b64encode(payload.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CategoryOrderingFilter(filters.OrderingFilter):
+    """
+    Сортировка списка категорий: при поиске по умолчанию - по релевантности
+    """
+
+    def get_default_ordering(self, view):
+        if view.request.query_params.get('search'):
+            return None
+        return super().get_default_ordering(view)
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=[
+        OpenApiParameter(
+            name='search',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            description='Поиск по типу товара и категории (по релевантности, если не задан ordering)'
+        ),
+        OpenApiParameter(
+            name='updated_since',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Только категории, измененные в этот момент или позже (ISO 8601)'
+        ),
+        OpenApiParameter(
+            name='cursor',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            description='Курсорная пагинация: пустое значение - первая страница, далее - ссылка next. '
+                        'Сортировка ordering: name, -name, updated_at или -updated_at; ответ без count'
+        ),
+    ])
+)
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для работы с категориями товаров
     
     Поддерживает:
-    - Получение списка категорий
+    - Получение списка категорий (постранично или курсором по (name, id) / (updated_at, id))
+    - Выборка категорий, измененных с момента updated_since (для синхронизации)
     - Поиск категорий по типу товара (name) и категории (category_group)
     - Получение конкретной категории по ID
+    - Подсказки при вводе (suggest) из префиксного индекса в памяти
+    - Снимок всего справочника (snapshot) для кэширования на клиенте
     
-    Примечание: SQLite не поддерживает регистронезависимый поиск для кириллицы,
-    поэтому мы ищем по обоим вариантам (с заглавной и строчной буквы).
+    Поиск подстрок идет по триграммному индексу (FTS5 trigram в SQLite, pg_trgm
+    в PostgreSQL), без учета регистра, в том числе для кириллицы; результаты упорядочены по
+    релевантности (categories.search), если не передан параметр ordering.
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     pagination_class = CategoryPagination
-    filter_backends = [filters.OrderingFilter]
+    filter_backends = [CategoryOrderingFilter]
     ordering_fields = ['name', 'category_group', 'created_at']
     ordering = ['name']
 
+    @property
+    def paginator(self):
+        """
+        Курсорная пагинация, если в запросе есть параметр cursor (в том числе пустой)
+        """
+        if not hasattr(self, '_paginator'):
+            if CategoryCursorPagination.cursor_query_param in self.request.query_params:
+                self._paginator = CategoryCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_queryset(self):
         """
-        Переопределяем queryset для корректного поиска по кириллице в SQLite.
-        SQLite не поддерживает регистронезависимый поиск для кириллицы,
-        поэтому ищем по всем вариантам регистра.
+        Категории, подходящие под параметры search и updated_since, или весь справочник
         """
         queryset = Category.objects.all()
         search_query = self.request.query_params.get('search', None)
+        updated_since = self.request.query_params.get('updated_since', None)
         
+        if updated_since:
+            try:
+                updated_since = serializers.DateTimeField().to_internal_value(updated_since)
+            except ValidationError as error:
+                raise ValidationError({'updated_since': error.detail})
+            queryset = queryset.filter(updated_at__gte=updated_since)
         if search_query:
-            # Генерируем варианты поиска для обхода ограничений SQLite с кириллицей
-            search_variants = [
-                search_query,  # Оригинал
-                search_query.lower(),  # все строчные
-                search_query.upper(),  # все заглавные
-                search_query.capitalize(),  # Заглавная первая
-                search_query.title(),  # Заглавная Каждая
-            ]
-            
-            # Создаем Q-объекты для всех вариантов
-            q_objects = Q()
-            for variant in search_variants:
-                q_objects |= Q(name__icontains=variant)
-                q_objects |= Q(category_group__icontains=variant)
-            
-            queryset = queryset.filter(q_objects).distinct()
+            queryset = search_categories(queryset, search_query)
         
         return queryset
+
+    def filter_queryset(self, queryset):
+        """
+        Список по релевантности берется из кэша поиска; при явной сортировке -
+        отсортированный queryset; курсорная пагинация сортирует сама
+        """
+        if isinstance(self.paginator, CategoryCursorPagination):
+            return queryset
+        query_params = self.request.query_params
+        if (self.action == 'list' and query_params.get('search')
+                and not query_params.get(CategoryOrderingFilter.ordering_param)
+                and not query_params.get('updated_since')):
+            return search_cache.search(query_params['search'])
+        return super().filter_queryset(queryset)
+
+    @extend_schema(
+        parameters=[CategorySuggestQuerySerializer],
+        responses={200: CategorySuggestionsSerializer},
+        description='Подсказки категорий при вводе: до limit категорий, у которых каждое слово запроса - '
+                    'начало слова типа товара или категории; совпадения в типе товара идут первыми'
+    )
+    @action(detail=False, methods=['get'], pagination_class=None, filter_backends=[])
+    def suggest(self, request):
+        query_serializer = CategorySuggestQuerySerializer(data=request.query_params)
+        if not query_serializer.is_valid():
+            return Response({'errors': query_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        data = query_serializer.validated_data
+        return Response({'results': suggest_index.suggest(data['q'], data['limit'])})
+
+    @extend_schema(
+        responses={200: CategorySnapshotSerializer, 304: None},
+        description='Весь справочник категорий в колонках для кэширования на клиенте. '
+                    'Ответ сжат gzip, если клиент его принимает; ETag зависит от версии справочника, '
+                    'при совпадении If-None-Match - 304 без тела'
+    )
+    # Без аутентификации: сессия не читается, ответ не зависит от Cookie и годится для общих кэшей
+    @action(detail=False, methods=['get'], pagination_class=None, filter_backends=[], authentication_classes=[])
+    def snapshot(self, request):
+        snapshot = snapshot_cache.get()
+        use_gzip = bool(ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        etag = snapshot.gzip_etag if use_gzip else snapshot.etag
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # Слабое сравнение (RFC 9110): W/ не учитывается; обе кодировки - та же версия
+            tags = {tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)}
+            if '*' in tags or tags & {snapshot.etag, snapshot.gzip_etag}:
+                snapshot_cache.count_not_modified()
+                response = HttpResponseNotModified()
+                return self._snapshot_headers(response, etag)
+
+        response = HttpResponse(snapshot.gzip_body if use_gzip else snapshot.body,
+                                content_type='application/json')
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['Content-Length'] = len(response.content)
+        return self._snapshot_headers(response, etag)
+
+    def _snapshot_headers(self, response, etag):
+        response['ETag'] = etag
+        max_age = settings.CATEGORY_SNAPSHOT_MAX_AGE
+        response['Cache-Control'] = f'public, max-age={max_age}' if max_age else 'public, no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -114,15 +114,15 @@ async function loadCategories() {
     }
 }
 
-// Поиск категорий на сервере
+// Подсказки категорий с сервера (префиксный индекс в памяти, без запросов к БД)
 async function searchCategoriesServer(query) {
     try {
-        const url = `${API_BASE_URL}/categories/?search=${encodeURIComponent(query)}&page_size=20`;
+        const url = `${API_BASE_URL}/categories/suggest/?q=${encodeURIComponent(query)}&limit=20`;
         const response = await fetch(url);
         if (!response.ok) {
             // Пробуем fallback на относительный путь
             if (API_BASE_URL !== '/api') {
-                const fallbackUrl = `/api/categories/?search=${encodeURIComponent(query)}&page_size=20`;
+                const fallbackUrl = `/api/categories/suggest/?q=${encodeURIComponent(query)}&limit=20`;
                 const fallbackResponse = await fetch(fallbackUrl);
                 if (fallbackResponse.ok) {
                     const fallbackData = await fallbackResponse.json();
@@ -138,7 +138,7 @@ async function searchCategoriesServer(query) {
         // Пробуем fallback
         if (API_BASE_URL !== '/api') {
             try {
-                const fallbackUrl = `/api/categories/?search=${encodeURIComponent(query)}&page_size=20`;
+                const fallbackUrl = `/api/categories/suggest/?q=${encodeURIComponent(query)}&limit=20`;
                 const fallbackResponse = await fetch(fallbackUrl);
                 if (fallbackResponse.ok) {
                     const fallbackData = await fallbackResponse.json();
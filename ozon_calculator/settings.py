@@ -146,6 +146,45 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Файл-метка версии справочника категорий: его mtime сбрасывает кэши во всех процессах
+CATEGORY_VERSION_FILE = Path(os.getenv('CATEGORY_VERSION_FILE', BASE_DIR / '.category_version'))
+# Кэш комиссий категорий в памяти процесса
+# Максимальное число категорий в LRU-кэше процесса
+CATEGORY_CACHE_SIZE = int(os.getenv('CATEGORY_CACHE_SIZE', '4096'))
+# Максимальное число поисковых запросов в LRU-кэше ранжированных результатов
+CATEGORY_SEARCH_CACHE_SIZE = int(os.getenv('CATEGORY_SEARCH_CACHE_SIZE', '4096'))
+# Сколько секунд клиент может использовать снимок справочника без проверки ETag
+# (0 - проверять при каждом обращении, ответ 304 без тела)
+CATEGORY_SNAPSHOT_MAX_AGE = int(os.getenv('CATEGORY_SNAPSHOT_MAX_AGE', '0'))
+
+# Кэш результатов расчета
+# По умолчанию - в памяти процесса; для общего кэша между воркерами укажите
+# CALCULATION_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# и каталог в CALCULATION_CACHE_LOCATION (или Redis/Memcached)
+CALCULATION_CACHE_ALIAS = 'calculations'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    CALCULATION_CACHE_ALIAS: {
+        'BACKEND': os.getenv('CALCULATION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CALCULATION_CACHE_LOCATION', 'calculations'),
+        'TIMEOUT': int(os.getenv('CALCULATION_CACHE_TTL', '600')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CALCULATION_CACHE_MAX_ENTRIES', '10000')),
+        },
+    },
+}
+
+# Режим скалярного расчета: decimal или float (решатели цены в float64
+# с перепроверкой через Decimal у границ округления, результат тот же)
+CALCULATOR_ENGINE = os.getenv('CALCULATOR_ENGINE', 'decimal')
+# Доля расчетов в режиме float, целиком сверяемых с Decimal (счетчик mismatches в метриках)
+CALCULATOR_FLOAT_VERIFY_RATE = float(os.getenv('CALCULATOR_FLOAT_VERIFY_RATE', '0.01'))
+
+# Файл версий тарифов Ozon; перечитывается при изменении, без перезапуска
+TARIFF_FILE = Path(os.getenv('TARIFF_FILE', BASE_DIR / 'calculator' / 'data' / 'tariffs.json'))
+
 # CORS Settings
 # В продакшене настройте CORS_ALLOWED_ORIGINS с конкретными доменами
 cors_allow_all = os.getenv('CORS_ALLOW_ALL_ORIGINS', 'True').lower() in ('true', '1', 'yes')